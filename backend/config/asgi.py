@@ -0,0 +1,16 @@
+"""
+ASGI config for config project.
+
+Serves the async read endpoints (member search, dashboard stats, health
+check, body checkup data, daily report) from core.async_views.
+Run with e.g. `uvicorn config.asgi:application --workers 2`.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('ASYNC_VIEWS', '1')
+
+application = get_asgi_application()
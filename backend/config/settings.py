@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 import environ
 
@@ -15,6 +16,8 @@ environ.Env.read_env(os.path.join(BASE_DIR, '.env'))
 
 SECRET_KEY = env('DJANGO_SECRET_KEY', default='django-insecure-dev-key-change-in-production')
 DEBUG = env('DEBUG', default=True)
+# `manage.py test` runs with DEBUG off, and without a collectstatic manifest
+TESTING = sys.argv[1:2] == ['test']
 
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=['localhost', '127.0.0.1', '0.0.0.0'])
 
@@ -32,7 +35,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.log.RequestIdMiddleware',
+    'core.replica.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -40,6 +46,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.branches.BranchMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -61,12 +68,42 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
+
+# WeasyPrint renderer processes (0 renders in the request thread)
+PDF_RENDER_WORKERS = env.int('PDF_RENDER_WORKERS', default=0)
+
+# Threads processing uploaded profile photos (0 processes them in the request thread)
+IMAGE_WORKERS = env.int('IMAGE_WORKERS', default=2)
+
+# Report types streamed by the tabular PDF writer instead of WeasyPrint
+TABULAR_PDF_REPORTS = env.list('TABULAR_PDF_REPORTS', default=['report_daily', 'report_range'])
+
+# Route the hot read endpoints to core.async_views (enabled by config/asgi.py)
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
 
 # Database
 DATABASES = {
     'default': env.db('DATABASE_URL', default='postgres://postgres:postgres@db:5432/membershipdb')
 }
 
+# Optional read replica for reports and exports (core.replica); tests read
+# the default test database through it
+if env('REPLICA_DATABASE_URL', default=''):
+    DATABASES['replica'] = env.db('REPLICA_DATABASE_URL')
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['core.replica.ReplicaRouter']
+
+# Seconds a browser's reads stay on the primary after it changed something
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
+# Cache backend (core.cache): locmemcache:// for development, or
+# filecache:///var/tmp/membership-cache or redis://host:6379/0 (any
+# Redis-compatible server; needs the redis package) shared by all workers
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -86,10 +123,22 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'core' / 'static']
 
+# collectstatic minifies, hashes and precompresses the assets (core/storage.py);
+# WhiteNoise serves the hashed names with a far-future immutable Cache-Control
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.storage.MinifiedManifestStaticFilesStorage'},
+}
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = env('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
 
+# Closed years of attendance and payments moved out of the live tables by
+# `manage.py archive_records`; the latest ARCHIVE_RETAIN_YEARS closed years stay live
+ARCHIVE_DIR = env('ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+ARCHIVE_RETAIN_YEARS = env.int('ARCHIVE_RETAIN_YEARS', default=1)
+
 # Email configuration
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # Development default
 EMAIL_HOST = env('EMAIL_HOST', default='localhost')
@@ -106,6 +155,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
+        'core.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -115,6 +165,10 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 50,
 }
 
+# Signed API tokens (core.authentication): the first key signs, all verify
+API_TOKEN_KEYS = env.list('API_TOKEN_KEYS', default=[])
+API_TOKEN_TTL = env.int('API_TOKEN_TTL', default=12 * 60 * 60)
+
 # CORS settings (adjust for production)
 CORS_ALLOW_ALL_ORIGINS = DEBUG
 CORS_ALLOW_CREDENTIALS = True
@@ -135,28 +189,52 @@ if not DEBUG:
     CSRF_COOKIE_HTTPONLY = True
 
 # Logging configuration
+# Loggers only enqueue records; a listener thread formats them and writes the
+# JSON log file and the console (core/log.py). Every server process appends
+# to the same file, so it is rotated outside the app (logrotate); the handler
+# reopens it once it has been moved away.
+LOG_FILE = env('LOG_FILE', default='django.log')
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'core.log.RequestIdFilter'},
+    },
+    'formatters': {
+        'json': {'()': 'core.log.JsonFormatter'},
+        'console': {'format': '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'},
+    },
     'handlers': {
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': 'django.log',
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': LOG_FILE,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
         },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
+            'formatter': 'console',
+        },
+        # Must sort after the handlers it feeds
+        'queue': {
+            '()': 'core.log.QueueListenerHandler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'filters': ['request_id'],
+            'level': 'INFO',
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': True,
         },
         'core': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'DEBUG' if DEBUG else 'INFO',
             'propagate': True,
         },
@@ -1,33 +1,168 @@
+from datetime import timedelta
+
 from django.contrib import admin
-from .models import Member, Attendance, Payment, Checkup, Registration, BodyComponentEvaluation
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import (
+    Member, Attendance, Payment, Checkup, Registration, BodyComponentEvaluation,
+    LedgerEntry, BalanceSnapshot, MemberSummary, Plan, Branch, DatedQuerySet,
+)
+
+
+def estimated_count(queryset):
+    """
+    Row count of the queryset's table from the planner statistics in pg_class,
+    or None off PostgreSQL and before the table was first analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 (or 0 before PostgreSQL 14) until the first ANALYZE
+    return int(row[0]) if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes the row count of an unfiltered changelist from the
+    table statistics instead of a COUNT(*) over every row. Filtered lists and
+    small tables are counted exactly.
+    """
+    # Exact counts below this many rows are cheap enough
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate >= self.exact_count_limit:
+                return estimate
+        return super().count
+
+
+def matching_members(search_term):
+    """
+    Ids of the members whose name, phone or code contains every word of
+    `search_term`, as a queryset to filter by in a subquery: a common name
+    can match thousands of members, too many to send back as literal ids.
+    """
+    members = Member.objects.order_by()
+    for word in search_term.split():
+        members = members.filter(
+            Q(full_name__icontains=word) | Q(phone__icontains=word) | Q(member_code__icontains=word)
+        )
+    return members.values('pk')
+
+
+class MemberRecordAdmin(admin.ModelAdmin):
+    """
+    Admin for the tables that grow by rows per member. Each page lists its
+    rows with their members in one query and is counted from statistics. A
+    search finds the matching members in a subquery, through the member search
+    index, then their rows through the table's member_id index, instead of
+    joining every row to its member to compare names.
+    """
+    list_select_related = ['member']
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) behind "N results (M total)"
+    show_full_result_count = False
+    search_fields = ['member__full_name', 'member__phone', 'member__member_code']
+    search_help_text = 'Member name, phone or code'
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(member_id__in=matching_members(search_term)), False
+
+
+class DateHierarchyQuerySet(DatedQuerySet):
+    """Changelist rows whose dates(), read only by the date hierarchy, come from seek_dates()."""
+
+    def dates(self, field_name, kind, order='ASC'):
+        return self.seek_dates(field_name, kind, order)
+
+
+class DatedAdmin(MemberRecordAdmin):
+    """
+    MemberRecordAdmin with a date hierarchy whose year, month and day links
+    are found by seeking the date index instead of a DISTINCT over the table.
+    """
+    date_hierarchy = 'date'
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateHierarchyQuerySet(queryset.model, queryset.query.chain(), queryset.db)
+
+
+class RecentPaymentMethodFilter(admin.SimpleListFilter):
+    """Methods of recent payments, found through the date index instead of a DISTINCT over every payment"""
+    title = 'method'
+    parameter_name = 'method'
+    recent_days = 90
+
+    def lookups(self, request, model_admin):
+        since = timezone.now().date() - timedelta(days=self.recent_days)
+        methods = (
+            Payment.objects.filter(date__gte=since).exclude(method=None)
+            .order_by('method').values_list('method', flat=True).distinct()
+        )
+        return [(method, method) for method in methods]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(method=self.value())
+        return queryset
 
 
 @admin.register(Member)
 class MemberAdmin(admin.ModelAdmin):
-    list_display = ['member_code', 'full_name', 'phone', 'ums_count', 'balance', 'registration_date']
+    list_display = ['member_code', 'full_name', 'phone', 'ums_count', 'sessions_remaining', 'membership_expires',
+                    'balance', 'registration_date']
     search_fields = ['member_code', 'full_name', 'phone']
-    list_filter = ['registration_date', 'gender']
+    list_filter = ['branch', 'registration_date', 'gender', 'membership']
+    readonly_fields = ['sessions_remaining']
+
+
+@admin.register(Branch)
+class BranchAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'created_at']
+    search_fields = ['code', 'name']
+
+
+@admin.register(Plan)
+class PlanAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'sessions', 'price', 'validity_days']
 
 
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(DatedAdmin):
     list_display = ['member', 'date', 'present', 'paid_amount', 'submitted_at']
-    list_filter = ['date', 'present']
-    search_fields = ['member__full_name', 'member__phone']
+    list_filter = ['branch', 'date', 'present']
+    # Copied from the member on save
+    readonly_fields = ['branch']
+    # Drilldown filters are date ranges on core_attendance_date_idx; ordering
+    # by date alone lets a page be read from that index without sorting the table
+    ordering = ['-date']
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(DatedAdmin):
     list_display = ['member', 'amount', 'date', 'method']
-    list_filter = ['date', 'method']
-    search_fields = ['member__full_name', 'member__phone']
+    list_filter = ['branch', 'date', RecentPaymentMethodFilter]
+    readonly_fields = ['branch']
+    ordering = ['-date']
 
 
 @admin.register(Checkup)
-class CheckupAdmin(admin.ModelAdmin):
+class CheckupAdmin(MemberRecordAdmin):
     list_display = ['member', 'checkup_date', 'weight', 'height']
     list_filter = ['checkup_date']
-    search_fields = ['member__full_name']
 
 
 @admin.register(Registration)
@@ -39,8 +174,29 @@ class RegistrationAdmin(admin.ModelAdmin):
 
 
 @admin.register(BodyComponentEvaluation)
-class BodyComponentEvaluationAdmin(admin.ModelAdmin):
+class BodyComponentEvaluationAdmin(MemberRecordAdmin):
     list_display = ['member', 'date', 'weight_kg', 'height_cm', 'bmi', 'fat', 'fluids']
     list_filter = ['date']
-    search_fields = ['member__full_name', 'member__phone']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(MemberRecordAdmin):
+    list_display = ['member', 'kind', 'amount', 'date', 'payment', 'created_at']
+    list_filter = ['kind', 'date']
+    # Payment.__str__ shows the payment's member
+    list_select_related = ['member', 'payment__member']
+    readonly_fields = ['member', 'kind', 'amount', 'date', 'payment', 'notes', 'created_at']
+
+
+@admin.register(BalanceSnapshot)
+class BalanceSnapshotAdmin(MemberRecordAdmin):
+    list_display = ['member', 'last_entry_id', 'balance', 'total_paid', 'created_at']
+    readonly_fields = ['member', 'last_entry_id', 'balance', 'total_paid', 'created_at']
+
+
+@admin.register(MemberSummary)
+class MemberSummaryAdmin(admin.ModelAdmin):
+    list_display = ['full_name', 'member_code', 'visit_count', 'last_visit', 'balance', 'weeks_completed', 'refreshed_at']
+    search_fields = ['full_name', 'member_code', 'phone']
+    readonly_fields = [field.name for field in MemberSummary._meta.fields]
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Connect the cache invalidation, member summary, profile image,
+        # checkup schedule, session count and branch signals for every entry
+        # point, including management commands that never load the views
+        from . import branches, cache, images, plans, scheduling, summary  # noqa: F401
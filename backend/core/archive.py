@@ -0,0 +1,201 @@
+"""
+Archival of closed years of attendance and payments.
+
+Day-to-day work only needs the current year and a short tail, so older years
+are moved out of the live tables by `manage.py archive_records`, into one
+gzipped NDJSON file per table and year:
+
+    ARCHIVE_DIR/attendance/2023.ndjson.gz
+    ARCHIVE_DIR/payment/2023.ndjson.gz
+
+A year is archived when its file exists, so checking whether a report range
+reaches into the archive costs a directory listing, not a query. Reports read
+archived years back from the files, and AttendanceRollup keeps each member's
+archived visit totals so member summaries still count them.
+
+The file is written under a ".partial" name, the rows are deleted, and the
+file is renamed into place once the deletion has committed. A crash in between
+leaves a ".partial" file and no live rows for the year; the next run finishes
+the rename.
+"""
+import gzip
+import json
+import os
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import summary
+from .models import Member, Attendance, Payment, LedgerEntry, AttendanceRollup, default_branch
+
+
+ATTENDANCE = 'attendance'
+PAYMENT = 'payment'
+
+MODELS = {ATTENDANCE: Attendance, PAYMENT: Payment}
+FIELDS = {
+    ATTENDANCE: ['id', 'member_id', 'branch_id', 'date', 'present', 'paid_amount', 'submitted_at',
+                 'submitted_by_id', 'notes'],
+    PAYMENT: ['id', 'member_id', 'branch_id', 'amount', 'date', 'method', 'notes', 'created_at'],
+}
+
+SUFFIX = '.ndjson.gz'
+PARTIAL = '.partial'
+
+# Rows deleted per statement
+BATCH_SIZE = 2000
+
+
+def path(kind, year):
+    return Path(settings.ARCHIVE_DIR) / kind / f'{year}{SUFFIX}'
+
+
+def archived_years(kind):
+    """Years of `kind` held in the archive."""
+    try:
+        names = os.listdir(Path(settings.ARCHIVE_DIR) / kind)
+    except FileNotFoundError:
+        return set()
+    return {int(name[:-len(SUFFIX)]) for name in names if name.endswith(SUFFIX) and name[:-len(SUFFIX)].isdigit()}
+
+
+def is_archivable(year):
+    """Whether `year` is closed and older than the years kept live."""
+    return year < timezone.now().year - settings.ARCHIVE_RETAIN_YEARS
+
+
+def overlaps(kind, date_from, date_to):
+    """Whether any day of the inclusive range has been archived."""
+    return any(date_from.year <= year <= date_to.year for year in archived_years(kind))
+
+
+def _decoders(kind):
+    fields = {f.attname: f for f in MODELS[kind]._meta.concrete_fields}
+    return {name: fields[name].to_python for name in FIELDS[kind]}
+
+
+def read(kind, date_from, date_to, branch=None):
+    """
+    Yield archived rows of `kind` dated within the inclusive range, as dicts
+    of field values; only `branch`'s (a Branch or its id) when given. Rows
+    archived before branches existed belong to the default branch.
+    """
+    decoders = _decoders(kind)
+    first, last = date_from.isoformat(), date_to.isoformat()
+    branch_id = getattr(branch, 'pk', branch)
+    unbranched = default_branch() if branch_id is not None else None
+    for year in sorted(archived_years(kind)):
+        if not date_from.year <= year <= date_to.year:
+            continue
+        with gzip.open(path(kind, year), 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                row = json.loads(line)
+                # ISO dates compare as strings; decode only the rows kept
+                if not first <= row['date'] <= last:
+                    continue
+                if branch_id is not None and row.get('branch_id', unbranched) != branch_id:
+                    continue
+                yield {name: decoders[name](value) for name, value in row.items()}
+
+
+def payment_totals():
+    """{member id: amount} of every archived payment, for checks against the ledger."""
+    totals = {}
+    for year in archived_years(PAYMENT):
+        for row in read(PAYMENT, date(year, 1, 1), date(year, 12, 31)):
+            totals[row['member_id']] = totals.get(row['member_id'], 0) + row['amount']
+    return totals
+
+
+def attendances_on(day, branch=None):
+    """Archived present Attendance rows for `day`, unsaved, with their members, ordered by name."""
+    rows = [row for row in read(ATTENDANCE, day, day, branch) if row['present']]
+    members = Member.objects.in_bulk({row['member_id'] for row in rows})
+    attendances = [
+        Attendance(member=members[row['member_id']], **{k: v for k, v in row.items() if k != 'member_id'})
+        for row in rows if row['member_id'] in members
+    ]
+    attendances.sort(key=lambda a: a.member.full_name)
+    return attendances
+
+
+def archive_year(kind, year):
+    """
+    Move the `kind` rows dated in `year` to the archive; returns how many
+    rows were moved. Rows added to an already archived year are merged into
+    its file.
+    """
+    if not is_archivable(year):
+        raise ValueError(f'{year} is not a closed year past the {settings.ARCHIVE_RETAIN_YEARS} kept live')
+
+    model = MODELS[kind]
+    live = model.objects.filter(date__gte=date(year, 1, 1), date__lt=date(year + 1, 1, 1))
+    final = path(kind, year)
+    partial = final.with_name(final.name + PARTIAL)
+    final.parent.mkdir(parents=True, exist_ok=True)
+
+    if partial.exists() and not live.exists():
+        # A previous run committed its deletion but stopped before the rename
+        os.replace(partial, final)
+        return 0
+
+    moved = []
+    rollups = {}
+    with transaction.atomic():
+        with open(partial, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as out:
+                if final.exists():
+                    decoders = _decoders(kind)
+                    with gzip.open(final, 'rt', encoding='utf-8') as previous:
+                        for line in previous:
+                            out.write(line.encode())
+                            row = json.loads(line)
+                            _roll_up(kind, rollups, {name: decoders[name](value) for name, value in row.items()})
+                for row in live.order_by('date', 'id').values(*FIELDS[kind]).iterator(chunk_size=BATCH_SIZE):
+                    out.write((json.dumps(row, cls=DjangoJSONEncoder) + '\n').encode())
+                    _roll_up(kind, rollups, row)
+                    moved.append(row['id'])
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        for start in range(0, len(moved), BATCH_SIZE):
+            ids = moved[start:start + BATCH_SIZE]
+            if kind == PAYMENT:
+                # Ledger entries keep their amounts; the payment itself lives on in the archive
+                LedgerEntry.objects.filter(payment_id__in=ids).update(payment=None)
+            # A plain DELETE: QuerySet.delete() would load every row to send
+            # the summary and cache post_delete signals one row at a time. The
+            # summaries affected are marked stale once per member below.
+            connection = connections[model.objects.db]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+                    f'WHERE id IN ({", ".join(["%s"] * len(ids))})',
+                    ids,
+                )
+
+        if kind == ATTENDANCE:
+            members = set(Member.objects.filter(pk__in=list(rollups)).values_list('pk', flat=True))
+            AttendanceRollup.objects.filter(year=year).delete()
+            AttendanceRollup.objects.bulk_create([
+                AttendanceRollup(member_id=member_id, year=year, **totals)
+                for member_id, totals in rollups.items() if member_id in members
+            ])
+            for member_id in members:
+                summary.mark_stale(member_id)
+
+    os.replace(partial, final)
+    return len(moved)
+
+
+def _roll_up(kind, rollups, row):
+    if kind != ATTENDANCE or not row['present']:
+        return
+    totals = rollups.setdefault(row['member_id'], {'visits': 0, 'last_visit': None, 'paid_amount': 0})
+    totals['visits'] += 1
+    totals['last_visit'] = max(filter(None, (totals['last_visit'], row['date'])))
+    totals['paid_amount'] += row['paid_amount']
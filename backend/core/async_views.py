@@ -0,0 +1,183 @@
+"""
+Async versions of the hot read endpoints, served when the app runs under
+ASGI (see config/asgi.py). They return the same payloads as their DRF
+counterparts in views.py but never park a worker thread on database I/O.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q, Sum
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import branches, cache, outbox, replica, reports
+from .models import Member, Attendance, Checkup, Registration
+from .pdf import arender_pdf
+from .views import (
+    checkup_weeks, week_one_from_evaluation, body_checkup_payload, change_feed_params, change_feed_response,
+)
+
+
+def _is_authenticated(request):
+    # Run the configured DRF authenticators so session, basic and any other
+    # scheme behave exactly as on the sync views.
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    return IsAuthenticated().has_permission(drf_request, None)
+
+
+_ais_authenticated = sync_to_async(_is_authenticated)
+
+
+def _forbidden():
+    return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+
+
+async def _pages(chunks):
+    # The generator runs queries, so advance it on the sync thread; one
+    # hop per page keeps the event loop free while the PDF streams out.
+    advance = sync_to_async(next)
+    while True:
+        chunk = await advance(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def health_check(request):
+    """Health check endpoint for load balancers"""
+    if not await _ais_authenticated(request):
+        return _forbidden()
+    return JsonResponse({'status': 'healthy', 'timestamp': timezone.now()})
+
+
+async def member_search(request):
+    """
+    Search members by name or phone.
+    GET /api/members/search/?q=<term>
+    """
+    search_term = request.GET.get('q', '').strip()
+    if not search_term:
+        return JsonResponse({'detail': 'Search term required'}, status=400)
+
+    branch = branches.current(request)
+
+    async def search():
+        members = Member.objects.for_branch(branch).filter(
+            Q(full_name__icontains=search_term) | Q(phone__icontains=search_term)
+        ).values('id', 'full_name', 'phone', 'registration_date', 'invited_by', 'gender')[:10]
+        return [m async for m in members]
+
+    results = await cache.acached(cache.MEMBER_SEARCH, search_term.lower(), search, scope=cache.branch_scope(branch))
+    return JsonResponse(results, safe=False)
+
+
+@replica.route
+async def dashboard_stats(request):
+    """Get dashboard statistics"""
+    if not await _ais_authenticated(request):
+        return _forbidden()
+
+    today = timezone.now().date()
+    branch = branches.current(request)
+
+    async def stats():
+        members = Member.objects.for_branch(branch)
+        total_members = await members.acount()
+        today_attendance = await Attendance.objects.for_branch(branch).filter(date=today, present=True).acount()
+        totals = await members.aaggregate(total=Sum('balance'))
+        return {
+            'total_members': total_members,
+            'today_attendance': today_attendance,
+            'total_outstanding_balance': float(totals['total'] or 0),
+        }
+
+    return JsonResponse(await cache.acached(cache.DASHBOARD, today, stats, scope=cache.branch_scope(branch)))
+
+
+async def change_feed(request):
+    """
+    Outbox events after a cursor, as NDJSON.
+    GET /api/changes/?after=<id>&wait=25
+    With ?wait= and nothing new, the request holds for up to that many
+    seconds (at most 30) until an event arrives; it holds no worker thread
+    between polls.
+    """
+    if not await _ais_authenticated(request):
+        return _forbidden()
+    try:
+        after, limit, wait, topics = change_feed_params(request.GET)
+    except ValueError:
+        return JsonResponse({'detail': 'after, limit and wait must be non-negative numbers'}, status=400)
+    events = await outbox.await_events(after, wait, limit, branches.current(request), topics)
+    return change_feed_response(events, after)
+
+
+async def body_checkup_data(request, member_id):
+    """
+    Get body checkup data for a specific member organized by weeks.
+    GET /api/body-checkup/<member_id>/
+    """
+    branch = branches.current(request)
+
+    async def payload():
+        member = await Member.objects.for_branch(branch).filter(pk=member_id).afirst()
+        if member is None:
+            raise Http404('No Member matches the given query.')
+
+        checkups = [c async for c in Checkup.objects.filter(member=member).order_by('checkup_date')]
+        weeks, locked_weeks = checkup_weeks(member, checkups)
+
+        if 1 not in weeks:
+            registration = await Registration.objects.filter(member=member).afirst()
+            body_eval = await member.body_evaluations.afirst()
+            weeks[1] = week_one_from_evaluation(member, registration, body_eval)
+
+        return body_checkup_payload(member, weeks, locked_weeks)
+
+    return JsonResponse(await cache.acached(
+        cache.BODY_CHECKUP, (member_id, cache.branch_scope(branch)), payload, scope=member_id,
+    ))
+
+
+@replica.route
+async def generate_daily_report(request):
+    """
+    Generate PDF report for daily attendance.
+    GET /api/report/daily?date=YYYY-MM-DD
+    Tabular pages stream as they are written; a WeasyPrint render runs in
+    the executor pool. Either way the event loop is never blocked.
+    """
+    if not await _ais_authenticated(request):
+        return _forbidden()
+
+    report_date = request.GET.get('date') or timezone.now().date().isoformat()
+
+    branch = branches.current(request)
+    if ('report_daily' in settings.TABULAR_PDF_REPORTS
+            and await sync_to_async(reports.daily_report_fits_tabular)(report_date, branch)):
+        response = StreamingHttpResponse(
+            _pages(replica.stream(reports.daily_report_pdf(report_date, branch))),
+            content_type='application/pdf',
+        )
+        response['Content-Disposition'] = f'attachment; filename="daily_report_{report_date}.pdf"'
+        return response
+
+    attendances = await sync_to_async(lambda: list(reports.daily_attendances(report_date, branch)))()
+
+    context = {
+        'date': report_date,
+        'attendances': attendances,
+        'total_present': len(attendances),
+        'total_received': sum(a.paid_amount for a in attendances),
+        'org_name': 'Membership Management System',
+    }
+
+    html_string = render_to_string('report_daily.html', context)
+    pdf = await arender_pdf(html_string, base_url=request.build_absolute_uri('/'), stylesheet='report_daily')
+
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="daily_report_{report_date}.pdf"'
+    return response
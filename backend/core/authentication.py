@@ -0,0 +1,123 @@
+"""
+Stateless signed tokens for scripted clients and the attendance kiosk.
+
+A token is "<user id>.<expiry>.<key id>.<password stamp>.<signature>", signed
+with HMAC-SHA256.
+Verifying one costs a hash and a dict lookup, where Basic auth runs the full
+PBKDF2 password hash on every request. Keys come from settings.API_TOKEN_KEYS:
+the first signs new tokens and every listed key is accepted, so a key is
+rotated by putting a new one in front and dropping the old one once its
+tokens have expired.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+
+KEYWORD = b'Bearer'
+
+# Users resolved from tokens, kept per process
+PRINCIPAL_CACHE_TTL = 60
+PRINCIPAL_CACHE_LIMIT = 1024
+
+_principals = {}
+
+
+def _keys():
+    """Signing keys by key id, the signing key first."""
+    return _key_table(tuple(settings.API_TOKEN_KEYS or [settings.SECRET_KEY]))
+
+
+@lru_cache(maxsize=4)
+def _key_table(keys):
+    return {hashlib.sha256(key.encode()).hexdigest()[:8]: key.encode() for key in keys}
+
+
+def _sign(key, payload):
+    digest = hmac.new(key, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def _stamp(user):
+    # Changes with the password hash, so a password change revokes old tokens
+    return hashlib.sha256(f'{user.pk}:{user.password}'.encode()).hexdigest()[:8]
+
+
+def issue_token(user, ttl=None):
+    """
+    Sign a token for `user`.
+
+    Returns:
+        (token, expires) - expires is a Unix timestamp
+    """
+    expires = int(time.time()) + (ttl or settings.API_TOKEN_TTL)
+    key_id, key = next(iter(_keys().items()))
+    payload = f'{user.pk}.{expires}.{key_id}.{_stamp(user)}'
+    return f'{payload}.{_sign(key, payload)}', expires
+
+
+def get_principal(user_id):
+    """Return the active user with this id from the process cache, or None."""
+    now = time.monotonic()
+    cached = _principals.get(user_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+    if len(_principals) >= PRINCIPAL_CACHE_LIMIT:
+        _principals.clear()
+    _principals[user_id] = (user, now + PRINCIPAL_CACHE_TTL)
+    return user
+
+
+def forget_principal(sender, instance, **kwargs):
+    _principals.pop(instance.pk, None)
+
+
+post_save.connect(forget_principal, sender=settings.AUTH_USER_MODEL)
+post_delete.connect(forget_principal, sender=settings.AUTH_USER_MODEL)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticate "Authorization: Bearer <token>" headers.
+
+    Returns None for requests without a bearer token so session and Basic
+    authentication still apply to them.
+    """
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != KEYWORD.lower():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+
+        try:
+            payload, signature = auth[1].decode().rsplit('.', 1)
+            user_id, expires, key_id, stamp = payload.split('.')
+            user_id, expires = int(user_id), int(expires)
+        except (UnicodeError, ValueError):
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        key = _keys().get(key_id)
+        if key is None or not hmac.compare_digest(signature, _sign(key, payload)):
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if expires < time.time():
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        user = get_principal(user_id)
+        if user is None or not hmac.compare_digest(stamp, _stamp(user)):
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return user, None
+
+    def authenticate_header(self, request):
+        return KEYWORD.decode()
@@ -0,0 +1,128 @@
+"""
+Branches (centres) sharing one set of tables.
+
+Member, Attendance and Payment carry a branch column, and every index a
+per-branch read needs leads with it:
+
+    core_member_branch_name_idx       (branch_id, full_name)
+    core_member_branch_due_idx        (branch_id, next_checkup_date, id)
+    core_attend_branch_date_idx       (branch_id, date, present, member_id, paid_amount)
+    core_payment_branch_date_idx      (branch_id, date)
+
+so a branch's member list, due checkups or day of attendance is one range
+of an index holding only that branch's rows next to each other - the same
+work as the whole table was with one centre, however many branches there are.
+The attendance index also carries the columns the day counts and range
+summaries read, so those are answered from the index alone.
+
+A request picks its branch with the X-Branch header or ?branch=<code>;
+BranchMiddleware resolves it to request.branch, and viewsets, reports and
+cached reads narrow to it with `for_branch()`. Without one they cover every
+branch, as before branches existed. Attendance and payments take their
+member's branch when inserted; new members take the request's branch, or
+the default one.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.apps import apps as global_apps
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.http import JsonResponse
+
+from .models import Branch, Attendance, Payment, default_branch, forget_default_branch
+
+
+HEADER = 'X-Branch'
+PARAM = 'branch'
+
+# Per process: {code: Branch}; branches are few and rarely change
+_by_code = {}
+
+
+def lookup(code):
+    """The Branch with `code`, or None."""
+    if code not in _by_code:
+        branch = Branch.objects.filter(code=code).first()
+        if branch is None:
+            return None
+        _by_code[code] = branch
+    return _by_code[code]
+
+
+def current(request):
+    """The branch a request is narrowed to, or None for every branch."""
+    return getattr(request, 'branch', None)
+
+
+def branch_id(request):
+    """Id of the branch new members of this request belong to."""
+    branch = current(request)
+    return branch.pk if branch is not None else default_branch()
+
+
+def _code(request):
+    return (request.headers.get(HEADER) or request.GET.get(PARAM) or '').strip().upper()
+
+
+def _unknown(code):
+    return JsonResponse({'detail': f'Unknown branch {code}'}, status=400)
+
+
+class BranchMiddleware:
+    """Set request.branch from the X-Branch header or ?branch=; unknown codes are rejected with 400."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        code = _code(request)
+        request.branch = lookup(code) if code else None
+        if code and request.branch is None:
+            return _unknown(code)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        code = _code(request)
+        request.branch = (_by_code.get(code) or await sync_to_async(lookup)(code)) if code else None
+        if code and request.branch is None:
+            return _unknown(code)
+        return await self.get_response(request)
+
+
+def _record_saving(sender, instance, **kwargs):
+    # Follow the member when it is at hand (also when a record moves to
+    # another member); look it up only if no branch was given. bulk_create
+    # sends no pre_save, so bulk writers set branch themselves
+    if instance.member_id is None:
+        return
+    if instance.branch_id is None or sender.member.is_cached(instance):
+        instance.branch_id = instance.member.branch_id
+
+
+def _branch_changed(sender, **kwargs):
+    _by_code.clear()
+
+
+def _migrated(sender, apps=global_apps, **kwargs):
+    # Also sent after a flush, which empties the branch table
+    if sender.label != 'core':
+        return
+    _by_code.clear()
+    forget_default_branch()
+    try:
+        apps.get_model('core', 'Branch')
+    except LookupError:
+        return  # migrated back to before branches
+    default_branch()
+
+
+for model in (Attendance, Payment):
+    pre_save.connect(_record_saving, sender=model)
+for signal in (post_save, post_delete):
+    signal.connect(_branch_changed, sender=Branch)
+post_migrate.connect(_migrated)
@@ -0,0 +1,221 @@
+"""
+Read-through caching for the hot API reads.
+
+Entries are namespaced and versioned. Each namespace - optionally narrowed
+to a scope such as one member - has a version number stored in the cache
+itself, and invalidating the namespace bumps it: stale entries are never
+read again and age out on their own, so invalidation costs one increment
+whatever the backend and is seen by every worker sharing the cache.
+
+A scoped entry follows both its scope's version and the namespace's, so
+invalidating a scope drops only its entries while invalidating the whole
+namespace drops every scope too.
+
+Member search and the dashboard are cached per branch, under
+branch_scope(branch); a change to one branch's rows drops that branch's
+entries and the every-branch ones (ALL_BRANCHES), not the other branches'.
+
+The model signals at the bottom bump the versions when rows change. Writes
+that bypass signals (queryset.update() with F() expressions) call
+invalidate() themselves.
+"""
+import hashlib
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+
+from . import replica
+from .models import Member, Attendance, Checkup, Registration, BodyComponentEvaluation
+
+
+CACHE_ALIAS = 'default'
+
+# Seconds before an entry expires even if nothing invalidates it
+DEFAULT_TIMEOUT = 300
+
+MEMBER_SEARCH = 'member_search'
+DASHBOARD = 'dashboard'
+BODY_CHECKUP = 'body_checkup'
+
+# Scope of per-branch entries read across every branch
+ALL_BRANCHES = 'all'
+
+# Per process: {namespace: count}
+hits = Counter()
+misses = Counter()
+
+_missing = object()
+
+
+def _version_key(namespace, scope):
+    return f'core:{namespace}:{scope}:version' if scope is not None else f'core:{namespace}:version'
+
+
+def _version_keys(namespace, scope):
+    if scope is None:
+        return [_version_key(namespace, None)]
+    return [_version_key(namespace, None), _version_key(namespace, scope)]
+
+
+def _combine(keys, found):
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def _version(backend, namespace, scope):
+    keys = _version_keys(namespace, scope)
+    found = backend.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Start from the clock, not 1, so a version key evicted and recreated
+            # can never line up with entries written under the old one
+            found[key] = backend.get_or_set(key, time.time_ns, timeout=None)
+    return _combine(keys, found)
+
+
+async def _aversion(backend, namespace, scope):
+    keys = _version_keys(namespace, scope)
+    found = await backend.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            found[key] = await backend.aget_or_set(key, time.time_ns, timeout=None)
+    return _combine(keys, found)
+
+
+def branch_scope(branch):
+    """Scope of an entry read for `branch` (a Branch, its id or None for every branch)."""
+    if branch is None:
+        return ALL_BRANCHES
+    return f'branch-{getattr(branch, "pk", branch)}'
+
+
+def make_key(namespace, scope, parts):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'core:{namespace}:{scope}:{digest}'
+
+
+def _timeout(timeout):
+    # A value read from the replica may predate a write whose invalidation
+    # has already happened; keep it no longer than the replication lag allowance
+    if replica.in_use():
+        return min(timeout, settings.REPLICA_PIN_SECONDS)
+    return timeout
+
+
+def cached(namespace, parts, compute, scope=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached value for `parts` in `namespace`, calling `compute()`
+    and storing its result on a miss.
+
+    Args:
+        namespace: one of the namespace constants above
+        parts: hashable description of the request (search term, date, ...)
+        compute: zero-argument callable producing the value
+        scope: narrows invalidation, e.g. a member id or branch_scope()
+    """
+    backend = caches[CACHE_ALIAS]
+    version = _version(backend, namespace, scope)
+    key = make_key(namespace, scope, parts)
+    value = backend.get(key, _missing, version=version)
+    if value is not _missing:
+        hits[namespace] += 1
+        return value
+
+    misses[namespace] += 1
+    value = compute()
+    backend.set(key, value, _timeout(timeout), version=version)
+    return value
+
+
+async def acached(namespace, parts, compute, scope=None, timeout=DEFAULT_TIMEOUT):
+    """Async variant of cached(); `compute` is a coroutine function."""
+    backend = caches[CACHE_ALIAS]
+    version = await _aversion(backend, namespace, scope)
+    key = make_key(namespace, scope, parts)
+    value = await backend.aget(key, _missing, version=version)
+    if value is not _missing:
+        hits[namespace] += 1
+        return value
+
+    misses[namespace] += 1
+    value = await compute()
+    await backend.aset(key, value, _timeout(timeout), version=version)
+    return value
+
+
+def _bump(namespace, scope):
+    backend = caches[CACHE_ALIAS]
+    try:
+        backend.incr(_version_key(namespace, scope))
+    except ValueError:
+        backend.set(_version_key(namespace, scope), time.time_ns(), timeout=None)
+
+
+def invalidate(namespace, scope=None):
+    """
+    Drop every entry in `namespace` (and `scope`).
+
+    Inside a transaction the version is bumped now, for reads later in the
+    same transaction, and again on commit, so a concurrent reader cannot
+    re-cache rows from before the commit.
+    """
+    _bump(namespace, scope)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(namespace, scope))
+
+
+def stats():
+    """Hit and miss counts per namespace for this process."""
+    return {
+        namespace: {'hits': hits[namespace], 'misses': misses[namespace]}
+        for namespace in (MEMBER_SEARCH, DASHBOARD, BODY_CHECKUP)
+    }
+
+
+def branch_changed(namespace, branch_id):
+    """Invalidate one branch's entries in `namespace` and the every-branch ones."""
+    invalidate(namespace, branch_scope(branch_id))
+    invalidate(namespace, ALL_BRANCHES)
+
+
+def member_changed(member_id, branch_id=None):
+    """Invalidate everything that shows a member's own fields."""
+    members_changed([member_id], None if branch_id is None else [branch_id])
+
+
+def members_changed(member_ids, branch_ids=None):
+    """
+    member_changed() for several members, bumping the shared namespaces once;
+    every branch's entries unless the members' `branch_ids` are given.
+    """
+    for namespace in (MEMBER_SEARCH, DASHBOARD):
+        if branch_ids is None:
+            invalidate(namespace)
+        else:
+            for branch_id in set(branch_ids):
+                branch_changed(namespace, branch_id)
+    for member_id in member_ids:
+        invalidate(BODY_CHECKUP, member_id)
+
+
+def _member_changed(sender, instance, **kwargs):
+    member_changed(instance.pk, instance.branch_id)
+
+
+def _attendance_changed(sender, instance, **kwargs):
+    branch_changed(DASHBOARD, instance.branch_id)
+
+
+def _member_record_changed(sender, instance, **kwargs):
+    if instance.member_id:
+        invalidate(BODY_CHECKUP, instance.member_id)
+
+
+for signal in (post_save, post_delete):
+    signal.connect(_member_changed, sender=Member)
+    signal.connect(_attendance_changed, sender=Attendance)
+    for model in (Checkup, Registration, BodyComponentEvaluation):
+        signal.connect(_member_record_changed, sender=model)
@@ -0,0 +1,87 @@
+"""
+Member code allocation.
+
+Codes are "M" and a zero-padded number ("M0001234"). The fixed width makes
+them sort in allocation order, so new members append at the right edge of
+the member_code index instead of landing at random points in it.
+
+On PostgreSQL numbers come from a sequence that advances BLOCK_SIZE at a
+time. Each nextval() reserves a block of codes for this process, which hands
+them out from memory: most allocations need no query at all, and because
+sequences are not transactional nothing stays locked until commit. Codes
+from a block that is never used, or from a rolled back transaction, are
+skipped, never reused.
+
+Other databases (SQLite in development and tests) count in a CodeCounter
+row inside the caller's transaction.
+"""
+import threading
+
+from django.db import connections, router, transaction
+from django.db.models import F
+
+from .models import CodeCounter, Member
+
+
+PREFIX = 'M'
+WIDTH = 7
+
+SEQUENCE = 'core_member_code_seq'
+BLOCK_SIZE = 50  # the sequence's INCREMENT BY, set in migration 0009
+COUNTER = 'member_code'
+
+_lock = threading.Lock()
+_blocks = {}  # database alias -> (next number, end of block)
+
+
+def format_code(number):
+    return f'{PREFIX}{number:0{WIDTH}d}'
+
+
+def allocate(count):
+    """Reserve `count` new member codes, returned in ascending order."""
+    if count <= 0:
+        return []
+    alias = router.db_for_write(Member)
+    if connections[alias].vendor == 'postgresql':
+        numbers = _from_sequence(alias, count)
+    else:
+        numbers = _from_counter(alias, count)
+    return [format_code(number) for number in numbers]
+
+
+def next_code():
+    """Reserve one new member code."""
+    return allocate(1)[0]
+
+
+def _from_sequence(alias, count):
+    with _lock:
+        start, end = _blocks.get(alias, (0, 0))
+        taken = min(count, end - start)
+        numbers = list(range(start, start + taken))
+        start += taken
+
+        missing = count - taken
+        if missing:
+            blocks = -(-missing // BLOCK_SIZE)
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT nextval(%s) FROM generate_series(1, %s)', [SEQUENCE, blocks])
+                block_starts = sorted(row[0] for row in cursor.fetchall())
+            for block_start in block_starts:
+                taken = min(missing, BLOCK_SIZE)
+                numbers.extend(range(block_start, block_start + taken))
+                missing -= taken
+                start, end = block_start + taken, block_start + BLOCK_SIZE
+
+        _blocks[alias] = (start, end)
+    return numbers
+
+
+def _from_counter(alias, count):
+    with transaction.atomic(using=alias):
+        counters = CodeCounter.objects.using(alias).filter(name=COUNTER)
+        if not counters.update(value=F('value') + count):
+            CodeCounter.objects.using(alias).create(name=COUNTER, value=count)
+        last = counters.values_list('value', flat=True).get()
+    return range(last - count + 1, last + 1)
@@ -0,0 +1,188 @@
+"""
+Profile image pipeline.
+
+A photo uploaded to Member.profile_image is processed once the saving
+transaction commits, in a small thread pool (settings.IMAGE_WORKERS; 0
+processes in the committing thread). The original is re-encoded upright and
+without its EXIF metadata (camera, GPS), capped at ORIGINAL_MAX_SIZE, and
+square thumbnails are written in WebP and JPEG. Every file is stored under a
+name derived from its content:
+
+    profiles/3f9a1c2b7d4e5f60.jpg
+    profiles/thumbs/9b1e0c7a2d3f4e51.webp
+
+Member.profile_thumbnails maps each size to its files, plus the processed
+original under 'source'; an upload whose name differs from 'source' is still
+pending. The files of a replaced photo are deleted once the new ones are
+committed, unless another member has the same photo. `manage.py process_profile_images` picks up uploads whose job was
+lost, e.g. to a restart.
+
+Pillow is imported on the first image processed, not with this module.
+"""
+import hashlib
+import logging
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+
+from . import cache
+from .models import Member
+
+
+logger = logging.getLogger(__name__)
+
+# Thumbnail edge in pixels for each size name
+THUMBNAIL_SIZES = {'small': 96, 'medium': 320}
+# Pillow format and file extension for each thumbnail format
+FORMATS = {'webp': ('WEBP', 'webp'), 'jpeg': ('JPEG', 'jpg')}
+THUMBNAIL_QUALITY = 80
+
+# Longest edge of the stored original; phone photos are several times larger
+ORIGINAL_MAX_SIZE = 2048
+ORIGINAL_QUALITY = 90
+
+ORIGINAL_DIR = 'profiles/'
+THUMBNAIL_DIR = 'profiles/thumbs/'
+
+
+def is_pending(member):
+    """Whether the member has an uploaded photo that has not been processed."""
+    return bool(member.profile_image) and member.profile_image.name != member.profile_thumbnails.get('source')
+
+
+def thumbnail_urls(member):
+    """{size: {format: url}} of the member's processed thumbnails."""
+    return {
+        size: {fmt: default_storage.url(name) for fmt, name in files.items()}
+        for size, files in member.profile_thumbnails.items() if size in THUMBNAIL_SIZES
+    }
+
+
+def _files(thumbnails):
+    """Every stored name in a profile_thumbnails value."""
+    names = {thumbnails['source']} if thumbnails.get('source') else set()
+    for size in THUMBNAIL_SIZES:
+        names.update(thumbnails.get(size, {}).values())
+    return names
+
+
+def _delete_replaced(previous, current):
+    # Names come from content: a member with the same photo shares its files
+    if not previous.get('source') or Member.objects.filter(profile_image=previous['source']).exists():
+        return
+    for name in _files(previous) - _files(current):
+        default_storage.delete(name)
+
+
+def _store(image, directory, fmt, quality):
+    buffer = BytesIO()
+    # No exif= or icc_profile= argument: the encoded file carries no metadata
+    image.save(buffer, FORMATS[fmt][0], quality=quality)
+    content = buffer.getvalue()
+    name = f'{directory}{hashlib.sha256(content).hexdigest()[:16]}.{FORMATS[fmt][1]}'
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(content))
+
+
+def _decode(name):
+    from PIL import Image, ImageOps
+
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        # Let the JPEG decoder scale down by a power of two while decoding
+        image.draft('RGB', (ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE))
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        flat = Image.new('RGB', image.size, 'white')
+        flat.paste(image, mask=image.getchannel('A'))
+        image = flat
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail((ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE), Image.LANCZOS)
+    return image
+
+
+def process(member_id):
+    """
+    Process the member's pending upload; returns the new profile_thumbnails,
+    or None when there was nothing to do or a newer upload replaced it meanwhile.
+    """
+    from PIL import Image, ImageOps
+
+    member = Member.objects.filter(pk=member_id).only('profile_image', 'profile_thumbnails').first()
+    if member is None or not is_pending(member):
+        return None
+    upload = member.profile_image.name
+    previous = member.profile_thumbnails
+
+    image = _decode(upload)
+    thumbnails = {'source': _store(image, ORIGINAL_DIR, 'jpeg', ORIGINAL_QUALITY)}
+    for size, edge in THUMBNAIL_SIZES.items():
+        thumbnail = ImageOps.fit(image, (edge, edge), Image.LANCZOS)
+        thumbnails[size] = {fmt: _store(thumbnail, THUMBNAIL_DIR, fmt, THUMBNAIL_QUALITY) for fmt in FORMATS}
+
+    with transaction.atomic():
+        # Only if the upload is still current; update() sends no post_save, so this does not requeue
+        updated = Member.objects.filter(pk=member_id, profile_image=upload).update(
+            profile_image=thumbnails['source'], profile_thumbnails=thumbnails,
+        )
+        if not updated:
+            return None
+        # After commit, so a rollback leaves the files the row still names
+        transaction.on_commit(lambda: _delete_replaced(previous, thumbnails))
+    if upload != thumbnails['source']:
+        default_storage.delete(upload)
+    cache.member_changed(member_id)
+    return thumbnails
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the shared image worker pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # Pillow releases the GIL while decoding, resizing and encoding
+            _pool = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix='profile-images')
+    return _pool
+
+
+def _run(member_id, in_worker):
+    try:
+        process(member_id)
+    except Exception:
+        logger.exception('Processing the profile image of member %s failed', member_id)
+    finally:
+        if in_worker:
+            # Worker threads outlive requests; do not hold their connection open
+            connection.close()
+
+
+def submit(member_id):
+    """Process the member's photo on the worker pool, or right away without one."""
+    if settings.IMAGE_WORKERS:
+        get_pool().submit(_run, member_id, True)
+    else:
+        _run(member_id, False)
+
+
+def _member_saved(sender, instance, **kwargs):
+    if is_pending(instance):
+        # The worker must see the committed upload
+        transaction.on_commit(lambda: submit(instance.pk))
+
+
+post_save.connect(_member_saved, sender=Member)
@@ -0,0 +1,156 @@
+"""
+Append-only member ledger.
+
+Every balance change goes through `post_entry`, which inserts a LedgerEntry
+and applies the same delta to the denormalised Member.balance/total_paid
+columns with F() expressions, so concurrent writers never lose updates.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from . import cache, summary
+from .models import Member, Payment, LedgerEntry, BalanceSnapshot
+
+
+CHARGE = 'CHARGE'
+PAYMENT = 'PAYMENT'
+ADJUSTMENT = 'ADJUSTMENT'
+
+ZERO = Decimal('0.00')
+
+
+def post_entry(member_id, kind, amount, date=None, payment=None, notes=None, uow=None, branch_id=None):
+    """
+    Append a ledger entry and apply it to the member's cached totals.
+
+    Args:
+        member_id: primary key of the Member
+        kind: CHARGE, PAYMENT or ADJUSTMENT
+        amount: signed effect on the balance (payments are negative)
+        uow: optional UnitOfWork to fold the totals into its single member UPDATE
+        branch_id: the member's branch, if known, to invalidate only its dashboard
+    """
+    amount = Decimal(str(amount))
+    entry = LedgerEntry.objects.create(
+        member_id=member_id,
+        kind=kind,
+        amount=amount,
+        date=date or timezone.now().date(),
+        payment=payment,
+        notes=notes,
+    )
+    deltas = _deltas(kind, amount)
+    if uow is not None:
+        uow.increment(member_id, **deltas)
+        return entry
+
+    updates = {name: F(name) + delta for name, delta in deltas.items()}
+    Member.objects.filter(pk=member_id).update(**updates, updated_at=timezone.now())
+    # update() sends no post_save; the dashboard and summary carry balances
+    if branch_id is None:
+        cache.invalidate(cache.DASHBOARD)
+    else:
+        cache.branch_changed(cache.DASHBOARD, branch_id)
+    summary.mark_stale(member_id)
+    return entry
+
+
+def post_entries(entries, uow):
+    """
+    Bulk form of post_entry() for unsaved LedgerEntry objects: one INSERT,
+    with each entry's effect on the totals staged on `uow`.
+    """
+    LedgerEntry.objects.bulk_create(entries)
+    for entry in entries:
+        uow.increment(entry.member_id, **_deltas(entry.kind, entry.amount))
+    return entries
+
+
+def _deltas(kind, amount):
+    deltas = {'balance': amount}
+    if kind == PAYMENT:
+        deltas['total_paid'] = -amount
+    return deltas
+
+
+def record_charge(member_id, amount, date=None, notes=None, uow=None):
+    """Charge the member (e.g. a plan fee); increases the balance."""
+    return post_entry(member_id, CHARGE, Decimal(str(amount)), date=date, notes=notes, uow=uow)
+
+
+def record_adjustment(member_id, amount, date=None, notes=None, uow=None):
+    """Signed manual correction of the balance."""
+    return post_entry(member_id, ADJUSTMENT, Decimal(str(amount)), date=date, notes=notes, uow=uow)
+
+
+@transaction.atomic
+def record_payment(member_id, amount, date=None, method='cash', notes=None, uow=None, branch_id=None):
+    """
+    Create a Payment and the matching ledger entry; returns the Payment.
+    Passing the member's `branch_id` saves looking it up.
+    """
+    amount = Decimal(str(amount))
+    payment = Payment.objects.create(
+        member_id=member_id,
+        branch_id=branch_id,
+        amount=amount,
+        date=date or timezone.now().date(),
+        method=method,
+        notes=notes,
+    )
+    post_entry(member_id, PAYMENT, -amount, date=payment.date, payment=payment, notes=notes, uow=uow,
+               branch_id=payment.branch_id)
+    return payment
+
+
+def record_payments(payments, uow):
+    """Bulk form of record_payment() for unsaved Payment objects."""
+    Payment.objects.bulk_create(payments)
+    post_entries([
+        LedgerEntry(member_id=p.member_id, kind=PAYMENT, amount=-p.amount, date=p.date, payment=p, notes=p.notes)
+        for p in payments
+    ], uow)
+    return payments
+
+
+def member_totals(member_id, upto=None):
+    """
+    Return (balance, total_paid) computed from the latest snapshot plus
+    the ledger tail after it, optionally only up to entry id `upto`.
+    """
+    snapshot = BalanceSnapshot.objects.filter(member_id=member_id).first()
+    entries = LedgerEntry.objects.filter(member_id=member_id)
+    if upto is not None:
+        entries = entries.filter(id__lte=upto)
+    balance, total_paid, last_entry_id = ZERO, ZERO, 0
+    if snapshot:
+        balance, total_paid, last_entry_id = snapshot.balance, snapshot.total_paid, snapshot.last_entry_id
+        entries = entries.filter(id__gt=last_entry_id)
+
+    tail = entries.aggregate(delta=Sum('amount'), paid=Sum('amount', filter=Q(kind=PAYMENT)))
+    return balance + (tail['delta'] or ZERO), total_paid - (tail['paid'] or ZERO)
+
+
+def take_snapshot(member_id):
+    """
+    Fold the member's ledger tail into a new snapshot.
+    Returns None when there is nothing new since the previous snapshot.
+    """
+    last_entry_id = (
+        LedgerEntry.objects.filter(member_id=member_id)
+        .order_by('-id').values_list('id', flat=True).first()
+    )
+    latest = BalanceSnapshot.objects.filter(member_id=member_id).values_list('last_entry_id', flat=True).first()
+    if last_entry_id is None or last_entry_id == latest:
+        return None
+
+    balance, total_paid = member_totals(member_id, upto=last_entry_id)
+    return BalanceSnapshot(
+        member_id=member_id,
+        last_entry_id=last_entry_id,
+        balance=balance,
+        total_paid=total_paid,
+    )
@@ -0,0 +1,159 @@
+"""
+Logging off the request path.
+
+Loggers hand records to QueueListenerHandler, which only puts them on an
+in-memory queue. A listener thread takes them off and does the formatting
+and disk I/O, so a request never waits on the log file:
+
+    'queue': {
+        '()': 'core.log.QueueListenerHandler',
+        'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+        'filters': ['request_id'],
+    }
+
+dictConfig builds handlers in name order and replaces each handler's config
+with the handler itself, so the handlers a queue feeds must sort before it.
+
+RequestIdMiddleware gives each request an id, taken from a well-formed
+X-Request-ID header or generated, and returns it in the response header.
+RequestIdFilter stamps it on every record logged while the request is
+handled, and JsonFormatter writes one JSON object per line.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import re
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.signals import request_finished
+
+
+HEADER = 'X-Request-ID'
+# Ids accepted from the incoming header; anything else is replaced
+_VALID_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+NO_REQUEST = '-'
+_request_id = contextvars.ContextVar('request_id', default=NO_REQUEST)
+
+# LogRecord attributes that are not extra= fields
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+
+def current_request_id():
+    """Id of the request being handled in this context, or '-'."""
+    return _request_id.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id; runs before the record is queued."""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the request id and any JSON-safe extra= fields."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', NO_REQUEST),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_FIELDS and isinstance(value, (str, int, float, bool, type(None))):
+                entry[name] = value
+        request = getattr(record, 'request', None)
+        if request is not None and hasattr(request, 'path'):
+            entry['method'] = request.method
+            entry['path'] = request.path
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    QueueHandler with its own QueueListener thread writing to `handlers`.
+    Closing the handler, e.g. when logging is reconfigured or at exit, drains
+    the queue first.
+    """
+
+    def __init__(self, handlers, respect_handler_level=True):
+        super().__init__(queue.SimpleQueue())
+        # dictConfig passes a ConvertingList; indexing resolves each cfg:// entry
+        self.targets = [handlers[i] for i in range(len(handlers))]
+        self.listener = QueueListener(self.queue, *self.targets, respect_handler_level=respect_handler_level)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, while args and exc_info still
+        # describe the moment of the call; formatting is left to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            for handler in self.targets:
+                handler.flush()
+        super().close()
+
+
+def _begin(request):
+    incoming = request.headers.get(HEADER, '')
+    request.id = incoming if _VALID_ID.match(incoming) else uuid.uuid4().hex
+    _request_id.set(request.id)
+
+
+class RequestIdMiddleware:
+    """Give each request an id for its log records and return it in the X-Request-ID response header."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        _begin(request)
+        response = self.get_response(request)
+        response[HEADER] = request.id
+        return response
+
+    async def __acall__(self, request):
+        _begin(request)
+        response = await self.get_response(request)
+        response[HEADER] = request.id
+        return response
+
+
+def _request_done(sender, **kwargs):
+    # Kept until now so Django's own 4xx/5xx log line, written after the
+    # middleware returned, still carries the id; cleared for the next request
+    _request_id.set(NO_REQUEST)
+
+
+request_finished.connect(_request_done)
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core import archive
+
+
+class Command(BaseCommand):
+    help = 'Move closed years of attendance and payments from the live tables into the compressed archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            action='append',
+            help='Year to archive (repeatable; default: every closed year past ARCHIVE_RETAIN_YEARS with live rows)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the years that would be archived without moving anything'
+        )
+
+    def handle(self, *args, **options):
+        for kind, model in archive.MODELS.items():
+            if options['year']:
+                years = options['year']
+            else:
+                live = {d.year for d in model.objects.seek_dates('date', 'year')}
+                years = sorted(year for year in live | self._partial_years(kind) if archive.is_archivable(year))
+
+            for year in years:
+                if not archive.is_archivable(year):
+                    raise CommandError(
+                        f'{year} is not a closed year past the {settings.ARCHIVE_RETAIN_YEARS} kept live'
+                    )
+                if options['dry_run']:
+                    self.stdout.write(f'{kind} {year}: would archive')
+                    continue
+                moved = archive.archive_year(kind, year)
+                self.stdout.write(f'{kind} {year}: moved {moved} rows to {archive.path(kind, year)}')
+
+        self.stdout.write(self.style.SUCCESS('Archive up to date'))
+
+    def _partial_years(self, kind):
+        # Years whose previous run stopped before the final rename
+        directory = archive.path(kind, 0).parent
+        if not directory.exists():
+            return set()
+        suffix = archive.SUFFIX + archive.PARTIAL
+        return {int(p.name[:-len(suffix)]) for p in directory.glob(f'*{suffix}') if p.name[:-len(suffix)].isdigit()}
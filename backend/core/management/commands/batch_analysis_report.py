@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from core import replica, reports
+
+
+class Command(BaseCommand):
+    help = 'Render analysis reports for many registrations into one PDF (or a zip of PDFs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', type=int, nargs='+', help='Registration ids')
+        parser.add_argument('--from', dest='date_from', help='First registration date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last registration date (YYYY-MM-DD)')
+        parser.add_argument('--format', choices=['pdf', 'zip'], default='pdf')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=reports.ANALYSIS_CHUNK_SIZE,
+            help='Registrations laid out per WeasyPrint pass'
+        )
+        parser.add_argument('--output', required=True, help='File to write')
+
+    @replica.route
+    def handle(self, *args, **options):
+        date_from = parse_date(options['date_from']) if options['date_from'] else None
+        date_to = parse_date(options['date_to']) if options['date_to'] else None
+        if not (options['ids'] or date_from or date_to):
+            raise CommandError('Pass --ids or a --from/--to date range')
+
+        registrations = reports.batch_registrations(ids=options['ids'], date_from=date_from, date_to=date_to)
+        items, skipped = reports.analysis_reports(registrations)
+        if not items:
+            raise CommandError('No body evaluations found for these registrations')
+
+        content = reports.render_analysis_batch(items, output=options['format'], chunk_size=options['chunk_size'])
+        with open(options['output'], 'wb') as f:
+            f.write(content)
+
+        if skipped:
+            self.stdout.write(
+                self.style.WARNING(f'Skipped registrations without a body evaluation: {skipped}')
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Wrote {len(items)} reports to {options["output"]}')
+        )
@@ -0,0 +1,151 @@
+import asyncio
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+
+DEFAULT_PATHS = ['/api/health/', '/api/members/search/?q=a', '/api/dashboard/stats/']
+
+
+class Command(BaseCommand):
+    help = 'Compare read-endpoint throughput under the WSGI and ASGI handlers with the same worker budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both')
+        parser.add_argument('--workers', type=int, default=4, help='Worker threads available to either handler')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight from the client side')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per path')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable)')
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'both':
+            # Each handler needs its own process: the URLconf picks sync or
+            # async views from ASYNC_VIEWS at import time.
+            for mode in ('wsgi', 'asgi'):
+                self._run_child(mode, options)
+            return
+
+        paths = options['paths'] or DEFAULT_PATHS
+        cookie = self._session_cookie()
+        for path in paths:
+            if options['mode'] == 'wsgi':
+                latencies, wall, peak = self._bench_wsgi(path, cookie, options)
+            else:
+                latencies, wall, peak = asyncio.run(self._bench_asgi(path, cookie, options))
+            self._report(options['mode'], path, latencies, wall, peak)
+
+    def _run_child(self, mode, options):
+        env = dict(os.environ, ASYNC_VIEWS='1' if mode == 'asgi' else '0')
+        args = [
+            sys.executable, sys.argv[0], 'bench_asgi', '--mode', mode,
+            '--workers', str(options['workers']),
+            '--concurrency', str(options['concurrency']),
+            '--requests', str(options['requests']),
+        ]
+        for path in options['paths'] or []:
+            args += ['--path', path]
+        result = subprocess.run(args, env=env, capture_output=True, text=True)
+        self.stdout.write(result.stdout, ending='')
+        if result.returncode:
+            raise CommandError(result.stderr)
+
+    def _session_cookie(self):
+        user, _ = User.objects.get_or_create(username='bench-reader')
+        client = Client()
+        client.force_login(user)
+        return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    def _bench_wsgi(self, path, cookie, options):
+        from config.wsgi import application
+
+        url = urlsplit(path)
+        in_flight = 0
+        peak = 0
+
+        def call():
+            nonlocal in_flight, peak
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie,
+                'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+                'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            statuses = []
+            began = time.perf_counter()
+            in_flight += 1
+            peak = max(peak, in_flight)
+            body = application(environ, lambda status, headers: statuses.append(status))
+            b''.join(body)
+            body.close()
+            in_flight -= 1
+            if not statuses[0].startswith('200'):
+                raise CommandError(f'{path} returned {statuses[0]}')
+            return time.perf_counter() - began
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            began = time.perf_counter()
+            latencies = list(pool.map(lambda _: call(), range(options['requests'])))
+            wall = time.perf_counter() - began
+        return latencies, wall, peak
+
+    async def _bench_asgi(self, path, cookie, options):
+        from config.asgi import application
+
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=options['workers']))
+        url = urlsplit(path)
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        in_flight = 0
+        peak = 0
+
+        async def call():
+            nonlocal in_flight, peak
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(),
+                'query_string': url.query.encode(), 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+            }
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with semaphore:
+                began = time.perf_counter()
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await application(scope, receive, send)
+                in_flight -= 1
+            if statuses[0] != 200:
+                raise CommandError(f'{path} returned {statuses[0]}')
+            return time.perf_counter() - began
+
+        began = time.perf_counter()
+        latencies = await asyncio.gather(*(call() for _ in range(options['requests'])))
+        wall = time.perf_counter() - began
+        return list(latencies), wall, peak
+
+    def _report(self, mode, path, latencies, wall, peak):
+        latencies = sorted(latencies)
+        self.stdout.write(
+            f'{mode.upper():4} {path:32} {len(latencies) / wall:8.1f} req/s  '
+            f'p50 {statistics.median(latencies) * 1000:6.1f} ms  '
+            f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:6.1f} ms  '
+            f'peak in-flight {peak}'
+        )
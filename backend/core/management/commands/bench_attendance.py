@@ -0,0 +1,95 @@
+import statistics
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+from core.models import Member
+
+
+class Command(BaseCommand):
+    help = 'Measure attendance_submit throughput with several desks submitting at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desks', type=int, default=4, help='Number of concurrent desk threads')
+        parser.add_argument('--members', type=int, default=20, help='Members in each submission')
+        parser.add_argument('--submissions', type=int, default=25, help='Submissions per desk')
+        parser.add_argument(
+            '--overlap',
+            action='store_true',
+            help='All desks submit the same members for the same days (maximum contention)'
+        )
+
+    def handle(self, *args, **options):
+        desks = options['desks']
+        submissions = options['submissions']
+        overlap = options['overlap']
+
+        user, _ = User.objects.get_or_create(username='bench-desk')
+        Member.objects.filter(member_code__startswith='BENCH-').delete()
+        members = Member.objects.bulk_create([
+            Member(member_code=f'BENCH-{i:05d}', full_name=f'Bench Member {i}')
+            for i in range(options['members'])
+        ])
+        member_ids = [m.id for m in members]
+        start_day = date(2000, 1, 1)
+
+        barrier = threading.Barrier(desks)
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def desk(index):
+            client = APIClient(HTTP_HOST='localhost')
+            client.force_authenticate(user)
+            ids = member_ids if index % 2 else list(reversed(member_ids))
+            try:
+                barrier.wait()
+                for n in range(submissions):
+                    day = start_day + timedelta(days=n if overlap else index * submissions + n)
+                    payload = {
+                        'date': day.isoformat(),
+                        'entries': [{'member_id': i, 'present': True, 'paid_amount': 1} for i in ids],
+                    }
+                    began = time.perf_counter()
+                    response = client.post('/api/attendance/submit/', payload, format='json')
+                    elapsed = time.perf_counter() - began
+                    with lock:
+                        latencies.append(elapsed)
+                        if response.status_code != 200:
+                            errors.append(response.data)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=desk, args=(i,)) for i in range(desks)]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - began
+
+        # Verify that no update was lost
+        visits = submissions if overlap else desks * submissions
+        expected_paid = Decimal(desks * submissions)
+        lost = Member.objects.filter(pk__in=member_ids).exclude(ums_count=visits, total_paid=expected_paid).count()
+        Member.objects.filter(pk__in=member_ids).delete()
+
+        requests = len(latencies)
+        latencies.sort()
+        self.stdout.write(f'Database: {connection.vendor}')
+        self.stdout.write(f'Desks: {desks}, members/submission: {len(member_ids)}, overlap: {overlap}')
+        self.stdout.write(f'Requests: {requests} in {wall:.2f}s ({requests / wall:.1f} req/s, '
+                          f'{requests * len(member_ids) / wall:.1f} entries/s)')
+        self.stdout.write(f'Latency p50: {statistics.median(latencies) * 1000:.1f} ms, '
+                          f'p95: {latencies[int(requests * 0.95) - 1] * 1000:.1f} ms')
+
+        if errors:
+            raise CommandError(f'{len(errors)} submissions failed, first: {errors[0]}')
+        if lost:
+            raise CommandError(f'{lost} members lost updates')
+        self.stdout.write(self.style.SUCCESS('No lost updates'))
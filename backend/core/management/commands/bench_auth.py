@@ -0,0 +1,54 @@
+import base64
+import secrets
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.request import Request
+from core import authentication
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request authentication cost: Basic (password hash) against signed tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Basic auth requests to time')
+        parser.add_argument('--token-requests', type=int, default=20000, help='Token requests to time')
+
+    def handle(self, *args, **options):
+        # The benchmark user exists only inside this transaction, which is
+        # rolled back, so no account is left behind to log in with
+        try:
+            with transaction.atomic():
+                self._bench(options)
+                transaction.set_rollback(True)
+        finally:
+            authentication._principals.clear()
+
+    def _bench(self, options):
+        password = secrets.token_urlsafe()
+        user = User.objects.create_user(username=f'bench-auth-{secrets.token_hex(4)}', password=password)
+
+        basic = 'Basic ' + base64.b64encode(f'{user.username}:{password}'.encode()).decode()
+        token, _ = authentication.issue_token(user)
+        bearer = f'Bearer {token}'
+
+        self._report('basic (password hash)', self._timed(BasicAuthentication(), basic, options['requests']))
+
+        authenticator = authentication.SignedTokenAuthentication()
+        authentication._principals.clear()
+        self._report('token, cold principal cache', self._timed(authenticator, bearer, 1))
+        self._report('token, warm principal cache', self._timed(authenticator, bearer, options['token_requests']))
+
+    def _timed(self, authenticator, header, count):
+        request = Request(RequestFactory().get('/api/health/', HTTP_AUTHORIZATION=header))
+        began = time.perf_counter()
+        for _ in range(count):
+            user, _ = authenticator.authenticate(request)
+        return (time.perf_counter() - began) / count
+
+    def _report(self, label, seconds):
+        self.stdout.write(f'{label:30} {seconds * 1e6:12.1f} us/request')
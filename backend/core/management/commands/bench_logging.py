@@ -0,0 +1,109 @@
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+from core.log import JsonFormatter, QueueListenerHandler, RequestIdFilter
+
+
+# Loggers written by a request; django.db.backends logs every SQL statement at DEBUG
+LOGGERS = ('django', 'core')
+
+
+class CountingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+class Command(BaseCommand):
+    help = 'Compare request latency with verbose logging written synchronously and through the log queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Requests timed per mode')
+        parser.add_argument('--path', default='/api/members/?page_size=50', help='URL requested')
+        parser.add_argument(
+            '--write-delay',
+            type=float,
+            default=0,
+            help='Milliseconds added to each log write, to model a slow or contended disk'
+        )
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username='bench-desk')
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(user)
+        delay = options['write_delay'] / 1000
+
+        with tempfile.TemporaryDirectory() as directory:
+            def file_handler(name):
+                handler = logging.FileHandler(os.path.join(directory, name), encoding='utf-8')
+                handler.setFormatter(JsonFormatter())
+                if delay:
+                    emit = handler.emit
+                    handler.emit = lambda record: (time.sleep(delay), emit(record))
+                return handler
+
+            sync = file_handler('sync.log')
+            sync.addFilter(RequestIdFilter())
+            queued = QueueListenerHandler([file_handler('queued.log')])
+            queued.addFilter(RequestIdFilter())
+
+            results = {}
+            try:
+                for mode, handler in (('sync', sync), ('queued', queued)):
+                    counter = CountingHandler()
+                    results[mode] = self._run(client, options['path'], options['requests'], [handler, counter])
+                    results[mode]['records'] = counter.count / options['requests']
+            finally:
+                queued.close()
+                sync.close()
+
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:>6}: mean {result["mean"]:.2f} ms, p50 {result["p50"]:.2f} ms, '
+                f'p95 {result["p95"]:.2f} ms, {result["records"]:.0f} log records per request'
+            )
+        saved = results['sync']['mean'] - results['queued']['mean']
+        self.stdout.write(self.style.SUCCESS(
+            f'Queued logging saves {saved:.2f} ms per request '
+            f'({results["sync"]["mean"] / results["queued"]["mean"]:.2f}x)'
+        ))
+
+    def _run(self, client, path, requests, handlers):
+        loggers = [logging.getLogger(name) for name in LOGGERS]
+        saved = [(logger, logger.handlers, logger.level, logger.propagate) for logger in loggers]
+        for logger in loggers:
+            logger.handlers = list(handlers)
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+        connection.force_debug_cursor = True
+        try:
+            client.get(path)  # warm up
+            timings = []
+            for _ in range(requests):
+                began = time.perf_counter()
+                response = client.get(path)
+                timings.append((time.perf_counter() - began) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f'{path} returned {response.status_code}')
+        finally:
+            connection.force_debug_cursor = False
+            for logger, handlers_before, level, propagate in saved:
+                logger.handlers = handlers_before
+                logger.setLevel(level)
+                logger.propagate = propagate
+        timings.sort()
+        return {
+            'mean': statistics.mean(timings),
+            'p50': timings[len(timings) // 2],
+            'p95': timings[int(len(timings) * 0.95)],
+        }
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from core import pdf
+from core.reports import DAILY_REPORT_COLUMNS
+from core.tabular_pdf import TablePDF
+
+
+class Command(BaseCommand):
+    help = 'Measure daily report PDFs per second: WeasyPrint cold, warm and pooled renders against the tabular writer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=40, help='PDFs to render per mode')
+        parser.add_argument('--rows', type=int, default=50, help='Attendance rows per report')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Renderer pool size')
+
+    def handle(self, *args, **options):
+        attendances = self._attendances(options['rows'])
+        html_string = self._report_html(attendances)
+        reports = options['reports']
+        workers = options['workers']
+
+        self._report('tabular writer (streamed)', reports, 1, self._timed(lambda: self._tabular(attendances), reports))
+        self._report('cold (parse CSS + fonts each time)', reports, 1, self._timed(lambda: self._cold(html_string), reports))
+        self._report('warm in-process', reports, 1, self._timed(lambda: pdf._render(html_string, None, 'report_daily'), reports))
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=pdf._init_worker,
+        )
+        with pool:
+            # Start every worker (and its warm-up) before timing
+            wait([pool.submit(pdf._render, '<p></p>') for _ in range(workers)])
+            began = time.perf_counter()
+            wait([pool.submit(pdf._render, html_string, None, 'report_daily') for _ in range(reports)])
+            self._report(f'pool x{workers}', reports, workers, time.perf_counter() - began)
+
+    def _cold(self, html_string):
+        # core.pdf imports WeasyPrint lazily and keeps no module-level handles to it
+        from weasyprint import CSS, HTML
+        from weasyprint.text.fonts import FontConfiguration
+
+        fonts = FontConfiguration()
+        css = CSS(filename=finders.find(pdf.REPORT_STYLESHEETS['report_daily']), font_config=fonts)
+        return HTML(string=html_string).write_pdf(stylesheets=[css], font_config=fonts)
+
+    def _timed(self, render, count):
+        render()  # first render pays one-off import costs
+        began = time.perf_counter()
+        for _ in range(count):
+            render()
+        return time.perf_counter() - began
+
+    def _report(self, label, count, cores, elapsed):
+        rate = count / elapsed
+        self.stdout.write(f'{label:38} {rate:7.2f} PDFs/s  {rate / cores:7.2f} PDFs/s/core')
+
+    def _tabular(self, attendances):
+        doc = TablePDF('Daily Attendance Report', 'Membership Management System')
+        rows = (
+            (i, a.member.member_code, a.member.full_name, a.member.phone, a.member.ums_count, f'Rs. {a.paid_amount}')
+            for i, a in enumerate(attendances, 1)
+        )
+        chunks = [*doc.heading(['Date: today']), *doc.table(DAILY_REPORT_COLUMNS, rows), *doc.close()]
+        return b''.join(chunks)
+
+    def _attendances(self, rows):
+        return [
+            SimpleNamespace(
+                member=SimpleNamespace(
+                    member_code=f'M{i:05d}', full_name=f'Member {i}', phone=f'9{i:09d}', ums_count=i % 26
+                ),
+                paid_amount=Decimal(i % 5 * 100),
+            )
+            for i in range(rows)
+        ]
+
+    def _report_html(self, attendances):
+        return render_to_string('report_daily.html', {
+            'date': date.today().isoformat(),
+            'attendances': attendances,
+            'total_present': len(attendances),
+            'total_received': sum(a.paid_amount for a in attendances),
+            'org_name': 'Membership Management System',
+        })
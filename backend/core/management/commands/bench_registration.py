@@ -0,0 +1,70 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+from core.models import Member
+
+
+def guest(n):
+    return {
+        'registration': {
+            'guest_name': f'Bench Guest {n}', 'mobile_number': f'BENCH{n:07d}', 'invited_by': 'Bench',
+            'gender': 'Female', 'membership': 'UMS', 'occupation': 'Bench', 'age': 30,
+            'do_you_exercise': 'Walking', 'hours_sleep': '7', 'liters_water': '2L', 'loss_of_energy': 'No',
+            'transformation_targets': 'Weight Targets', 'tried_diet_programs': False,
+            'surveyed_by': 'Bench', 'available_time': '8-11 AM', 'initial_amount_paid': 1000,
+        },
+        'body_evaluation': {'height_cm': 160, 'weight_kg': 70, 'visceral_fat': 12, 'body_fat_women': 30},
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare registering guests one request at a time with the bulk registration endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--guests', type=int, default=100, help='Guests registered by each path')
+        parser.add_argument('--batch', type=int, default=100, help='Guests per bulk request')
+
+    def _clear(self):
+        Member.objects.filter(phone__startswith='BENCH').delete()
+
+    def handle(self, *args, **options):
+        guests = options['guests']
+        batch = options['batch']
+
+        user, _ = User.objects.get_or_create(username='bench-desk')
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(user)
+        self._clear()
+
+        try:
+            began = time.perf_counter()
+            for n in range(guests):
+                response = client.post('/api/registrations/', guest(n), format='json')
+                if response.status_code != 201:
+                    raise CommandError(f'Registration failed: {response.data}')
+            single = time.perf_counter() - began
+            self._clear()
+
+            began = time.perf_counter()
+            for start in range(0, guests, batch):
+                items = [guest(n) for n in range(start, min(start + batch, guests))]
+                response = client.post('/api/registrations/bulk/', items, format='json')
+                if response.status_code != 201:
+                    raise CommandError(f'Bulk registration failed: {response.data}')
+            bulk = time.perf_counter() - began
+
+            registered = Member.objects.filter(phone__startswith='BENCH').count()
+        finally:
+            self._clear()
+
+        if registered != guests:
+            raise CommandError(f'Expected {guests} members from the bulk path, found {registered}')
+
+        self.stdout.write(f'Database: {connection.vendor}')
+        self.stdout.write(f'Guests: {guests}, batch size: {batch}')
+        self.stdout.write(f'{"single requests":<16} {single:7.2f}s  {guests / single:8.1f} guests/s')
+        self.stdout.write(f'{"bulk requests":<16} {bulk:7.2f}s  {guests / bulk:8.1f} guests/s')
+        self.stdout.write(self.style.SUCCESS(f'Bulk speedup: {single / bulk:.1f}x'))
@@ -0,0 +1,80 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from core.models import Member
+from core import branches, cache, replica, scheduling
+
+
+# Rows read per query; memory use does not grow with the number of members due
+BATCH_SIZE = 1000
+
+COLUMNS = ('member_code', 'full_name', 'phone', 'next_checkup_date', 'week', 'days_overdue')
+
+
+class Command(BaseCommand):
+    help = "Write the day's body checkup reminder list (members due or overdue) as CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to list reminders for (YYYY-MM-DD, default today)')
+        parser.add_argument('--output', help='File to write (default: standard output)')
+        parser.add_argument('--branch', help='Branch code to list (default: every branch)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows read per query')
+        parser.add_argument(
+            '--reschedule',
+            action='store_true',
+            help='Recompute every next checkup date first, e.g. after editing checkups outside the app'
+        )
+
+    @replica.route
+    def handle(self, *args, **options):
+        day = timezone.localdate()
+        if options['date']:
+            day = parse_date(options['date'])
+            if day is None:
+                raise CommandError('--date must be YYYY-MM-DD')
+        batch_size = max(1, options['batch_size'])
+        branch = None
+        if options['branch']:
+            branch = branches.lookup(options['branch'].upper())
+            if branch is None:
+                raise CommandError(f'Unknown branch {options["branch"]}')
+
+        if options['reschedule']:
+            self._reschedule(batch_size, branch)
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else self.stdout
+        due = overdue = 0
+        try:
+            writer = csv.writer(output, lineterminator='\n')
+            writer.writerow(COLUMNS)
+            for row in scheduling.iter_due(day, batch_size, branch):
+                row['days_overdue'] = (day - row['next_checkup_date']).days
+                writer.writerow([row[column] for column in COLUMNS])
+                if row['days_overdue']:
+                    overdue += 1
+                else:
+                    due += 1
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(f'{day}: {due} members due today, {overdue} overdue'))
+
+    def _reschedule(self, batch_size, branch):
+        last_id = 0
+        rescheduled = 0
+        while True:
+            members = list(
+                Member.objects.for_branch(branch).filter(pk__gt=last_id).order_by('pk')
+                .only('registration_date', 'branch')[:batch_size]
+            )
+            if not members:
+                break
+            scheduling.reschedule(members)
+            # bulk_update sends no post_save
+            cache.members_changed([member.pk for member in members], [member.branch_id for member in members])
+            rescheduled += len(members)
+            last_id = members[-1].pk
+        self.stderr.write(f'Rescheduled {rescheduled} members')
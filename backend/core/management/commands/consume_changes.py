@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import branches, outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Write outbox events the named consumer has not handled yet as NDJSON, oldest first, "
+        "and move its cursor past them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Consumer name; each keeps its own cursor (e.g. accounting, reminders)')
+        parser.add_argument('--output', help='File to append to (default: standard output)')
+        parser.add_argument('--topic', action='append', default=[], help='Only this topic (repeatable)')
+        parser.add_argument('--branch', help='Branch code to follow (default: every branch)')
+        parser.add_argument('--batch-size', type=int, default=outbox.READ_LIMIT, help='Events read per query')
+        parser.add_argument('--follow', action='store_true', help='Keep waiting for new events instead of exiting')
+        parser.add_argument('--wait', type=float, default=25, help='Seconds each wait lasts with --follow')
+        parser.add_argument('--from', dest='start', type=int, help='Set the cursor to this event id first')
+        parser.add_argument(
+            '--prune-days',
+            type=int,
+            help='Afterwards, delete events older than this many days that every consumer has handled'
+        )
+
+    def handle(self, *args, **options):
+        name = options['name']
+        batch_size = max(1, options['batch_size'])
+        branch = None
+        if options['branch']:
+            branch = branches.lookup(options['branch'].upper())
+            if branch is None:
+                raise CommandError(f'Unknown branch {options["branch"]}')
+        if options['start'] is not None:
+            outbox.advance(name, options['start'])
+
+        cursor = outbox.position(name)
+        handled = 0
+        output = open(options['output'], 'a', encoding='utf-8') if options['output'] else self.stdout
+        try:
+            while True:
+                timeout = options['wait'] if options['follow'] else 0
+                events = outbox.wait(cursor, timeout, batch_size, branch, options['topic'])
+                if events:
+                    for event in events:
+                        output.write(outbox.as_json(event) + '\n')
+                    output.flush()
+                    # Written before the cursor moves: after a crash the batch is
+                    # sent again, so consumers skip ids they have already seen
+                    cursor = events[-1].pk
+                    outbox.advance(name, cursor)
+                    handled += len(events)
+                elif not options['follow']:
+                    break
+                elif timeout <= 0:
+                    time.sleep(outbox.POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(f'{name}: {handled} events, cursor at {cursor}'))
+        if options['prune_days'] is not None:
+            pruned = outbox.prune(timezone.now() - timedelta(days=options['prune_days']))
+            self.stderr.write(f'Pruned {pruned} events')
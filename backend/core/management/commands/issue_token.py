@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from core.authentication import issue_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed API token for a user (for scripted clients and the kiosk)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--ttl',
+            type=int,
+            default=None,
+            help='Lifetime in seconds (defaults to API_TOKEN_TTL)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'], is_active=True)
+        except User.DoesNotExist:
+            raise CommandError(f'No active user named {options["username"]}')
+
+        token, expires = issue_token(user, ttl=options['ttl'])
+        self.stdout.write(token)
+        self.stderr.write(f'Expires {datetime.fromtimestamp(expires, timezone.utc):%Y-%m-%d %H:%M} UTC')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from core.models import Member
+from core import images
+
+
+class Command(BaseCommand):
+    help = 'Strip metadata from pending profile photo uploads and generate their thumbnails'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'member_ids',
+            nargs='*',
+            type=int,
+            help='Members to process (default: every member with a pending upload)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Reprocess processed photos too, e.g. after THUMBNAIL_SIZES changed'
+        )
+
+    def handle(self, *args, **options):
+        members = Member.objects.exclude(profile_image='').exclude(profile_image=None).order_by('pk')
+        if options['member_ids']:
+            members = members.filter(pk__in=options['member_ids'])
+        members = members.only('profile_image', 'profile_thumbnails')
+
+        processed = failed = 0
+        for member in members.iterator():
+            if options['all'] and not images.is_pending(member):
+                # Mark the photo pending again; it is re-encoded as its own source
+                Member.objects.filter(pk=member.pk).update(profile_thumbnails={})
+            elif not images.is_pending(member):
+                continue
+            try:
+                if images.process(member.pk) is not None:
+                    processed += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'Member {member.pk}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} profile images'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} could not be processed'))
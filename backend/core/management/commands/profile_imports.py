@@ -0,0 +1,58 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from core import startup
+
+
+class Command(BaseCommand):
+    help = 'Profile import time of a cold manage.py command or of worker start-up plus a first request'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'target',
+            nargs='*',
+            help='manage.py command and arguments to profile (default: check)'
+        )
+        parser.add_argument(
+            '--request',
+            metavar='PATH',
+            help='Profile django.setup() and a first GET of PATH instead of a command'
+        )
+        parser.add_argument('--top', type=int, default=20, help='Number of modules and packages listed')
+
+    def handle(self, *args, **options):
+        try:
+            if options['request']:
+                profile = startup.profile_first_request(options['request'])
+                title = f'first request to {options["request"]}'
+            else:
+                target = options['target'] or ['check']
+                profile = startup.profile_command(*target)
+                title = f'manage.py {" ".join(target)}'
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        imports = profile.imports
+        total_ms = sum(i.self_us for i in imports) / 1000
+        self.stdout.write(f'Cold start of {title}: {profile.seconds * 1000:.0f} ms wall, '
+                          f'{total_ms:.0f} ms in {len(imports)} imports')
+        if options['request']:
+            self.stdout.write(f'django.setup(): {profile.result["setup"] * 1000:.0f} ms, '
+                              f'request: {profile.result["request"] * 1000:.0f} ms (status {profile.result["status"]})')
+
+        self.stdout.write(f'\nSlowest imports (cumulative ms, self ms):')
+        for i in sorted(imports, key=lambda i: i.cumulative_us, reverse=True)[:options['top']]:
+            self.stdout.write(f'  {i.cumulative_us / 1000:8.1f} {i.self_us / 1000:8.1f}  {i.module}')
+
+        packages = Counter()
+        for i in imports:
+            packages[i.module.split('.')[0]] += i.self_us
+        self.stdout.write(f'\nTime per top-level package (self ms):')
+        for package, self_us in packages.most_common(options['top']):
+            self.stdout.write(f'  {self_us / 1000:8.1f}  {package}')
+
+        heavy = startup.heavy(imports)
+        if heavy:
+            self.stdout.write(self.style.WARNING(f'\nReport-only libraries loaded: {", ".join(heavy)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nNo report-only libraries loaded'))
@@ -0,0 +1,75 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q, Sum
+from core.models import Member, Payment, LedgerEntry
+from core import archive, ledger
+
+
+ZERO = Decimal('0.00')
+
+
+def _totals_by_member(rows):
+    """Turn a member_id-ordered stream of aggregate rows into a lookahead reader."""
+    rows = iter(rows)
+    current = next(rows, None)
+
+    def take(member_id):
+        nonlocal current
+        while current is not None and current['member_id'] < member_id:
+            current = next(rows, None)
+        if current is not None and current['member_id'] == member_id:
+            return current
+        return None
+
+    return take
+
+
+class Command(BaseCommand):
+    help = 'Check the member ledger against Payment rows and cached member balances'
+
+    def handle(self, *args, **options):
+        # Three member_id-ordered streams merged in a single pass, plus the
+        # payments moved to the archive, whose ledger entries stay live
+        archived = archive.payment_totals()
+        members = Member.objects.order_by('id').values('id', 'full_name', 'balance', 'total_paid')
+        payments = _totals_by_member(
+            Payment.objects.order_by('member_id').values('member_id')
+            .annotate(total=Sum('amount')).iterator()
+        )
+        entries = _totals_by_member(
+            LedgerEntry.objects.order_by('member_id').values('member_id')
+            .annotate(balance=Sum('amount'), paid=Sum('amount', filter=Q(kind=ledger.PAYMENT)))
+            .iterator()
+        )
+
+        checked = 0
+        mismatches = 0
+        for member in members.iterator():
+            checked += 1
+            payment_row = payments(member['id'])
+            entry_row = entries(member['id'])
+
+            paid_in_payments = (payment_row['total'] if payment_row else ZERO) + archived.get(member['id'], ZERO)
+            ledger_balance = (entry_row['balance'] or ZERO) if entry_row else ZERO
+            ledger_paid = -(entry_row['paid'] or ZERO) if entry_row else ZERO
+
+            problems = []
+            if ledger_paid != paid_in_payments:
+                problems.append(f'ledger payments {ledger_paid} != Payment total {paid_in_payments}')
+            if ledger_balance != member['balance']:
+                problems.append(f'ledger balance {ledger_balance} != cached balance {member["balance"]}')
+            if ledger_paid != member['total_paid']:
+                problems.append(f'ledger paid {ledger_paid} != cached total_paid {member["total_paid"]}')
+
+            if problems:
+                mismatches += 1
+                self.stdout.write(
+                    self.style.WARNING(f'Member {member["id"]} ({member["full_name"]}): ' + '; '.join(problems))
+                )
+
+        if mismatches:
+            raise CommandError(f'{mismatches} of {checked} members do not reconcile')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'All {checked} members reconcile')
+        )
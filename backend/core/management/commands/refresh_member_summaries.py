@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from core.models import Member
+from core import summary
+
+
+# Members rebuilt per round of queries
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Rebuild MemberSummary rows (all members, or the given ids)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'member_ids',
+            nargs='*',
+            type=int,
+            help='Members to rebuild (default: every member)'
+        )
+
+    def handle(self, *args, **options):
+        member_ids = options['member_ids'] or list(Member.objects.order_by('pk').values_list('pk', flat=True))
+
+        refreshed_count = 0
+        for start in range(0, len(member_ids), BATCH_SIZE):
+            refreshed_count += summary.refresh_many(member_ids[start:start + BATCH_SIZE])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Refreshed {refreshed_count} member summaries')
+        )
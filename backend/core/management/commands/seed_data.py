@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from core.models import Member
+from core import ledger
 from decimal import Decimal
 import random
 
@@ -42,15 +43,16 @@ class Command(BaseCommand):
             
             # Check if member already exists
             if not Member.objects.filter(member_code=member_code).exists():
-                Member.objects.create(
+                member = Member.objects.create(
                     member_code=member_code,
                     full_name=name,
                     phone=phone,
                     gender=gender,
-                    balance=balance,
                     ums_count=ums_count,
                     invited_by=f"Referral {random.randint(1, 10)}"
                 )
+                if balance:
+                    ledger.record_adjustment(member.id, balance, notes='Opening balance')
                 created_count += 1
         
         # Create a superuser if it doesn't exist
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from core.models import BalanceSnapshot, LedgerEntry
+from core import ledger
+
+
+class Command(BaseCommand):
+    help = 'Fold each member\'s ledger tail into a new balance snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of snapshots to insert per query'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        member_ids = (
+            LedgerEntry.objects.order_by('member_id')
+            .values_list('member_id', flat=True).distinct()
+        )
+
+        created_count = 0
+        batch = []
+        for member_id in member_ids.iterator():
+            snapshot = ledger.take_snapshot(member_id)
+            if snapshot is None:
+                continue
+            batch.append(snapshot)
+            if len(batch) >= batch_size:
+                BalanceSnapshot.objects.bulk_create(batch)
+                created_count += len(batch)
+                batch = []
+
+        BalanceSnapshot.objects.bulk_create(batch)
+        created_count += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {created_count} balance snapshots')
+        )
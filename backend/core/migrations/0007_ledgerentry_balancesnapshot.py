@@ -0,0 +1,78 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    Seed the ledger from existing data: one PAYMENT entry per Payment and an
+    opening ADJUSTMENT so the ledger total matches each member's balance.
+    """
+    Member = apps.get_model('core', 'Member')
+    Payment = apps.get_model('core', 'Payment')
+    LedgerEntry = apps.get_model('core', 'LedgerEntry')
+
+    batch = []
+    for member in Member.objects.order_by('id').iterator():
+        paid = 0
+        for payment in Payment.objects.filter(member_id=member.id).order_by('date', 'id'):
+            paid += payment.amount
+            batch.append(LedgerEntry(
+                member_id=member.id, kind='PAYMENT', amount=-payment.amount,
+                date=payment.date, payment_id=payment.id, notes=payment.notes,
+            ))
+        opening = member.balance + paid
+        if opening:
+            batch.append(LedgerEntry(
+                member_id=member.id, kind='ADJUSTMENT', amount=opening,
+                date=member.registration_date, notes='Opening balance',
+            ))
+        if len(batch) >= 500:
+            LedgerEntry.objects.bulk_create(batch)
+            batch = []
+    LedgerEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_registration_number_of_days_alter_member_membership_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('CHARGE', 'Charge'), ('PAYMENT', 'Payment'), ('ADJUSTMENT', 'Adjustment')], max_length=16)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('date', models.DateField(default=django.utils.timezone.now)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='core.member')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='core.payment')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['member', 'id'], name='ledger_member_id_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_entry_id', models.BigIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_paid', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='core.member')),
+            ],
+            options={
+                'ordering': ['-last_entry_id'],
+                'indexes': [models.Index(fields=['member', '-last_entry_id'], name='snapshot_member_entry_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
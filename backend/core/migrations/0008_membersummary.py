@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:47
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_ledgerentry_balancesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSummary',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='core.member')),
+                ('member_code', models.CharField(db_index=True, max_length=32)),
+                ('full_name', models.CharField(max_length=255)),
+                ('phone', models.CharField(blank=True, db_index=True, max_length=32, null=True)),
+                ('gender', models.CharField(blank=True, max_length=16, null=True)),
+                ('membership', models.CharField(blank=True, choices=[('TRIAL', 'Trial'), ('UMS', 'UMS'), ('COMPLEMENT', 'Complement'), ('OTHERS', 'Others')], max_length=16, null=True)),
+                ('membership_total_sessions', models.IntegerField(default=0)),
+                ('ums_count', models.IntegerField(default=0)),
+                ('registration_id', models.IntegerField(blank=True, null=True)),
+                ('registration_date', models.DateField(blank=True, null=True)),
+                ('invited_by', models.CharField(blank=True, max_length=255, null=True)),
+                ('age', models.IntegerField(blank=True, null=True)),
+                ('visit_count', models.IntegerField(default=0)),
+                ('last_visit', models.DateField(blank=True, null=True)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('latest_checkup_date', models.DateField(blank=True, null=True)),
+                ('latest_weight', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('latest_height', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('start_weight', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('weight_trend', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('latest_evaluation', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('weeks_completed', models.IntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
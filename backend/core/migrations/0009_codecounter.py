@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:05
+
+from django.db import migrations, models
+
+
+# Must match core.codes
+SEQUENCE = 'core_member_code_seq'
+BLOCK_SIZE = 50
+CODE_REGEX = r'^M[0-9]{7}$'
+
+
+def create_member_code_series(apps, schema_editor):
+    # Continue after any codes already in the allocator's format
+    Member = apps.get_model('core', 'Member')
+    highest = (
+        Member.objects.filter(member_code__regex=CODE_REGEX)
+        .order_by('-member_code').values_list('member_code', flat=True).first()
+    )
+    start = int(highest[1:]) + 1 if highest else 1
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE} INCREMENT BY {BLOCK_SIZE} START WITH {start}'
+        )
+    else:
+        CodeCounter = apps.get_model('core', 'CodeCounter')
+        CodeCounter.objects.update_or_create(name='member_code', defaults={'value': start - 1})
+
+
+def drop_member_code_series(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP SEQUENCE IF EXISTS {SEQUENCE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_membersummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeCounter',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_member_code_series, drop_member_code_series),
+    ]
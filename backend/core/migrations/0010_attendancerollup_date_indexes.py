@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_codecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('visits', models.IntegerField(default=0)),
+                ('last_visit', models.DateField(blank=True, null=True)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='core_attendance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['date'], name='core_payment_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='attendancerollup',
+            name='member',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='core.member'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='attendancerollup',
+            unique_together={('member', 'year')},
+        ),
+    ]
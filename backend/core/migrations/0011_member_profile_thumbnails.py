@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_attendancerollup_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='profile_thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import DatabaseError, migrations, transaction
+
+
+INDEX = 'core_member_search_trgm_idx'
+
+
+def create_member_search_index(apps, schema_editor):
+    # Trigram index serving the icontains lookups of member searches, which
+    # Django writes as UPPER(column::text) LIKE UPPER(%s). pg_trgm ships with
+    # PostgreSQL's contrib modules; without it, searches scan the member table.
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX} ON core_member USING gin '
+        '(UPPER(full_name) gin_trgm_ops, UPPER(phone) gin_trgm_ops, UPPER(member_code) gin_trgm_ops)'
+    )
+
+
+def drop_member_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_member_profile_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_member_search_index, drop_member_search_index),
+    ]
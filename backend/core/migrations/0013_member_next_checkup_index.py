@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:26
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+# Members scheduled per round of queries
+BATCH_SIZE = 2000
+PROGRAM_WEEKS = 16
+
+
+def schedule_checkups(apps, schema_editor):
+    # Same rule as core.scheduling.next_checkup_date, kept here so the
+    # migration does not change with the app code
+    Member = apps.get_model('core', 'Member')
+    Checkup = apps.get_model('core', 'Checkup')
+    last_id = 0
+    while True:
+        members = list(Member.objects.filter(pk__gt=last_id).order_by('pk').only('registration_date')[:BATCH_SIZE])
+        if not members:
+            return
+        last_id = members[-1].pk
+        latest = dict(
+            Checkup.objects.filter(member_id__in=[m.pk for m in members])
+            .values('member_id').annotate(last=models.Max('checkup_date')).values_list('member_id', 'last')
+        )
+        for member in members:
+            week = 1
+            if member.pk in latest:
+                week = max(1, (latest[member.pk] - member.registration_date).days // 7 + 1)
+            member.next_checkup_date = member.registration_date + timedelta(weeks=week) if week < PROGRAM_WEEKS else None
+        Member.objects.bulk_update(members, ['next_checkup_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_member_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_checkups, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('next_checkup_date__isnull', False)), fields=['next_checkup_date', 'id'], name='core_member_next_checkup_idx'),
+        ),
+    ]
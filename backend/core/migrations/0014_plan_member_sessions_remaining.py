@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:30
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# The totals registration used before plans were data
+PLANS = [
+    ('TRIAL', 'Trial', 3, Decimal('700')),
+    ('UMS', 'UMS', 26, Decimal('5400')),
+    ('COMPLEMENT', 'Complement', 1, Decimal('0')),
+    # Sessions and price are entered at registration
+    ('OTHERS', 'Others', None, None),
+]
+
+
+def create_plans(apps, schema_editor):
+    Plan = apps.get_model('core', 'Plan')
+    Plan.objects.bulk_create([Plan(code=code, name=name, sessions=sessions, price=price)
+                              for code, name, sessions, price in PLANS])
+    Member = apps.get_model('core', 'Member')
+    Member.objects.filter(membership_total_sessions__gt=0).update(
+        sessions_remaining=models.F('membership_total_sessions') - models.F('ums_count'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_member_next_checkup_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Plan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=16, unique=True)),
+                ('name', models.CharField(max_length=64)),
+                ('sessions', models.IntegerField(blank=True, null=True)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('validity_days', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['code'],
+            },
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='membership_expires',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='sessions_remaining',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(create_plans, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('sessions_remaining__isnull', False)), fields=['sessions_remaining'], name='core_member_sessions_left_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('membership_expires__isnull', False)), fields=['membership_expires'], name='core_member_expires_idx'),
+        ),
+    ]
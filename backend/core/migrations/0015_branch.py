@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+DEFAULT_BRANCH = 'MAIN'
+
+
+def assign_default_branch(apps, schema_editor):
+    # Every existing row belongs to the one centre there was; one UPDATE per table
+    Branch = apps.get_model('core', 'Branch')
+    branch, _ = Branch.objects.get_or_create(code=DEFAULT_BRANCH, defaults={'name': 'Main'})
+    for name in ('Member', 'Attendance', 'Payment'):
+        apps.get_model('core', name).objects.filter(branch__isnull=True).update(branch=branch)
+
+
+class Migration(migrations.Migration):
+    # The columns become NOT NULL in 0016: on PostgreSQL the backfill's
+    # deferred foreign key checks must commit before the tables are altered again
+
+    dependencies = [
+        ('core', '0014_plan_member_sessions_remaining'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Branch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=16, unique=True)),
+                ('name', models.CharField(max_length=128)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'branches',
+                'ordering': ['code'],
+            },
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='branch',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='members', to='core.branch'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='branch',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='attendances', to='core.branch'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='branch',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='payments', to='core.branch'),
+        ),
+        migrations.RunPython(assign_default_branch, migrations.RunPython.noop),
+    ]
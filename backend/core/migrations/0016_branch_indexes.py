@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:12
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_branch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='member',
+            name='branch',
+            field=models.ForeignKey(db_index=False, default=core.models.default_branch,
+                                    on_delete=django.db.models.deletion.PROTECT, related_name='members',
+                                    to='core.branch'),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='branch',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='attendances', to='core.branch'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='branch',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT,
+                                    related_name='payments', to='core.branch'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['branch', 'full_name'], name='core_member_branch_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('next_checkup_date__isnull', False)),
+                               fields=['branch', 'next_checkup_date', 'id'], name='core_member_branch_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['branch', 'date', 'present', 'member', 'paid_amount'],
+                               name='core_attend_branch_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['branch', 'date'], name='core_payment_branch_date_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:05
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_branch_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxCursor',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=40)),
+                ('member_id', models.BigIntegerField(blank=True, null=True)),
+                ('branch_id', models.BigIntegerField(blank=True, null=True)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['branch_id', 'id'], name='core_outbox_branch_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='plan_start_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -1,8 +1,101 @@
+from datetime import timedelta
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
 
+class Branch(models.Model):
+    """
+    A centre. Members, their attendance and their payments each carry the
+    branch they belong to; see core.branches.
+    """
+    code = models.CharField(max_length=16, unique=True)
+    name = models.CharField(max_length=128)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['code']
+        verbose_name_plural = 'branches'
+
+    def __str__(self):
+        return self.name
+
+
+# Branch of every row created before branches existed, and of new members
+# created without one
+DEFAULT_BRANCH = 'MAIN'
+
+_default_branch_id = None
+
+
+def default_branch():
+    """Id of the default branch, created on first use and then kept for the process."""
+    global _default_branch_id
+    if _default_branch_id is None:
+        branch, _ = Branch.objects.get_or_create(code=DEFAULT_BRANCH, defaults={'name': 'Main'})
+        _default_branch_id = branch.pk
+    return _default_branch_id
+
+
+def forget_default_branch():
+    global _default_branch_id
+    _default_branch_id = None
+
+
+class BranchQuerySet(models.QuerySet):
+    """QuerySet for the tables with a branch column."""
+
+    def for_branch(self, branch):
+        """Rows of `branch` (a Branch or its id); every branch's for None."""
+        if branch is None:
+            return self
+        return self.filter(branch=branch)
+
+
+class DatedQuerySet(BranchQuerySet):
+    """QuerySet for the tables that gain a row per member and day."""
+
+    def seek_dates(self, field_name, kind, order='ASC'):
+        """
+        The values dates() returns, as a list, found by seeking the date index
+        once per distinct year, month or day instead of a DISTINCT over every
+        row.
+        """
+        field = None if '__' in field_name else self.model._meta.get_field(field_name)
+        if (type(field) is not models.DateField or kind not in ('year', 'month', 'day')
+                or order not in ('ASC', 'DESC') or self.query.is_sliced):
+            return list(super().dates(field_name, kind, order))
+
+        descending = order == 'DESC'
+        values = self.order_by(f'-{field_name}' if descending else field_name).values_list(field_name, flat=True)
+        found = []
+        bound = None
+        while True:
+            rows = values
+            if bound is not None:
+                rows = rows.filter(**{f'{field_name}__{"lt" if descending else "gte"}': bound})
+            value = rows.exclude(**{f'{field_name}__isnull': True}).first()
+            if value is None:
+                return found
+            if kind == 'year':
+                start = value.replace(month=1, day=1)
+            elif kind == 'month':
+                start = value.replace(day=1)
+            else:
+                start = value
+            found.append(start)
+            if descending:
+                bound = start
+            elif kind == 'year':
+                bound = start.replace(year=start.year + 1)
+            elif kind == 'month':
+                bound = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+            else:
+                bound = start + timedelta(days=1)
+
+
 MEMBERSHIP_CHOICES = (
     ('TRIAL', 'Trial'),
     ('UMS', 'UMS'),
@@ -11,7 +104,29 @@ MEMBERSHIP_CHOICES = (
 )
 
 
+class Plan(models.Model):
+    """
+    Membership plan terms, looked up by the code stored in Member.membership.
+    A blank sessions or price is given per registration (OTHERS: number_of_days
+    and plan_total_amount); a blank validity_days never expires.
+    """
+    code = models.CharField(max_length=16, unique=True)
+    name = models.CharField(max_length=64)
+    sessions = models.IntegerField(blank=True, null=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    validity_days = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['code']
+
+    def __str__(self):
+        return self.name
+
+
 class Member(models.Model):
+    # Leads the composite indexes below, so it needs no index of its own
+    branch = models.ForeignKey(Branch, on_delete=models.PROTECT, related_name='members',
+                               default=default_branch, db_index=False)
     member_code = models.CharField(max_length=32, unique=True)
     full_name = models.CharField(max_length=255)
     phone = models.CharField(max_length=32, blank=True, null=True)
@@ -21,24 +136,62 @@ class Member(models.Model):
     membership = models.CharField(max_length=16, choices=MEMBERSHIP_CHOICES, blank=True, null=True)
     membership_total_sessions = models.IntegerField(default=0)
     ums_count = models.IntegerField(default=0)
+    # ums_count when the current plan started; the plan has used ums_count - plan_start_count
+    plan_start_count = models.IntegerField(default=0)
+    # Sessions the plan has left, kept in step by core.plans; null without a session plan
+    sessions_remaining = models.IntegerField(blank=True, null=True)
+    membership_expires = models.DateField(blank=True, null=True)
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     latest_weight = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
     latest_height = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
     next_checkup_date = models.DateField(blank=True, null=True)
     profile_image = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # Stored names of the processed photo and its thumbnails, written by core.images
+    profile_thumbnails = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BranchQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.full_name} ({self.phone})"
 
     class Meta:
         ordering = ['full_name']
+        indexes = [
+            # A branch's member list, in name order
+            models.Index(fields=['branch', 'full_name'], name='core_member_branch_name_idx'),
+            # Due checkups are read as a range of these (core.scheduling),
+            # for every branch and for one
+            models.Index(
+                fields=['next_checkup_date', 'id'],
+                name='core_member_next_checkup_idx',
+                condition=models.Q(next_checkup_date__isnull=False),
+            ),
+            models.Index(
+                fields=['branch', 'next_checkup_date', 'id'],
+                name='core_member_branch_due_idx',
+                condition=models.Q(next_checkup_date__isnull=False),
+            ),
+            # Renewal and expiry lists are ranges of these (core.plans)
+            models.Index(
+                fields=['sessions_remaining'],
+                name='core_member_sessions_left_idx',
+                condition=models.Q(sessions_remaining__isnull=False),
+            ),
+            models.Index(
+                fields=['membership_expires'],
+                name='core_member_expires_idx',
+                condition=models.Q(membership_expires__isnull=False),
+            ),
+        ]
 
 
 class Attendance(models.Model):
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='attendances')
+    # The member's branch, copied on insert (core.branches) so per-branch days are one index range
+    branch = models.ForeignKey(Branch, on_delete=models.PROTECT, related_name='attendances', db_index=False)
     date = models.DateField()
     present = models.BooleanField(default=False)
     paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -46,9 +199,18 @@ class Attendance(models.Model):
     submitted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     notes = models.TextField(blank=True, null=True)
 
+    objects = DatedQuerySet.as_manager()
+
     class Meta:
         unique_together = ('member', 'date')
         ordering = ['-date', 'member__full_name']
+        indexes = [
+            models.Index(fields=['date'], name='core_attendance_date_idx'),
+            # Also holds every column the per-branch day counts and range
+            # summaries read, so they are answered from the index alone
+            models.Index(fields=['branch', 'date', 'present', 'member', 'paid_amount'],
+                         name='core_attend_branch_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.member.full_name} - {self.date} - {'Present' if self.present else 'Absent'}"
@@ -56,14 +218,22 @@ class Attendance(models.Model):
 
 class Payment(models.Model):
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='payments')
+    # The member's branch, copied on insert like Attendance.branch
+    branch = models.ForeignKey(Branch, on_delete=models.PROTECT, related_name='payments', db_index=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateField(default=timezone.now)
     method = models.CharField(max_length=100, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = DatedQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['date'], name='core_payment_date_idx'),
+            models.Index(fields=['branch', 'date'], name='core_payment_branch_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.member.full_name} - ₹{self.amount} - {self.date}"
@@ -169,3 +339,152 @@ class BodyComponentEvaluation(models.Model):
 
     def __str__(self):
         return f"{self.member.full_name} - Body Eval {self.date}"
+
+
+LEDGER_KIND_CHOICES = (
+    ('CHARGE', 'Charge'),
+    ('PAYMENT', 'Payment'),
+    ('ADJUSTMENT', 'Adjustment'),
+)
+
+
+class LedgerEntry(models.Model):
+    """
+    Append-only record of every change to a member's balance.
+    `amount` is the signed effect on the balance: charges are positive,
+    payments are negative and adjustments carry their own sign.
+    """
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='ledger_entries')
+    kind = models.CharField(max_length=16, choices=LEDGER_KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    date = models.DateField(default=timezone.now)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, related_name='ledger_entries', null=True, blank=True)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['member', 'id'], name='ledger_member_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.member.full_name} - {self.kind} {self.amount} - {self.date}"
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Folded ledger totals for a member up to and including `last_entry_id`.
+    The current balance is the latest snapshot plus the ledger tail after it.
+    """
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='balance_snapshots')
+    last_entry_id = models.BigIntegerField()
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-last_entry_id']
+        indexes = [
+            models.Index(fields=['member', '-last_entry_id'], name='snapshot_member_entry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.member.full_name} - Snapshot @{self.last_entry_id}: {self.balance}"
+
+
+class MemberSummary(models.Model):
+    """
+    Read model behind the member details page: one row per member holding
+    everything the page shows, rebuilt by core.summary whenever the member
+    or one of their records changes.
+    """
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    member_code = models.CharField(max_length=32, db_index=True)
+    full_name = models.CharField(max_length=255)
+    phone = models.CharField(max_length=32, blank=True, null=True, db_index=True)
+    gender = models.CharField(max_length=16, blank=True, null=True)
+    membership = models.CharField(max_length=16, choices=MEMBERSHIP_CHOICES, blank=True, null=True)
+    membership_total_sessions = models.IntegerField(default=0)
+    ums_count = models.IntegerField(default=0)
+    registration_id = models.IntegerField(blank=True, null=True)
+    registration_date = models.DateField(blank=True, null=True)
+    invited_by = models.CharField(max_length=255, blank=True, null=True)
+    age = models.IntegerField(blank=True, null=True)
+    visit_count = models.IntegerField(default=0)
+    last_visit = models.DateField(blank=True, null=True)
+    total_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    latest_checkup_date = models.DateField(blank=True, null=True)
+    latest_weight = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
+    latest_height = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
+    start_weight = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
+    weight_trend = models.JSONField(default=list, encoder=DjangoJSONEncoder)  # [[date, weight], ...] from checkups
+    latest_evaluation = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    weeks_completed = models.IntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.full_name} - Summary"
+
+
+class CodeCounter(models.Model):
+    """
+    Last number handed out in a code series. Used by core.codes on databases
+    without sequences; PostgreSQL allocates from a sequence instead.
+    """
+    name = models.CharField(max_length=32, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class AttendanceRollup(models.Model):
+    """
+    A member's attendance totals for a year moved to the archive by
+    core.archive, so summaries keep counting archived visits.
+    """
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='attendance_rollups')
+    year = models.IntegerField()
+    visits = models.IntegerField(default=0)
+    last_visit = models.DateField(blank=True, null=True)
+    paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('member', 'year')
+
+    def __str__(self):
+        return f"{self.member_id} - {self.year}: {self.visits} visits"
+
+
+class OutboxEvent(models.Model):
+    """
+    A change for downstream consumers, written in the transaction that made
+    it; the id is the change feed's cursor. See core.outbox.
+    """
+    topic = models.CharField(max_length=40)
+    # Plain ids, not foreign keys: an event outlives the rows it describes
+    member_id = models.BigIntegerField(blank=True, null=True)
+    branch_id = models.BigIntegerField(blank=True, null=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['branch_id', 'id'], name='core_outbox_branch_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.topic}"
+
+
+class OutboxCursor(models.Model):
+    """Last event id a local consumer (manage.py consume_changes) has handled."""
+    name = models.CharField(max_length=64, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
@@ -0,0 +1,182 @@
+"""
+Transactional outbox and change feed.
+
+Writes that other systems follow - attendance submissions, registrations,
+body checkup saves and payments - add OutboxEvent rows in the same
+transaction as the change, so an event exists exactly when its change was
+committed. Consumers keep the id of the last event they handled and read
+only what came after it, oldest first:
+
+    GET /api/changes/?after=4521&wait=25      NDJSON, one event per line (waits under ASGI)
+    python manage.py consume_changes accounting --follow
+
+The id only works as a cursor if events become visible in id order. Ids are
+handed out at INSERT, so a transaction that inserted id 7 could commit after
+one that inserted id 8, and a reader already past 8 would never see 7.
+emit() therefore takes a transaction-scoped lock before inserting
+(pg_advisory_xact_lock on PostgreSQL; SQLite admits one writer at a time
+anyway): writers of events commit one after another, in the order of their
+ids. Emit as the last write of a transaction, so the lock is held only for
+the commit.
+"""
+import asyncio
+import json
+import time
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Min
+
+from .models import OutboxEvent, OutboxCursor
+
+
+ATTENDANCE_RECORDED = 'attendance.recorded'
+PAYMENT_CREATED = 'payment.created'
+PAYMENT_UPDATED = 'payment.updated'
+PAYMENT_DELETED = 'payment.deleted'
+REGISTRATION_SAVED = 'registration.saved'
+CHECKUP_SAVED = 'checkup.saved'
+
+# Arbitrary key of the PostgreSQL advisory lock serialising event writers
+LOCK_KEY = 0x6f7574626f78
+
+# Events per read, and how often a waiting reader looks for new ones
+READ_LIMIT = 500
+POLL_INTERVAL = 0.5
+
+CENTS = Decimal('0.01')
+
+
+def event(topic, payload, member_id=None, branch_id=None):
+    """An unsaved event; pass it to emit()."""
+    return OutboxEvent(topic=topic, payload=payload, member_id=member_id, branch_id=branch_id)
+
+
+def emit(events):
+    """
+    Write `events` in the current transaction (or one of their own outside
+    a transaction), after every event already written by a transaction that
+    has not committed yet.
+    """
+    events = list(events)
+    if not events:
+        return events
+    with transaction.atomic(savepoint=False):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_KEY])
+        return OutboxEvent.objects.bulk_create(events)
+
+
+# Payloads: the row as downstream tools need it, in JSON types
+
+def _decimal(value):
+    # Two places, as stored, even for values the request gave as '500'
+    return None if value is None else Decimal(str(value)).quantize(CENTS)
+
+
+def attendance(record):
+    return {
+        'id': record.pk, 'member_id': record.member_id, 'date': record.date, 'present': record.present,
+        'paid_amount': _decimal(record.paid_amount), 'submitted_by': record.submitted_by_id, 'notes': record.notes,
+    }
+
+
+def payment(record):
+    return {
+        'id': record.pk, 'member_id': record.member_id, 'amount': _decimal(record.amount), 'date': record.date,
+        'method': record.method, 'notes': record.notes,
+    }
+
+
+def payment_event(topic, record, **extra):
+    return event(topic, {**payment(record), **extra}, record.member_id, record.branch_id)
+
+
+def registration(member, record, evaluation, created):
+    return {
+        'id': record.pk, 'member_id': member.pk, 'member_created': created, 'member_code': member.member_code,
+        'full_name': member.full_name, 'phone': member.phone, 'membership': record.membership,
+        'plan_total_amount': _decimal(record.plan_total_amount),
+        'initial_amount_paid': _decimal(record.initial_amount_paid),
+        'body_evaluation_id': evaluation.pk,
+    }
+
+
+def checkups(member, records, next_checkup_date):
+    return {
+        'member_id': member.pk, 'phone': member.phone, 'next_checkup_date': next_checkup_date,
+        'checkups': [
+            {'id': c.pk, 'checkup_date': c.checkup_date, 'weight': _decimal(c.weight), 'height': _decimal(c.height)}
+            for c in records
+        ],
+    }
+
+
+# Reading
+
+def read(after=0, limit=READ_LIMIT, branch=None, topics=None):
+    """Up to `limit` committed events with ids above `after`, oldest first."""
+    events = OutboxEvent.objects.filter(id__gt=after)
+    if branch is not None:
+        events = events.filter(branch_id=branch.pk)
+    if topics:
+        events = events.filter(topic__in=topics)
+    return list(events.order_by('id')[:limit])
+
+
+def wait(after=0, timeout=0, limit=READ_LIMIT, branch=None, topics=None):
+    """read(), waiting up to `timeout` seconds for an event if there is none yet."""
+    deadline = time.monotonic() + timeout
+    while True:
+        events = read(after, limit, branch, topics)
+        if events or time.monotonic() >= deadline:
+            return events
+        time.sleep(POLL_INTERVAL)
+
+
+_aread = sync_to_async(read)
+
+
+async def await_events(after=0, timeout=0, limit=READ_LIMIT, branch=None, topics=None):
+    """wait() for async views; the event loop is free between polls."""
+    deadline = time.monotonic() + timeout
+    while True:
+        events = await _aread(after, limit, branch, topics)
+        if events or time.monotonic() >= deadline:
+            return events
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+def as_json(record):
+    """One NDJSON line for an event."""
+    return json.dumps({
+        'id': record.pk, 'topic': record.topic, 'member_id': record.member_id, 'branch_id': record.branch_id,
+        'created_at': record.created_at, 'payload': record.payload,
+    }, cls=DjangoJSONEncoder)
+
+
+# Local consumers
+
+def position(name):
+    """The last event id consumer `name` has handled, 0 for a new one."""
+    return OutboxCursor.objects.filter(name=name).values_list('position', flat=True).first() or 0
+
+
+def advance(name, to):
+    """Record that consumer `name` has handled every event up to id `to`."""
+    OutboxCursor.objects.update_or_create(name=name, defaults={'position': to})
+
+
+def prune(before):
+    """
+    Delete events created before `before` that every local consumer has
+    handled; returns how many. Feed readers further behind must start over.
+    """
+    events = OutboxEvent.objects.filter(created_at__lt=before)
+    lowest = OutboxCursor.objects.aggregate(lowest=Min('position'))['lowest']
+    if lowest is not None:
+        events = events.filter(id__lte=lowest)
+    return events.delete()[0]
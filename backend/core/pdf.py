@@ -0,0 +1,204 @@
+"""
+PDF rendering for the report views.
+
+Renders run in-process or, when settings.PDF_RENDER_WORKERS > 0, in a pool
+of long-lived worker processes. Either way each process keeps warm state:
+one FontConfiguration, the report stylesheets parsed once, an image cache,
+and a URL fetcher that serves /static/ and /media/ from the local disk
+instead of making HTTP requests back to this server.
+
+WeasyPrint and its Pango/Cairo bindings are imported on the first render,
+not with this module, so workers and management commands that never render
+a PDF do not pay for them.
+"""
+import asyncio
+import mimetypes
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+
+
+# Stylesheets for each report template, under core/static/
+REPORT_STYLESHEETS = {
+    'report_daily': 'css/report_daily.css',
+    'analysis_report': 'css/analysis_report.css',
+}
+
+# Decoded images kept per process; reports only embed a handful
+IMAGE_CACHE_LIMIT = 64
+
+
+@lru_cache(maxsize=None)
+def _local_url_fetcher():
+    from weasyprint.urls import URLFetcher, URLFetcherResponse
+
+    class LocalURLFetcher(URLFetcher):
+        """Resolve static and media URLs from disk and refuse other HTTP fetches."""
+
+        def fetch(self, url, headers=None):
+            parts = urlsplit(url)
+            if parts.scheme not in ('http', 'https'):
+                return super().fetch(url, headers)  # data: and file: URLs
+
+            path = local_path(unquote(parts.path))
+            if path is None:
+                raise ValueError(f'Refusing to fetch {url} over the network')
+            mime_type, _ = mimetypes.guess_type(str(path))
+            return URLFetcherResponse(
+                url,
+                body=open(path, 'rb'),
+                headers={'Content-Type': mime_type or 'application/octet-stream'},
+            )
+
+    return LocalURLFetcher
+
+
+def __getattr__(name):
+    # pdf.LocalURLFetcher is built, and WeasyPrint imported, on first access
+    if name == 'LocalURLFetcher':
+        return _local_url_fetcher()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def local_path(url_path):
+    """Map a /static/ or /media/ URL path to a file on disk, or None."""
+    try:
+        if url_path.startswith(settings.STATIC_URL):
+            found = finders.find(url_path[len(settings.STATIC_URL):])
+            return Path(found) if found else None
+    except SuspiciousFileOperation:
+        return None
+
+    if settings.MEDIA_URL and url_path.startswith(settings.MEDIA_URL):
+        media_root = Path(settings.MEDIA_ROOT).resolve()
+        candidate = (media_root / url_path[len(settings.MEDIA_URL):]).resolve()
+        if media_root in candidate.parents and candidate.is_file():
+            return candidate
+    return None
+
+
+# Per thread: Pango font maps must not be shared between threads
+_local = threading.local()
+
+
+def _warm_state():
+    if not hasattr(_local, 'warm'):
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        fetcher = _local_url_fetcher()()
+        fonts = FontConfiguration()
+        stylesheets = {
+            name: CSS(filename=finders.find(path), font_config=fonts, url_fetcher=fetcher)
+            for name, path in REPORT_STYLESHEETS.items()
+        }
+        _local.warm = {'fetcher': fetcher, 'fonts': fonts, 'stylesheets': stylesheets, 'images': {}}
+    return _local.warm
+
+
+def _layout(html_string, base_url=None, stylesheet=None):
+    from weasyprint import HTML
+
+    state = _warm_state()
+    if len(state['images']) > IMAGE_CACHE_LIMIT:
+        state['images'].clear()
+
+    html = HTML(string=html_string, base_url=base_url, url_fetcher=state['fetcher'])
+    return html.render(
+        stylesheets=[state['stylesheets'][stylesheet]] if stylesheet else None,
+        font_config=state['fonts'],
+        cache=state['images'],
+    )
+
+
+def _render(html_string, base_url=None, stylesheet=None):
+    return _layout(html_string, base_url, stylesheet).write_pdf()
+
+
+def _render_merged(html_strings, base_url=None, stylesheet=None):
+    # One layout pass per chunk, then all pages written as a single PDF
+    documents = [_layout(html_string, base_url, stylesheet) for html_string in html_strings]
+    pages = [page for document in documents for page in document.pages]
+    return documents[0].copy(pages).write_pdf()
+
+
+def _init_worker():
+    # Spawned workers start from a fresh interpreter
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    # Lay out one page per stylesheet so Pango has loaded every font face
+    for name in REPORT_STYLESHEETS:
+        _render('<p>warm-up <strong>bold</strong></p>', stylesheet=name)
+
+
+_pool = None
+
+
+def get_pool():
+    """Return the shared renderer pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn, not fork: web workers are multi-threaded and hold DB sockets
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+    return _pool
+
+
+def render_pdf(html_string, base_url=None, stylesheet=None):
+    """
+    Render an HTML string to PDF bytes with WeasyPrint.
+
+    Args:
+        html_string: rendered report template
+        base_url: base for relative URLs in the document
+        stylesheet: key of REPORT_STYLESHEETS to apply
+    """
+    if settings.PDF_RENDER_WORKERS:
+        return get_pool().submit(_render, html_string, base_url, stylesheet).result()
+    return _render(html_string, base_url, stylesheet)
+
+
+async def arender_pdf(html_string, base_url=None, stylesheet=None):
+    """Async variant of render_pdf that never blocks the event loop."""
+    if settings.PDF_RENDER_WORKERS:
+        return await asyncio.wrap_future(get_pool().submit(_render, html_string, base_url, stylesheet))
+    # WeasyPrint is CPU-bound; run it in the executor thread pool
+    return await sync_to_async(_render, thread_sensitive=False)(html_string, base_url, stylesheet)
+
+
+def render_pdf_merged(html_strings, base_url=None, stylesheet=None):
+    """
+    Lay out each HTML chunk separately and return their pages as one PDF.
+
+    With the renderer pool, the whole batch goes to a single worker: laid-out
+    documents hold Pango and cairo handles that cannot be sent between
+    processes, and writing every page in one pass embeds each font once. To
+    spread a large batch across the workers, render one PDF per chunk with
+    render_pdf_many instead.
+    """
+    if settings.PDF_RENDER_WORKERS:
+        return get_pool().submit(_render_merged, html_strings, base_url, stylesheet).result()
+    return _render_merged(html_strings, base_url, stylesheet)
+
+
+def render_pdf_many(html_strings, base_url=None, stylesheet=None):
+    """Render several documents, spread across the renderer pool when configured."""
+    if settings.PDF_RENDER_WORKERS:
+        futures = [get_pool().submit(_render, html_string, base_url, stylesheet) for html_string in html_strings]
+        return [future.result() for future in futures]
+    return [_render(html_string, base_url, stylesheet) for html_string in html_strings]
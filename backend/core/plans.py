@@ -0,0 +1,84 @@
+"""
+Membership plans and session consumption.
+
+Plan rows hold the sessions, price and validity of each membership code;
+registration reads them instead of constants. ums_count counts every visit
+of the member's lifetime; plan_start_count is its value when the current
+plan began, so a renewal starts from a full plan. A member on a session plan
+carries sessions_remaining
+(membership_total_sessions - (ums_count - plan_start_count)), kept in step
+by every write of the counters:
+
+    attendance    UPDATE ... SET ums_count = ums_count + 1,
+                             sessions_remaining = sessions_remaining - 1
+    registration  set with the new totals on the unit of work; a renewal
+                  also moves plan_start_count to the current ums_count
+    save()        recomputed by the pre_save handler below
+
+and membership_expires, set at registration from the plan's validity_days.
+Both columns have partial indexes, so `expired` and `renewal_candidates`
+read index ranges instead of comparing every member in Python.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Q
+from django.db.models.signals import pre_save
+
+from .models import Member, Plan
+
+
+# A member is a renewal candidate with this many sessions or days left
+RENEWAL_SESSIONS = 3
+RENEWAL_DAYS = 7
+
+
+def plans():
+    """{code: Plan} for every plan."""
+    return Plan.objects.in_bulk(field_name='code')
+
+
+def terms(membership, number_of_days=None, price=None, all_plans=None):
+    """
+    (sessions, price, validity_days) of a registration for `membership`;
+    number_of_days and price stand in where the plan leaves them blank.
+    Unknown codes get no sessions and no charge.
+    """
+    plan = (plans() if all_plans is None else all_plans).get(membership)
+    if plan is None:
+        return 0, Decimal('0'), None
+    sessions = plan.sessions if plan.sessions is not None else number_of_days or 0
+    total = plan.price if plan.price is not None else Decimal(str(price or 0))
+    return sessions, total, plan.validity_days
+
+
+def remaining(total_sessions, used):
+    """sessions_remaining for the given totals; None without a session plan."""
+    return total_sessions - used if total_sessions > 0 else None
+
+
+def expiry(start, validity_days):
+    """membership_expires for a plan started on `start`."""
+    return start + timedelta(days=validity_days) if validity_days else None
+
+
+def expired(day):
+    """Members with no sessions left or whose plan ended before `day`."""
+    return Member.objects.filter(Q(sessions_remaining__lte=0) | Q(membership_expires__lt=day))
+
+
+def renewal_candidates(day, sessions=RENEWAL_SESSIONS, days=RENEWAL_DAYS):
+    """Members not yet expired with at most `sessions` sessions or `days` days left."""
+    return Member.objects.filter(
+        Q(sessions_remaining__gt=0, sessions_remaining__lte=sessions)
+        | Q(membership_expires__gte=day, membership_expires__lte=day + timedelta(days=days))
+    ).exclude(sessions_remaining__lte=0).exclude(membership_expires__lt=day)
+
+
+def _member_saving(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None:
+        instance.sessions_remaining = remaining(instance.membership_total_sessions,
+                                               instance.ums_count - instance.plan_start_count)
+
+
+pre_save.connect(_member_saving, sender=Member)
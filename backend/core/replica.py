@@ -0,0 +1,159 @@
+"""
+Read replica routing.
+
+With REPLICA_DATABASE_URL set, settings add a 'replica' database and
+ReplicaRouter sends reads to it - but only from code that opts in, so the
+attendance desk, registrations and everything else keep reading their own
+writes from 'default':
+
+    @api_view(['GET'])
+    @replica.route
+    def attendance_range_report(request): ...
+
+    with replica.reads():
+        rows = list(reports.daily_attendances(day))
+
+    StreamingHttpResponse(replica.stream(reports.daily_report_pdf(day)))
+
+Reads fall back to 'default' when no replica is configured, inside a
+transaction on 'default', once the current request or command has written
+anything, and for REPLICA_PIN_SECONDS after a browser's last successful
+POST/PUT/PATCH/DELETE (ReplicaPinMiddleware sets a cookie), so a report
+opened right after a submission never misses rows the replica has not
+received yet.
+"""
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections
+
+
+REPLICA = 'replica'
+PIN_COOKIE = 'pin_primary'
+
+# Set inside reads() and routed views
+_wanted = contextvars.ContextVar('replica_wanted', default=False)
+# Set by a write or the pin cookie; reads stay on 'default' until the request ends
+_pinned = contextvars.ContextVar('replica_pinned', default=False)
+
+
+def configured():
+    return REPLICA in settings.DATABASES
+
+
+def in_use():
+    """Whether a read here would go to the replica."""
+    return (_wanted.get() and not _pinned.get() and configured()
+            and not connections['default'].in_atomic_block)
+
+
+@contextmanager
+def reads():
+    """Send reads in the block to the replica where it is safe to."""
+    token = _wanted.set(True)
+    try:
+        yield
+    finally:
+        _wanted.reset(token)
+
+
+def route(view):
+    """Run a view, sync or async, with its reads on the replica."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            with reads():
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with reads():
+                return view(*args, **kwargs)
+    return wrapper
+
+
+def stream(chunks):
+    """
+    Wrap a generator whose queries run while the response streams, after the
+    view has returned, so each step still reads from the replica.
+    """
+    chunks = iter(chunks)
+    while True:
+        with reads():
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def pin():
+    """Keep reads on 'default' for the rest of this request or command."""
+    _pinned.set(True)
+
+
+class ReplicaRouter:
+    """Reads from the replica where in_use(); writes and migrations go to 'default'."""
+
+    def db_for_read(self, model, **hints):
+        return REPLICA if in_use() else None
+
+    def db_for_write(self, model, **hints):
+        # Later reads must see this write
+        pin()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows, so objects read from either may be related
+        if {obj1._state.db, obj2._state.db} <= {'default', REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The replica is migrated by replication
+        return db != REPLICA
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin a browser's reads to 'default' for REPLICA_PIN_SECONDS after it
+    changed something, covering the replica's replication lag.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._begin(request)
+        return self._finish(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        self._begin(request)
+        return self._finish(request, await self.get_response(request))
+
+    def _begin(self, request):
+        _pinned.set(PIN_COOKIE in request.COOKIES)
+
+    def _finish(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE') and response.status_code < 400 and configured():
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+def _request_done(sender, **kwargs):
+    # Worker threads are reused; the next request starts unpinned
+    _pinned.set(False)
+
+
+request_finished.connect(_request_done)
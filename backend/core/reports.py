@@ -0,0 +1,356 @@
+"""
+Data loading and rendering for reports that span many members.
+"""
+import calendar
+import io
+import zipfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import archive
+from .models import Member, Attendance, Payment, Registration, BodyComponentEvaluation
+from .pdf import render_pdf_merged, render_pdf_many
+from .tabular_pdf import Column, TablePDF, encodable
+
+
+ANALYSIS_ORG_NAME = 'Y.Lakshmi Health & Lifestyle'
+
+# Registrations laid out together in one WeasyPrint pass
+ANALYSIS_CHUNK_SIZE = 25
+
+# Upper bound on registrations in one batch request
+ANALYSIS_BATCH_LIMIT = 1000
+
+# Longest span a range report may cover
+RANGE_REPORT_MAX_DAYS = 366
+
+REPORT_ORG_NAME = 'Membership Management System'
+
+DAILY_REPORT_COLUMNS = [
+    Column('S.No', 5), Column('Member Code', 12), Column('Name', 30),
+    Column('Phone', 15), Column('UMS Count', 10), Column('Payment Received', 16, 'right'),
+]
+
+
+def batch_registrations(ids=None, date_from=None, date_to=None, branch=None):
+    """Select registrations by id list and/or creation date range (inclusive), and branch."""
+    registrations = Registration.objects.all()
+    if branch is not None:
+        registrations = registrations.filter(member__branch=branch)
+    if ids:
+        registrations = registrations.filter(pk__in=ids)
+    if date_from:
+        registrations = registrations.filter(created_at__date__gte=date_from)
+    if date_to:
+        registrations = registrations.filter(created_at__date__lte=date_to)
+    return registrations
+
+
+def analysis_reports(registrations):
+    """
+    Pair each registration with its member's latest body evaluation.
+    Runs two queries whatever the batch size: registrations (joined to
+    members) and the body evaluations of those members.
+
+    Returns:
+        (reports, skipped) - report context dicts in registration order, and
+        ids of registrations that have no member or no body evaluation.
+    """
+    registrations = list(registrations.select_related('member').order_by('created_at', 'id'))
+    member_ids = [r.member_id for r in registrations if r.member_id]
+
+    latest = {}
+    evaluations = BodyComponentEvaluation.objects.filter(member_id__in=member_ids).order_by('member_id', '-date', '-id')
+    for body_eval in evaluations:
+        latest.setdefault(body_eval.member_id, body_eval)
+
+    reports = []
+    skipped = []
+    for registration in registrations:
+        body_eval = latest.get(registration.member_id)
+        if body_eval is None:
+            skipped.append(registration.id)
+            continue
+        reports.append({
+            'registration': registration,
+            'member': registration.member,
+            'body_eval': body_eval,
+            'analysis': body_eval.analysis_data or {},
+        })
+    return reports, skipped
+
+
+def render_analysis_batch(reports, base_url=None, output='pdf', chunk_size=ANALYSIS_CHUNK_SIZE):
+    """
+    Render analysis reports, `chunk_size` registrations per layout pass.
+
+    output='pdf' returns one multi-page PDF, laid out by a single process;
+    output='zip' returns a zip with one PDF per chunk, rendered in parallel
+    when the renderer pool is enabled.
+    """
+    chunks = [reports[i:i + chunk_size] for i in range(0, len(reports), chunk_size)]
+    html_strings = [
+        render_to_string('analysis_report_batch.html', {'reports': chunk, 'org_name': ANALYSIS_ORG_NAME})
+        for chunk in chunks
+    ]
+
+    if output != 'zip':
+        return render_pdf_merged(html_strings, base_url=base_url, stylesheet='analysis_report')
+
+    pdfs = render_pdf_many(html_strings, base_url=base_url, stylesheet='analysis_report')
+    buffer = io.BytesIO()
+    # PDFs are already compressed; store them as-is
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as bundle:
+        for index, (chunk, pdf) in enumerate(zip(chunks, pdfs), start=1):
+            first, last = chunk[0]['registration'].id, chunk[-1]['registration'].id
+            bundle.writestr(f'analysis_{index:03d}_{first}-{last}.pdf', pdf)
+    return buffer.getvalue()
+
+
+def report_range(period, anchor=None, date_from=None, date_to=None):
+    """
+    Resolve a report period to an inclusive (date_from, date_to) pair.
+
+    Args:
+        period: 'week' (Monday-Sunday around anchor), 'month' (calendar month
+            of anchor) or 'custom' (date_from..date_to)
+        anchor: a date inside the week or month
+    """
+    if period == 'week':
+        date_from = anchor - timedelta(days=anchor.weekday())
+        date_to = date_from + timedelta(days=6)
+    elif period == 'month':
+        date_from = anchor.replace(day=1)
+        date_to = anchor.replace(day=calendar.monthrange(anchor.year, anchor.month)[1])
+    elif period != 'custom':
+        raise ValueError("period must be 'week', 'month' or 'custom'")
+
+    if not date_from or not date_to or date_from > date_to:
+        raise ValueError('a valid from/to date range is required')
+    if (date_to - date_from).days >= RANGE_REPORT_MAX_DAYS:
+        raise ValueError(f'range reports cover at most {RANGE_REPORT_MAX_DAYS} days')
+    return date_from, date_to
+
+
+def attendance_range_summary(date_from, date_to, branch=None):
+    """
+    Aggregate attendance, revenue and registrations for an inclusive date
+    range, at one branch or (None) all of them.
+
+    Every figure is grouped in SQL, so Python only ever sees one row per
+    member, per day or per day and payment method - never the raw
+    Attendance rows. Row sets are read with iterator() and not cached;
+    the totals are summed from the per-day rows. Days in archived years
+    are added from the archive. Attendance is counted with COUNT(*), so a
+    branch's rows are read from core_attend_branch_date_idx alone.
+    """
+    attendances = Attendance.objects.for_branch(branch).filter(date__range=(date_from, date_to), present=True)
+    payments = Payment.objects.for_branch(branch).filter(date__range=(date_from, date_to))
+    # Compare created_at against datetime bounds so its index stays usable
+    registrations = Registration.objects.filter(
+        created_at__gte=timezone.make_aware(datetime.combine(date_from, time.min)),
+        created_at__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)),
+    )
+    if branch is not None:
+        registrations = registrations.filter(member__branch=branch)
+
+    daily = {}
+
+    def day(d):
+        return daily.setdefault(d, {'date': d, 'present': 0, 'revenue': Decimal('0'), 'new_registrations': 0})
+
+    for row in attendances.values('date').annotate(present=Count('*')).order_by().iterator():
+        day(row['date'])['present'] = row['present']
+
+    revenue_by_method = []
+    for row in (
+        payments.values('date', 'method')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by('date', 'method').iterator()
+    ):
+        day(row['date'])['revenue'] += row['total']
+        revenue_by_method.append(row)
+
+    for row in (
+        registrations.annotate(day=TruncDate('created_at'))
+        .values('day').annotate(count=Count('id')).order_by().iterator()
+    ):
+        day(row['day'])['new_registrations'] = row['count']
+
+    members = list(
+        attendances.values('member_id', 'member__member_code', 'member__full_name')
+        .annotate(visits=Count('*'), paid=Sum('paid_amount'))
+        .order_by('member__full_name', 'member_id')
+        .iterator()
+    )
+
+    if archive.overlaps(archive.ATTENDANCE, date_from, date_to) or archive.overlaps(archive.PAYMENT, date_from, date_to):
+        members, revenue_by_method = _add_archived(date_from, date_to, day, members, revenue_by_method, branch)
+
+    days = [daily[d] for d in sorted(daily)]
+    totals = {
+        'visits': sum(d['present'] for d in days),
+        'members': len(members),
+        'revenue': sum((d['revenue'] for d in days), Decimal('0')),
+        'new_registrations': sum(d['new_registrations'] for d in days),
+    }
+
+    return {
+        'from': date_from,
+        'to': date_to,
+        'totals': totals,
+        'daily': days,
+        'revenue_by_method': revenue_by_method,
+        'members': members,
+    }
+
+
+def _add_archived(date_from, date_to, day, members, revenue_by_method, branch=None):
+    """Fold archived attendance and payments into the range summary's rows."""
+    by_member = {m['member_id']: m for m in members}
+    archived_members = {}
+    for row in archive.read(archive.ATTENDANCE, date_from, date_to, branch):
+        if not row['present']:
+            continue
+        day(row['date'])['present'] += 1
+        visits = archived_members.setdefault(row['member_id'], {'visits': 0, 'paid': Decimal('0')})
+        visits['visits'] += 1
+        visits['paid'] += row['paid_amount']
+
+    details = Member.objects.filter(pk__in=[i for i in archived_members if i not in by_member]) \
+        .values_list('pk', 'member_code', 'full_name')
+    for member_id, code, name in details:
+        by_member[member_id] = {'member_id': member_id, 'member__member_code': code, 'member__full_name': name,
+                                'visits': 0, 'paid': Decimal('0')}
+    for member_id, visits in archived_members.items():
+        if member_id in by_member:
+            by_member[member_id]['visits'] += visits['visits']
+            by_member[member_id]['paid'] = (by_member[member_id]['paid'] or Decimal('0')) + visits['paid']
+
+    methods = {(r['date'], r['method']): r for r in revenue_by_method}
+    for row in archive.read(archive.PAYMENT, date_from, date_to, branch):
+        day(row['date'])['revenue'] += row['amount']
+        method = methods.setdefault((row['date'], row['method']), {
+            'date': row['date'], 'method': row['method'], 'total': Decimal('0'), 'count': 0,
+        })
+        method['total'] += row['amount']
+        method['count'] += 1
+
+    members = sorted(by_member.values(), key=lambda m: (m['member__full_name'], m['member_id']))
+    revenue_by_method = sorted(methods.values(), key=lambda r: (r['date'], r['method'] or ''))
+    return members, revenue_by_method
+
+
+def daily_attendances(report_date, branch=None):
+    """
+    Present attendances for a day with their members, ordered by name,
+    read from the archive when the day's year has been archived.
+    """
+    day = parse_date(str(report_date))
+    if day and day.year in archive.archived_years(archive.ATTENDANCE):
+        live = Attendance.objects.for_branch(branch).filter(date=day, present=True).select_related('member')
+        return sorted(archive.attendances_on(day, branch) + list(live), key=lambda a: a.member.full_name)
+    return Attendance.objects.for_branch(branch).filter(
+        date=report_date,
+        present=True
+    ).select_related('member').order_by('member__full_name')
+
+
+def daily_report_fits_tabular(report_date, branch=None):
+    """
+    Whether every name, code and phone on the day's report can be drawn by
+    the tabular writer; if not, the report is rendered with WeasyPrint.
+    """
+    if branch is not None and not encodable([str(branch)]):
+        return False
+    day = parse_date(str(report_date))
+    if day and day.year in archive.archived_years(archive.ATTENDANCE):
+        members = [a.member for a in daily_attendances(day, branch)]
+        return encodable(text for m in members for text in (m.member_code, m.full_name, m.phone))
+    rows = Attendance.objects.for_branch(branch).filter(date=report_date, present=True).order_by().values_list(
+        'member__member_code', 'member__full_name', 'member__phone',
+    )
+    return encodable(text for row in rows.iterator(chunk_size=500) for text in row)
+
+
+def range_report_fits_tabular(summary):
+    """Whether a range summary's member names, codes and payment methods can be drawn by the tabular writer."""
+    return encodable(
+        [m['member__member_code'] for m in summary['members']] + [m['member__full_name'] for m in summary['members']]
+        + [r['method'] for r in summary['revenue_by_method']]
+    )
+
+
+def daily_report_pdf(report_date, branch=None):
+    """
+    Stream the daily attendance report through the tabular PDF writer.
+
+    Totals come from one aggregate query up front; attendance rows are then
+    read with iterator() and laid out as they arrive.
+    """
+    day = parse_date(str(report_date))
+    if day and day.year in archive.archived_years(archive.ATTENDANCE):
+        archived = daily_attendances(day, branch)
+        totals = {'present': len(archived), 'received': sum(a.paid_amount for a in archived)}
+        rows = (
+            (a.member.member_code, a.member.full_name, a.member.phone, a.member.ums_count, a.paid_amount)
+            for a in archived
+        )
+    else:
+        attendances = Attendance.objects.for_branch(branch).filter(date=report_date, present=True)
+        totals = attendances.aggregate(present=Count('*'), received=Sum('paid_amount'))
+        rows = attendances.order_by('member__full_name').values_list(
+            'member__member_code', 'member__full_name', 'member__phone', 'member__ums_count', 'paid_amount',
+        ).iterator(chunk_size=500)
+    received = totals['received'] or Decimal('0')
+
+    doc = TablePDF('Daily Attendance Report', REPORT_ORG_NAME)
+    yield from doc.heading([f'Date: {report_date}'] + ([f'Branch: {branch}'] if branch is not None else []))
+    yield from doc.heading([f'Total Present: {totals["present"]}    Total Received: Rs. {received}'], bold=True)
+    yield from doc.table(
+        DAILY_REPORT_COLUMNS,
+        ((index, code, name, phone, ums, f'Rs. {paid}') for index, (code, name, phone, ums, paid) in enumerate(rows, 1)),
+        total=['', '', '', '', 'TOTAL', f'Rs. {received}'],
+    )
+    yield from doc.close()
+
+
+def range_report_pdf(summary, period):
+    """Stream an attendance_range_summary() through the tabular PDF writer."""
+    totals = summary['totals']
+    doc = TablePDF(f'{period.capitalize()} Attendance Report', REPORT_ORG_NAME)
+    yield from doc.heading([f'Period: {summary["from"]} to {summary["to"]}'])
+    yield from doc.heading([
+        f'Visits: {totals["visits"]}    Members: {totals["members"]}    '
+        f'Revenue: Rs. {totals["revenue"]}    New Registrations: {totals["new_registrations"]}'
+    ], bold=True)
+
+    yield from doc.heading(['Daily Summary'], bold=True, size=12)
+    yield from doc.table(
+        [Column('Date', 1), Column('Present', 1), Column('New Registrations', 1), Column('Revenue', 1, 'right')],
+        ((d['date'], d['present'], d['new_registrations'], f'Rs. {d["revenue"]}') for d in summary['daily']),
+    )
+
+    yield from doc.heading(['Revenue by Payment Method'], bold=True, size=12)
+    yield from doc.table(
+        [Column('Date', 1), Column('Method', 1), Column('Payments', 1), Column('Amount', 1, 'right')],
+        ((r['date'], r['method'] or '-', r['count'], f'Rs. {r["total"]}') for r in summary['revenue_by_method']),
+        total=['', '', 'TOTAL', f'Rs. {totals["revenue"]}'],
+    )
+
+    yield from doc.heading(['Visits per Member'], bold=True, size=12)
+    yield from doc.table(
+        [Column('S.No', 6), Column('Member Code', 14), Column('Name', 40), Column('Visits', 10),
+         Column('Paid at Check-in', 18, 'right')],
+        (
+            (index, m['member__member_code'], m['member__full_name'], m['visits'], f'Rs. {m["paid"] or 0}')
+            for index, m in enumerate(summary['members'], 1)
+        ),
+    )
+    yield from doc.close()
@@ -0,0 +1,97 @@
+"""
+Body checkup schedule.
+
+Members check in weekly for PROGRAM_WEEKS weeks counted from their
+registration date; week 1 is the registration itself, taken from the body
+evaluation. Member.next_checkup_date holds the start of the week after the
+latest recorded checkup, or None once the program is complete:
+
+    registered 2026-03-02, latest checkup 2026-03-17 (week 3)
+    -> next checkup 2026-03-23 (week 4)
+
+It is set when a member is created and again by every body checkup save.
+A date on or before today means due; before today means overdue.
+`due_members` reads that range off the (next_checkup_date, id) index in
+keyset pages, so each page is one range scan however many members there are;
+for one branch, off (branch_id, next_checkup_date, id).
+"""
+from datetime import timedelta
+
+from django.db.models import Max, Q
+from django.db.models.signals import pre_save
+
+from .models import Member, Checkup
+
+
+PROGRAM_WEEKS = 16
+
+# Columns of a due-checkup row
+DUE_FIELDS = ('id', 'member_code', 'full_name', 'phone', 'registration_date', 'next_checkup_date')
+
+
+def next_checkup_date(registration_date, last_checkup_date=None):
+    """Start of the week after the last checkup (week 1 without one), or None after the final week."""
+    week = 1
+    if last_checkup_date is not None:
+        week = max(1, (last_checkup_date - registration_date).days // 7 + 1)
+    if week >= PROGRAM_WEEKS:
+        return None
+    return registration_date + timedelta(weeks=week)
+
+
+def schedule(member):
+    """The member's next checkup date, from the registration date and the latest stored checkup."""
+    last = Checkup.objects.filter(member=member).order_by('-checkup_date') \
+        .values_list('checkup_date', flat=True).first()
+    return next_checkup_date(member.registration_date, last)
+
+
+def reschedule(members):
+    """Recompute and save next_checkup_date for a batch of members with one query for their checkups."""
+    latest = dict(
+        Checkup.objects.filter(member__in=members).values('member_id')
+        .annotate(last=Max('checkup_date')).values_list('member_id', 'last')
+    )
+    for member in members:
+        member.next_checkup_date = next_checkup_date(member.registration_date, latest.get(member.pk))
+    Member.objects.bulk_update(members, ['next_checkup_date'])
+
+
+def due_members(day, after=None, limit=500, branch=None):
+    """
+    Up to `limit` rows (dicts of DUE_FIELDS, plus 'week') of members whose
+    next checkup is on or before `day`, earliest first, at `branch` or every
+    branch. `after` is the (next_checkup_date, id) of the last row of the
+    previous page.
+    """
+    members = Member.objects.for_branch(branch).filter(next_checkup_date__lte=day)
+    if after is not None:
+        date, member_id = after
+        members = members.filter(next_checkup_date__gte=date).filter(
+            Q(next_checkup_date__gt=date) | Q(id__gt=member_id)
+        )
+    rows = list(members.order_by('next_checkup_date', 'id').values(*DUE_FIELDS)[:limit])
+    for row in rows:
+        row['week'] = (row['next_checkup_date'] - row['registration_date']).days // 7 + 1
+    return rows
+
+
+def iter_due(day, batch_size=500, branch=None):
+    """Every member due on or before `day`, fetched `batch_size` rows at a time."""
+    after = None
+    while True:
+        rows = due_members(day, after, batch_size, branch)
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after = (rows[-1]['next_checkup_date'], rows[-1]['id'])
+
+
+def _member_saving(sender, instance, **kwargs):
+    if instance._state.adding and instance.next_checkup_date is None and instance.registration_date:
+        # registration_date defaults to timezone.now, a datetime until the row is read back
+        registered = Member._meta.get_field('registration_date').to_python(instance.registration_date)
+        instance.next_checkup_date = next_checkup_date(registered)
+
+
+pre_save.connect(_member_saving, sender=Member)
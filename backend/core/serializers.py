@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Member, Attendance, Payment, Checkup, Registration, BodyComponentEvaluation
+from .models import Member, Attendance, Payment, Checkup, Registration, BodyComponentEvaluation, MemberSummary
+from . import branches, images
 
 
 class BodyComponentEvaluationSerializer(serializers.ModelSerializer):
@@ -19,9 +20,8 @@ class BodyComponentEvaluationSerializer(serializers.ModelSerializer):
         
         # Gender-based validation for body fat and skeletal muscle fields
         member = data.get('member')
-        if member and hasattr(member, 'gender'):
-            gender = member.gender
-            
+        gender = member.gender if member and hasattr(member, 'gender') else self.context.get('gender')
+        if gender:
             if gender == "Male":
                 # For males, only men columns can have values
                 if data.get('body_fat_women') or data.get('skeletal_muscle_women'):
@@ -39,6 +39,17 @@ class BodyComponentEvaluationSerializer(serializers.ModelSerializer):
         return data
 
 
+class IntakeBodyEvaluationSerializer(BodyComponentEvaluationSerializer):
+    """
+    Body evaluation validated before its member exists (bulk intake).
+    Pass the registration's gender as context={'gender': ...}.
+    """
+
+    class Meta(BodyComponentEvaluationSerializer.Meta):
+        fields = None
+        exclude = ('member',)
+
+
 class RegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Registration
@@ -70,14 +81,35 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return data
 
 
+class ProfileThumbnailsField(serializers.ReadOnlyField):
+    """{size: {format: url}} of the member's processed profile photo thumbnails"""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, member):
+        urls = images.thumbnail_urls(member)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {size: {fmt: request.build_absolute_uri(url) for fmt, url in files.items()}
+                    for size, files in urls.items()}
+        return urls
+
+
 class MemberSerializer(serializers.ModelSerializer):
     registration = RegistrationSerializer(read_only=True)
     body_evaluations = BodyComponentEvaluationSerializer(many=True, read_only=True)
     membership_label = serializers.SerializerMethodField()
+    profile_thumbnails = ProfileThumbnailsField()
     
     class Meta:
         model = Member
         fields = '__all__'
+        # sessions_remaining is derived from membership_total_sessions and
+        # the visits since plan_start_count, which registration sets; branch
+        # comes from the request (core.branches)
+        read_only_fields = ['sessions_remaining', 'plan_start_count', 'branch']
     
     def get_membership_label(self, obj):
         if obj.membership_total_sessions and obj.membership_total_sessions > 0:
@@ -88,12 +120,14 @@ class MemberSerializer(serializers.ModelSerializer):
 class MemberListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for list views"""
     membership_label = serializers.SerializerMethodField()
+    profile_thumbnails = ProfileThumbnailsField()
     
     class Meta:
         model = Member
         fields = ['id', 'member_code', 'full_name', 'phone', 'ums_count', 'balance', 
                   'latest_weight', 'latest_height', 'next_checkup_date', 
-                  'membership', 'membership_total_sessions', 'membership_label']
+                  'membership', 'membership_total_sessions', 'membership_label', 'sessions_remaining',
+                  'membership_expires', 'profile_thumbnails']
     
     def get_membership_label(self, obj):
         if obj.membership_total_sessions and obj.membership_total_sessions > 0:
@@ -101,23 +135,58 @@ class MemberListSerializer(serializers.ModelSerializer):
         return ""
 
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class MemberSummarySerializer(serializers.ModelSerializer):
+    """Everything the member details page shows, from the MemberSummary read model"""
+    id = serializers.IntegerField(source='member_id', read_only=True)
+    membership_label = serializers.SerializerMethodField()
+    weight_change = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MemberSummary
+        exclude = ['member']
+
+    def get_membership_label(self, obj):
+        if obj.membership_total_sessions and obj.membership_total_sessions > 0:
+            return f"{obj.ums_count} / {obj.membership_total_sessions}"
+        return ""
+
+    def get_weight_change(self, obj):
+        if obj.latest_weight is None or obj.start_weight is None:
+            return None
+        return str(obj.latest_weight - obj.start_weight)
+
+
+class BranchMemberMixin:
+    """Accept only members of the request's branch (core.branches) for `member`."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        branch = branches.current(self.context.get('request'))
+        if branch is not None and not fields['member'].read_only:
+            fields['member'].queryset = Member.objects.for_branch(branch)
+        return fields
+
+
+class AttendanceSerializer(BranchMemberMixin, serializers.ModelSerializer):
     member_name = serializers.CharField(source='member.full_name', read_only=True)
     
     class Meta:
         model = Attendance
         fields = '__all__'
+        # The member's, set on save
+        read_only_fields = ['branch']
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(BranchMemberMixin, serializers.ModelSerializer):
     member_name = serializers.CharField(source='member.full_name', read_only=True)
     
     class Meta:
         model = Payment
         fields = '__all__'
+        read_only_fields = ['branch']
 
 
-class CheckupSerializer(serializers.ModelSerializer):
+class CheckupSerializer(BranchMemberMixin, serializers.ModelSerializer):
     member_name = serializers.CharField(source='member.full_name', read_only=True)
     
     class Meta:
@@ -0,0 +1,83 @@
+"""
+Cold-start measurements for management commands and web workers.
+
+Each measurement runs a fresh interpreter with `python -X importtime`, so it
+sees the imports a new worker or a `manage.py` call really pays for, and
+reports the wall time together with the parsed import tree.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+
+# Libraries that only the report code paths should load
+HEAVY_MODULES = ('weasyprint', 'PIL', 'cairocffi', 'pydyf', 'fontTools', 'tinycss2', 'cssselect2', 'fitz', 'pypdf')
+
+# Cold-start budgets in seconds of wall time, checked by the test suite.
+# Both take about half a second on a developer machine; the headroom is
+# for slow CI runners, the point is to catch an eager heavy import.
+CHECK_BUDGET = 3.0
+FIRST_REQUEST_BUDGET = 3.0
+
+Import = namedtuple('Import', 'module self_us cumulative_us depth')
+Profile = namedtuple('Profile', 'seconds imports result')
+
+# Run in the child: set up Django and time one request through the test client
+_FIRST_REQUEST = '''
+import json, os, sys, time
+began = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+django.setup()
+ready = time.perf_counter()
+from django.test import Client
+response = Client().get(sys.argv[1], HTTP_HOST='localhost')
+print(json.dumps({'status': response.status_code, 'setup': ready - began,
+                  'request': time.perf_counter() - ready}))
+'''
+
+
+def parse_importtime(output):
+    """Parse `-X importtime` stderr into Import tuples, in import order."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append(Import(name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def heavy(imports):
+    """Top-level HEAVY_MODULES packages among `imports`."""
+    return sorted({i.module.split('.')[0] for i in imports} & set(HEAVY_MODULES))
+
+
+def _run(args):
+    began = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', *args],
+        cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+    )
+    seconds = time.perf_counter() - began
+    if completed.returncode:
+        raise RuntimeError(f'{" ".join(args)} exited with {completed.returncode}: {completed.stderr[-2000:]}')
+    return seconds, completed
+
+
+def profile_command(*command):
+    """Time `manage.py <command>` in a fresh interpreter."""
+    seconds, completed = _run(['manage.py', *command])
+    return Profile(seconds, parse_importtime(completed.stderr), completed.stdout)
+
+
+def profile_first_request(path='/api/health/'):
+    """Time worker start-up plus the first request to `path` in a fresh interpreter."""
+    seconds, completed = _run(['-c', _FIRST_REQUEST, path])
+    return Profile(seconds, parse_importtime(completed.stderr), json.loads(completed.stdout.splitlines()[-1]))
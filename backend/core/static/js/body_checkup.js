@@ -0,0 +1,221 @@
+// CSRF helper: read csrftoken from cookies and attach to POSTs
+function getCookie(name) {
+  const value = `; ${document.cookie}`;
+  const parts = value.split(`; ${name}=`);
+  if (parts.length === 2) return parts.pop().split(';').shift();
+}
+const csrftoken = getCookie('csrftoken');
+let selectedMember = null;
+let activeWeek = null;
+let lockedWeeks = new Set();
+
+// Search for member
+async function searchMember() {
+const searchTerm = document.getElementById('searchInput').value.trim();
+if (!searchTerm) {
+alert('Please enter a name or phone number');
+return;
+}
+
+try {
+const response = await fetch(`/api/members/search/?q=${encodeURIComponent(searchTerm)}`);
+const data = await response.json();
+
+if (data.length === 0) {
+  alert('No members found');
+  return;
+}
+
+// Display search results
+const resultsContainer = document.getElementById('resultsContainer');
+resultsContainer.innerHTML = data.map(member => `
+  <div class="border border-gray-300 rounded-lg p-4 mb-2 cursor-pointer hover:bg-blue-50"
+       onclick="selectMember(${member.id})">
+    <div class="font-semibold">${member.full_name}</div>
+    <div class="text-sm text-gray-600">${member.phone || 'No phone'}</div>
+  </div>
+`).join('');
+
+document.getElementById('searchResults').classList.remove('hidden');
+
+// If only one result, auto-select it
+if (data.length === 1) {
+  selectMember(data[0].id);
+}
+} catch (error) {
+console.error('Search error:', error);
+alert('Error searching for member');
+}
+}
+
+// Select a member and load their checkup data
+async function selectMember(memberId) {
+try {
+const response = await fetch(`/api/body-checkup/${memberId}/`);
+const data = await response.json();
+
+selectedMember = data.member;
+
+// Populate member info
+document.getElementById('memberName').textContent = data.member.full_name || '-';
+document.getElementById('memberPhone').textContent = data.member.phone || '-';
+document.getElementById('memberDate').textContent = data.member.registration_date || '-';
+document.getElementById('memberInvitedBy').textContent = data.member.invited_by || '-';
+document.getElementById('memberGender').textContent = data.member.gender || '-';
+
+// Populate dates in the table
+const dateRow = document.getElementById('dateRow');
+dateRow.innerHTML = '<td class="label-col">Date</td>';
+for (let i = 1; i <= 16; i++) {
+  const weekData = data.weeks[i];
+  const dateCell = document.createElement('td');
+  const dateVal = weekData ? weekData.date : '';
+  // Week 1 always locked: show text only
+  if (i === 1 || (data.locked_weeks && data.locked_weeks.includes(i))) {
+    dateCell.textContent = dateVal || '-';
+  } else {
+    // For unlocked weeks, render a date picker input
+    const input = document.createElement('input');
+    input.type = 'date';
+    input.className = 'checkup-input';
+    input.dataset.week = String(i);
+    input.dataset.field = 'date';
+    if (dateVal) input.value = dateVal;
+    // When a date is selected, enable that week's inputs
+    input.addEventListener('change', (e) => {
+      const w = parseInt(e.target.dataset.week, 10);
+      if (e.target.value) {
+        activeWeek = w;
+        lockedWeeks.delete(w);
+        enableWeekInputs(w);
+      }
+    });
+    dateCell.appendChild(input);
+  }
+  dateRow.appendChild(dateCell);
+}
+
+// Populate checkup data
+for (let week = 1; week <= 16; week++) {
+  const weekData = data.weeks[week];
+  if (weekData && weekData.data) {
+    Object.keys(weekData.data).forEach(field => {
+      const input = document.querySelector(`input[data-week="${week}"][data-field="${field}"]`);
+      if (input) {
+        input.value = weekData.data[field] || '';
+      }
+    });
+  }
+}
+
+// Initialize locking: Week 1 + all other weeks disabled by default, unless already locked by backend
+lockedWeeks = new Set([1]);
+(data.locked_weeks || []).forEach(w => lockedWeeks.add(w));
+disableAllInputs();
+
+// Show checkup section
+document.getElementById('checkupSection').classList.remove('hidden');
+document.getElementById('searchSection').classList.add('hidden');
+} catch (error) {
+console.error('Error loading member data:', error);
+alert('Error loading member checkup data');
+}
+}
+
+function disableAllInputs() {
+for (let week = 1; week <= 16; week++) {
+const inputs = document.querySelectorAll(`input[data-week="${week}"]`);
+inputs.forEach(inp => {
+  // Keep date pickers enabled so the user can choose a date
+  if (inp.dataset.field === 'date') {
+    inp.disabled = false;
+  } else {
+    inp.disabled = true;
+  }
+});
+}
+}
+
+function enableWeekInputs(week) {
+// Disable all except the selected week
+for (let w = 1; w <= 16; w++) {
+const inputs = document.querySelectorAll(`input[data-week="${w}"]`);
+const isLocked = lockedWeeks.has(w) || w === 1;
+inputs.forEach(inp => {
+  // Never enable Week 1
+  if (isLocked) {
+    inp.disabled = true;
+  } else {
+    inp.disabled = (w !== week);
+  }
+});
+}
+}
+
+// Remove header click activation; editing only after date chosen
+
+// Save checkup data
+async function saveCheckupData() {
+if (!selectedMember) {
+alert('No member selected');
+return;
+}
+
+// Collect all checkup data
+const checkupData = [];
+for (let week = 1; week <= 16; week++) {
+const weekData = { week, data: {} };
+
+const fields = ['age', 'height', 'weight', 'body_fat', 'bma', 'bmi', 'bmr', 'visceral_fat', 'subcutaneous_fat', 'muscle_mass'];
+fields.forEach(field => {
+  const input = document.querySelector(`input[data-week="${week}"][data-field="${field}"]`);
+  if (input && input.value.trim()) {
+    weekData.data[field] = input.value.trim();
+  }
+});
+// include date if provided via picker
+const dateInput = document.querySelector(`input[data-week="${week}"][data-field="date"]`);
+if (dateInput && dateInput.value) {
+  weekData.date = dateInput.value;
+}
+
+if (Object.keys(weekData.data).length > 0 || weekData.date) {
+  checkupData.push(weekData);
+}
+}
+
+try {
+const response = await fetch(`/api/body-checkup/${selectedMember.id}/save/`, {
+  method: 'POST',
+  headers: {
+    'Content-Type': 'application/json',
+    'X-CSRFToken': csrftoken || '',
+  },
+  body: JSON.stringify({ checkup_data: checkupData }),
+  credentials: 'same-origin'
+});
+
+if (response.ok) {
+  alert('Checkup data saved successfully!');
+  // lock the active week and disable all inputs again
+  if (activeWeek) {
+    lockedWeeks.add(activeWeek);
+    activeWeek = null;
+  }
+  disableAllInputs();
+} else {
+  const error = await response.json();
+  alert('Error saving data: ' + (error.detail || 'Unknown error'));
+}
+} catch (error) {
+console.error('Save error:', error);
+alert('Error saving checkup data');
+}
+}
+
+// Allow search on Enter key
+document.getElementById('searchInput').addEventListener('keypress', function(e) {
+if (e.key === 'Enter') {
+searchMember();
+}
+});
@@ -0,0 +1,23 @@
+// Fetch dashboard statistics
+async function loadStats() {
+  try {
+    const response = await fetch('/api/dashboard/stats/');
+    const data = await response.json();
+
+    document.getElementById('totalMembers').textContent = data.total_members || 0;
+    document.getElementById('todayAttendance').textContent = data.today_attendance || 0;
+    document.getElementById('totalBalance').textContent = '₹' + (data.total_outstanding_balance || 0).toFixed(2);
+  } catch (error) {
+    console.error('Failed to load stats:', error);
+  }
+}
+
+// Load stats on page load
+loadStats();
+
+// Account button action
+document.getElementById('accountBtn').addEventListener('click', function() {
+  if(confirm('Go to admin panel?')) {
+    window.location.href = '/admin/';
+  }
+});
@@ -0,0 +1,118 @@
+let currentMemberId = null;
+let currentRegistrationId = null;
+
+async function searchMember() {
+  const searchValue = document.getElementById('memberSearch').value.trim();
+
+  if (!searchValue) {
+    alert('Please enter a Member ID or Phone Number');
+    return;
+  }
+
+  try {
+    // One request: the member summary read model, looked up by code, phone or id
+    const response = await fetch(`/api/members/summary/?q=${encodeURIComponent(searchValue)}`, {
+      headers: {
+        'Authorization': 'Token ' + localStorage.getItem('authToken') // Adjust based on your auth
+      }
+    });
+
+    if (response.status === 404) {
+      document.getElementById('memberInfo').classList.add('hidden');
+      document.getElementById('noResults').classList.remove('hidden');
+      return;
+    }
+
+    if (!response.ok) {
+      throw new Error('Failed to fetch member');
+    }
+
+    const member = await response.json();
+    currentMemberId = member.id;
+    displayMemberDetails(member);
+
+  } catch (error) {
+    console.error('Error:', error);
+    alert('Error searching for member: ' + error.message);
+  }
+}
+
+function displayMemberDetails(member) {
+  document.getElementById('noResults').classList.add('hidden');
+  document.getElementById('memberInfo').classList.remove('hidden');
+
+  // Basic info
+  document.getElementById('memberName').textContent = member.full_name;
+  document.getElementById('memberCode').textContent = member.member_code;
+  document.getElementById('memberPhone').textContent = member.phone || 'N/A';
+  document.getElementById('memberGender').textContent = member.gender || 'N/A';
+  document.getElementById('memberMembership').textContent = member.membership
+    ? member.membership + (member.membership_label ? ` (${member.membership_label})` : '')
+    : 'N/A';
+  document.getElementById('memberBalance').textContent = '₹' + (member.balance || 0);
+
+  // Activity and progress
+  document.getElementById('visitCount').textContent = member.visit_count;
+  document.getElementById('lastVisit').textContent = formatDate(member.last_visit);
+  document.getElementById('totalPaid').textContent = '₹' + (member.total_paid || 0);
+  document.getElementById('weeksCompleted').textContent = member.weeks_completed + ' / 16';
+  document.getElementById('weightTrend').textContent = member.latest_weight
+    ? member.latest_weight + ' kg' + (member.weight_change !== null ? ` (${member.weight_change > 0 ? '+' : ''}${member.weight_change})` : '')
+    : 'N/A';
+
+  // Registration info
+  if (member.registration_id) {
+    currentRegistrationId = member.registration_id;
+    document.getElementById('memberAge').textContent = member.age || 'N/A';
+    document.getElementById('regDate').textContent = formatDate(member.registration_date);
+    document.getElementById('invitedBy').textContent = member.invited_by || 'N/A';
+    document.getElementById('registrationSection').classList.remove('hidden');
+  } else {
+    currentRegistrationId = null;
+    document.getElementById('memberAge').textContent = 'N/A';
+    document.getElementById('registrationSection').classList.add('hidden');
+  }
+
+  // Body evaluation info
+  if (member.latest_evaluation) {
+    const bodyEval = member.latest_evaluation;
+    document.getElementById('bodyHeight').textContent = bodyEval.height_cm || 'N/A';
+    document.getElementById('bodyWeight').textContent = bodyEval.weight_kg || 'N/A';
+    document.getElementById('bodyBMI').textContent = bodyEval.bmi || 'N/A';
+    document.getElementById('bodyVisceral').textContent = bodyEval.visceral_fat || 'N/A';
+    document.getElementById('bodyAge').textContent = bodyEval.body_age || 'N/A';
+    document.getElementById('bodyFat').textContent = bodyEval.fat || 'N/A';
+    document.getElementById('bodyFluids').textContent = bodyEval.fluids || 'N/A';
+    document.getElementById('bodyEvalSection').classList.remove('hidden');
+  } else {
+    document.getElementById('bodyEvalSection').classList.add('hidden');
+  }
+}
+
+function downloadAnalysisReport() {
+  if (!currentRegistrationId) {
+    alert('No registration found for this member');
+    return;
+  }
+
+  // Open PDF in new window
+  const url = `/api/reports/registration/${currentRegistrationId}/analysis/`;
+  window.open(url, '_blank');
+}
+
+function formatDate(dateString) {
+  if (!dateString) return 'N/A';
+  const date = new Date(dateString);
+  return date.toLocaleDateString('en-GB');
+}
+
+// Load member from URL parameter if provided
+window.addEventListener('load', function() {
+  const urlParams = new URLSearchParams(window.location.search);
+  const memberId = urlParams.get('member_id');
+
+  if (memberId) {
+    document.getElementById('memberSearch').value = memberId;
+    searchMember();
+  }
+});
@@ -0,0 +1,205 @@
+// Windowed member table for the UMS attendance page
+// Only the rows in view (plus a margin) are in the DOM. Rows are keyed by
+// member id and reused while scrolling, so a tick or a payment change touches
+// a single row and a new page of members only adds what is on screen.
+
+class MemberTable {
+    constructor(tbody, options = {}) {
+        this.tbody = tbody;
+        this.viewport = options.viewport;  // the scrolling element around the table
+        this.rowHeight = options.rowHeight || 53;  // re-measured from the first row drawn
+        this.overscan = options.overscan || 10;  // rows kept beyond each edge of the view
+        this.stateOf = options.stateOf || (() => undefined);  // member id -> pending entry
+        this.onToggle = options.onToggle || (() => {});
+        this.onPaid = options.onPaid || (() => {});
+        this.emptyText = options.emptyText || 'No members found';
+
+        this.members = [];
+        this.byId = new Map();  // member id -> member
+        this.rows = new Map();  // member id -> <tr> currently in the DOM
+        this.spare = [];  // detached rows for reuse
+        this.measured = false;
+        this.frame = null;
+
+        this.top = this.spacer();
+        this.bottom = this.spacer();
+
+        this.tbody.addEventListener('change', e => {
+            if (e.target.type !== 'checkbox') return;
+            const id = this.idOf(e.target);
+            this.onToggle(id, e.target.checked, e.target.closest('tr').querySelector('input[type=number]'));
+        });
+        this.tbody.addEventListener('input', e => {
+            if (e.target.type !== 'number') return;
+            this.onPaid(this.idOf(e.target), parseFloat(e.target.value) || 0);
+        });
+        this.viewport.addEventListener('scroll', () => this.schedule(), {passive: true});
+        window.addEventListener('resize', () => this.schedule());
+    }
+
+    // Replace the whole list, e.g. for a new search
+    setMembers(members) {
+        this.members = members;
+        this.byId = new Map(members.map(m => [m.id, m]));
+        this.viewport.scrollTop = 0;
+        this.update();
+    }
+
+    // Add a further page of the current list
+    append(members) {
+        for (const m of members) {
+            this.members.push(m);
+            this.byId.set(m.id, m);
+        }
+        this.update();
+    }
+
+    member(id) {
+        return this.byId.get(id);
+    }
+
+    // Redraw one member's row after its pending state changed; no-op when scrolled out of view
+    refresh(id) {
+        const tr = this.rows.get(id);
+        if (tr) this.fill(tr, this.byId.get(id));
+    }
+
+    // Redraw the rows in view, e.g. after all pending entries were cleared
+    refreshAll() {
+        for (const [id, tr] of this.rows) this.fill(tr, this.byId.get(id));
+    }
+
+    schedule() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => {
+                this.frame = null;
+                this.update();
+            });
+        }
+    }
+
+    // Bring the DOM in line with the scroll position: recycle rows that left
+    // the window, draw the ones that entered it, leave the rest untouched
+    update() {
+        if (this.members.length === 0) {
+            this.showEmpty();
+            return;
+        }
+        if (this.message) {
+            this.message.remove();
+            this.message = null;
+        }
+        if (!this.top.parentNode) {
+            this.tbody.replaceChildren(this.top, this.bottom);
+        }
+
+        const count = this.members.length;
+        const visible = Math.ceil((this.viewport.clientHeight || 600) / this.rowHeight);
+        const first = Math.max(0, Math.floor(this.viewport.scrollTop / this.rowHeight) - this.overscan);
+        const last = Math.min(count, first + visible + 2 * this.overscan);
+
+        const wanted = new Set();
+        for (let i = first; i < last; i++) wanted.add(this.members[i].id);
+        for (const [id, tr] of this.rows) {
+            if (!wanted.has(id) || tr.member !== this.byId.get(id)) {
+                tr.remove();
+                this.rows.delete(id);
+                this.spare.push(tr);
+            }
+        }
+
+        let next = this.top.nextSibling;
+        for (let i = first; i < last; i++) {
+            const member = this.members[i];
+            let tr = this.rows.get(member.id);
+            if (!tr) {
+                tr = this.spare.pop() || this.createRow();
+                this.fill(tr, member);
+                this.rows.set(member.id, tr);
+            }
+            if (tr === next) {
+                next = next.nextSibling;
+            } else {
+                this.tbody.insertBefore(tr, next);
+            }
+        }
+
+        if (!this.measured && this.rows.size) {
+            const height = this.rows.values().next().value.offsetHeight;
+            if (height > 0) {
+                this.measured = true;
+                if (height !== this.rowHeight) {
+                    this.rowHeight = height;
+                    this.update();
+                    return;
+                }
+            }
+        }
+
+        this.top.style.height = `${first * this.rowHeight}px`;
+        this.bottom.style.height = `${(count - last) * this.rowHeight}px`;
+    }
+
+    showEmpty() {
+        for (const tr of this.rows.values()) this.spare.push(tr);
+        this.rows.clear();
+        if (!this.message) {
+            this.message = document.createElement('tr');
+            this.message.innerHTML = '<td colspan="6" class="px-4 py-8 text-center text-gray-500"></td>';
+        }
+        this.message.firstChild.textContent = this.emptyText;
+        this.tbody.replaceChildren(this.message);
+    }
+
+    spacer() {
+        const tr = document.createElement('tr');
+        tr.setAttribute('aria-hidden', 'true');
+        tr.style.border = '0';
+        return tr;
+    }
+
+    createRow() {
+        const tr = document.createElement('tr');
+        tr.className = 'hover:bg-gray-50 transition-colors';
+        tr.innerHTML = `
+            <td class="px-4 py-3 text-sm"></td>
+            <td class="px-4 py-3 text-sm"></td>
+            <td class="px-4 py-3 text-sm"></td>
+            <td class="px-4 py-3 text-sm"></td>
+            <td class="px-4 py-3">
+                <input type="number"
+                       min="0"
+                       step="0.01"
+                       class="border rounded px-2 py-1 w-24 text-sm focus:outline-none focus:ring-2 focus:ring-blue-500" />
+            </td>
+            <td class="px-4 py-3 text-center">
+                <input type="checkbox" class="w-5 h-5 cursor-pointer accent-blue-600" />
+            </td>
+        `;
+        return tr;
+    }
+
+    fill(tr, member) {
+        const state = this.stateOf(member.id);
+        const cells = tr.children;
+        const paid = cells[4].firstElementChild;
+        const present = cells[5].firstElementChild;
+
+        tr.member = member;
+        tr.dataset.id = member.id;
+        cells[0].textContent = member.full_name;
+        cells[1].textContent = member.phone || '-';
+        cells[2].textContent = member.membership_label || '';
+        cells[3].textContent = `₹${parseFloat(member.balance).toFixed(2)}`;
+        cells[3].className = `px-4 py-3 text-sm ${member.balance > 0 ? 'text-red-600' : 'text-green-600'}`;
+        present.checked = Boolean(state && state.present);
+        paid.disabled = !present.checked;
+        const value = String(state ? state.paid_amount : 0);
+        // Leave the box alone while it is typed into and still holds the same amount
+        if (parseFloat(paid.value) !== parseFloat(value)) paid.value = value;
+    }
+
+    idOf(element) {
+        return Number(element.closest('tr').dataset.id);
+    }
+}
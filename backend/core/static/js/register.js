@@ -0,0 +1,294 @@
+// Gender-dependent field management
+function updateGenderFields() {
+  const genderSelect = document.getElementById('gender');
+  const gender = genderSelect.value;
+
+  const bodyFatMen = document.getElementById('body_fat_men');
+  const bodyFatWomen = document.getElementById('body_fat_women');
+  const skeletalMuscleMen = document.getElementById('skeletal_muscle_men');
+  const skeletalMuscleWomen = document.getElementById('skeletal_muscle_women');
+
+  // Reset all fields first
+  [bodyFatMen, bodyFatWomen, skeletalMuscleMen, skeletalMuscleWomen].forEach(field => {
+    field.disabled = false;
+    field.classList.remove('bg-gray-100');
+  });
+
+  if (gender === 'Male') {
+    // Disable women fields
+    bodyFatWomen.disabled = true;
+    bodyFatWomen.classList.add('bg-gray-100');
+    bodyFatWomen.value = '';
+    skeletalMuscleWomen.disabled = true;
+    skeletalMuscleWomen.classList.add('bg-gray-100');
+    skeletalMuscleWomen.value = '';
+  } else if (gender === 'Female') {
+    // Disable men fields
+    bodyFatMen.disabled = true;
+    bodyFatMen.classList.add('bg-gray-100');
+    bodyFatMen.value = '';
+    skeletalMuscleMen.disabled = true;
+    skeletalMuscleMen.classList.add('bg-gray-100');
+    skeletalMuscleMen.value = '';
+  }
+  // For 'Other' gender, all fields remain enabled (no restrictions)
+}
+
+// Attach event listener to gender dropdown
+document.getElementById('gender').addEventListener('change', updateGenderFields);
+
+// Call on page load with default value
+document.addEventListener('DOMContentLoaded', updateGenderFields);
+
+// Membership amount auto-fill logic
+const membershipSelect = document.getElementById('membership');
+const totalAmountInput = document.getElementById('plan_total_amount');
+const initialPaidInput = document.getElementById('initial_amount_paid');
+const numberOfDaysContainer = document.getElementById('numberOfDaysContainer');
+const numberOfDaysInput = document.getElementById('number_of_days');
+
+function updateMembershipAmounts() {
+  const val = membershipSelect.value;
+
+  if (val === 'TRIAL') {
+    // TRIAL: predefined amount, payment fields read-only
+    totalAmountInput.value = 700;
+    totalAmountInput.readOnly = true;
+    totalAmountInput.classList.add('bg-gray-100');
+    initialPaidInput.disabled = false;
+    if (!initialPaidInput.value) initialPaidInput.value = 0;
+
+    // Hide Number of Days field
+    numberOfDaysContainer.style.display = 'none';
+    numberOfDaysInput.disabled = true;
+    numberOfDaysInput.removeAttribute('required');
+    numberOfDaysInput.value = '';
+
+  } else if (val === 'UMS') {
+    // UMS: predefined amount, payment fields read-only
+    totalAmountInput.value = 5400;
+    totalAmountInput.readOnly = true;
+    totalAmountInput.classList.add('bg-gray-100');
+    initialPaidInput.disabled = false;
+    if (!initialPaidInput.value) initialPaidInput.value = 0;
+
+    // Hide Number of Days field
+    numberOfDaysContainer.style.display = 'none';
+    numberOfDaysInput.disabled = true;
+    numberOfDaysInput.removeAttribute('required');
+    numberOfDaysInput.value = '';
+
+  } else if (val === 'COMPLEMENT') {
+    // COMPLEMENT: zero amount, initial paid disabled
+    totalAmountInput.value = 0;
+    totalAmountInput.readOnly = true;
+    totalAmountInput.classList.add('bg-gray-100');
+    initialPaidInput.value = 0;
+    initialPaidInput.disabled = true;
+
+    // Hide Number of Days field
+    numberOfDaysContainer.style.display = 'none';
+    numberOfDaysInput.disabled = true;
+    numberOfDaysInput.removeAttribute('required');
+    numberOfDaysInput.value = '';
+
+  } else if (val === 'OTHERS') {
+    // OTHERS: custom amounts allowed, payment fields editable
+    totalAmountInput.value = '';
+    totalAmountInput.readOnly = false;
+    totalAmountInput.classList.remove('bg-gray-100');
+    initialPaidInput.value = '';
+    initialPaidInput.disabled = false;
+
+    // Show Number of Days field and make it required
+    numberOfDaysContainer.style.display = 'block';
+    numberOfDaysInput.disabled = false;
+    numberOfDaysInput.setAttribute('required', 'required');
+
+  } else {
+    // Default: clear values
+    totalAmountInput.value = '';
+    totalAmountInput.readOnly = true;
+    totalAmountInput.classList.add('bg-gray-100');
+    initialPaidInput.disabled = false;
+
+    // Hide Number of Days field
+    numberOfDaysContainer.style.display = 'none';
+    numberOfDaysInput.disabled = true;
+    numberOfDaysInput.removeAttribute('required');
+    numberOfDaysInput.value = '';
+  }
+}
+
+membershipSelect.addEventListener('change', updateMembershipAmounts);
+window.addEventListener('load', updateMembershipAmounts);
+
+// Client side: prevent default and post JSON to API endpoint
+document.getElementById('registrationForm').addEventListener('submit', async function(e){
+  e.preventDefault();
+  const form = e.target;
+  const formData = new FormData(form);
+  const reg = {};
+  const bodyEval = {};
+
+  // map registration fields (including new invited_by, gender, and membership)
+  ['guest_name','mobile_number','invited_by','gender','membership','occupation','location','do_you_exercise','hours_sleep','liters_water','loss_of_energy','veg_nonveg','transformation_targets','tried_diet_programs','surveyed_by','available_time'].forEach(k=>{
+    const value = formData.get(k);
+    if (value !== null && value !== '') {
+      reg[k] = value;
+    }
+  });
+
+  // Add age as integer
+  reg.age = parseInt(formData.get('age'));
+
+  // Add number_of_days if membership is OTHERS
+  const membershipValue = formData.get('membership');
+  if (membershipValue === 'OTHERS') {
+    const numberOfDays = formData.get('number_of_days');
+    if (numberOfDays) {
+      reg.number_of_days = parseInt(numberOfDays);
+    }
+  }
+
+  // Payment fields
+  reg.plan_total_amount = parseFloat(totalAmountInput.value || 0);
+  reg.initial_amount_paid = parseFloat(initialPaidInput.value || 0);
+
+  // Build structured personal_health_history JSON
+  const healthHistory = {
+    diabetes: formData.get('diabetes') || 'no',
+    bp: formData.get('bp') || 'none',
+    thyroid: formData.get('thyroid') || 'no',
+    cholesterol: formData.get('cholesterol') || 'no',
+    gas_acidity: formData.get('gas_acidity') || 'none',
+    ulcer: formData.get('ulcer') || 'no',
+    digestive_problem: formData.get('digestive_problem') || 'no',
+    constipation: formData.get('constipation') || 'no',
+    headache_migraine: formData.get('headache_migraine') || 'none',
+    asthma_breathing: formData.get('asthma_breathing') || 'no',
+    knee_joint_back: formData.getAll('knee_joint_back'),
+    heart_kidney_liver: formData.getAll('heart_kidney_liver'),
+    skin_hair_problem: formData.get('skin_hair_problem') || 'no',
+    vitamin_mineral_def: formData.get('vitamin_mineral_def') || 'no',
+    gynec_infections: formData.get('gynec_infections') || 'no',
+    overweight: formData.get('overweight') || 'no',
+    underweight: formData.get('underweight') || 'no',
+    low_energy: formData.get('low_energy') || 'no',
+    snoring_sleeping: formData.get('snoring_sleeping') || 'no',
+    depression: formData.get('depression') || 'no'
+  };
+  reg.personal_health_history = healthHistory;
+
+  // map body fields (fat and fluids are now auto-calculated in backend)
+  ['height_cm','weight_kg','visceral_fat','trunk_subcutaneous_fat','body_fat_men','body_fat_women','body_age','bmi','bmr_rm','skeletal_muscle_men','skeletal_muscle_women','notes'].forEach(k=>{
+    const value = formData.get(k);
+    if (value !== null && value !== '') {
+      bodyEval[k] = value;
+    }
+  });
+
+  // Add today's date for body evaluation
+  bodyEval.date = new Date().toISOString().split('T')[0];
+
+  // Convert tried_diet_programs to boolean
+  if (reg.tried_diet_programs !== undefined) {
+    reg.tried_diet_programs = (reg.tried_diet_programs === 'true');
+  }
+
+  // Do client-side validation for mandatory fields (updated list)
+  const mandatory = ['guest_name','mobile_number','invited_by','gender','membership','occupation','age','do_you_exercise','hours_sleep','liters_water','loss_of_energy','transformation_targets','surveyed_by','available_time'];
+  for(const f of mandatory){
+    if(!reg[f]){
+      alert('Missing required field: ' + f);
+      return;
+    }
+  }
+
+  // Validate number_of_days if membership is OTHERS
+  if (reg.membership === 'OTHERS') {
+    if (!reg.number_of_days || reg.number_of_days <= 0) {
+      alert('Number of Days is required and must be greater than 0 for Others membership');
+      return;
+    }
+  }
+
+  // Validate payment amounts for OTHERS membership
+  if (reg.membership === 'OTHERS') {
+    if (!reg.plan_total_amount || reg.plan_total_amount < 0) {
+      alert('Please enter a valid Total Amount for Others membership');
+      return;
+    }
+  }
+
+  // Body mandatory fields - fat and fluids are now auto-calculated
+  const bodyMandatory = ['height_cm','weight_kg','visceral_fat'];
+  for(const f of bodyMandatory){
+    if(!bodyEval[f]){
+      alert('Missing required body field: ' + f);
+      return;
+    }
+  }
+
+  const payload = { registration: reg, body_evaluation: bodyEval };
+
+  try {
+    const resp = await fetch('/api/registrations/', {
+      method: 'POST',
+      headers: { 
+        'Content-Type': 'application/json',
+        'X-CSRFToken': getCookie('csrftoken')
+      },
+      body: JSON.stringify(payload)
+    });
+
+    if(resp.ok){
+      const data = await resp.json();
+      // Get registration ID from response
+      const regId = data.registration && data.registration.id;
+
+      if (!regId) {
+        alert('Registration saved, but no registration ID returned.');
+        return;
+      }
+
+      // Show success message
+      alert('Registration submitted successfully! Your analysis PDF will download now.');
+
+      // Trigger PDF download in a new tab to keep current page
+      window.open(`/api/reports/registration/${regId}/analysis/`, '_blank');
+
+      // Clear the form after successful submission
+      form.reset();
+
+      // Reset any programmatically set values
+      totalAmountInput.value = '';
+      initialPaidInput.value = '0';
+      initialPaidInput.disabled = false;
+
+      // Trigger gender field update to reset disabled states
+      updateGenderFields();
+    } else {
+      const err = await resp.json();
+      alert('Error: ' + JSON.stringify(err));
+    }
+  } catch(error) {
+    alert('Network error: ' + error.message);
+  }
+});
+
+// Helper function to get CSRF token from cookies
+function getCookie(name) {
+  let cookieValue = null;
+  if (document.cookie && document.cookie !== '') {
+    const cookies = document.cookie.split(';');
+    for (let i = 0; i < cookies.length; i++) {
+      const cookie = cookies[i].trim();
+      if (cookie.substring(0, name.length + 1) === (name + '=')) {
+        cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+        break;
+      }
+    }
+  }
+  return cookieValue;
+}
@@ -23,93 +23,49 @@ function getCookie(name) {
 
 const csrftoken = getCookie('csrftoken');
 
-// Fetch members from API
+// Members are loaded in pages of this size; the first page is shown while the rest arrive
+const PAGE_SIZE = 1000;
+
+let table = null;
+let fetchSeq = 0;
+
+// Fetch all members from API, page by page
 async function fetchMembers(search = '') {
+    const seq = ++fetchSeq;
     try {
-        let url = '/api/members/';
+        let url = `/api/members/?page_size=${PAGE_SIZE}`;
         if (search) {
-            url += `?search=${encodeURIComponent(search)}`;
+            url += `&search=${encodeURIComponent(search)}`;
         }
         
-        const response = await fetch(url);
-        if (!response.ok) {
-            throw new Error('Failed to fetch members');
+        let firstPage = true;
+        while (url) {
+            const response = await fetch(url);
+            if (!response.ok) {
+                throw new Error('Failed to fetch members');
+            }
+            
+            const data = await response.json();
+            if (seq !== fetchSeq) {
+                return;  // a newer search has started
+            }
+            const members = data.results || data;
+            if (firstPage) {
+                MEMBERS = members;
+                table.setMembers(MEMBERS);
+                firstPage = false;
+            } else {
+                table.append(members);
+            }
+            url = data.next || null;
         }
-        
-        const data = await response.json();
-        MEMBERS = data.results || data;
-        renderTable();
     } catch (error) {
         console.error('Error fetching members:', error);
         showMessage('Failed to load members. Please refresh the page.', 'error');
     }
 }
 
-// Render members table
-function renderTable() {
-    const tbody = document.getElementById('membersTable');
-    tbody.innerHTML = '';
-    
-    if (MEMBERS.length === 0) {
-        tbody.innerHTML = `
-            <tr>
-                <td colspan="6" class="px-4 py-8 text-center text-gray-500">
-                    No members found
-                </td>
-            </tr>
-        `;
-        return;
-    }
-    
-    MEMBERS.forEach(member => {
-        const tr = document.createElement('tr');
-        tr.className = 'hover:bg-gray-50 transition-colors';
-        
-        const isPending = pending[member.id];
-        const paidAmount = isPending ? isPending.paid_amount : 0;
-        const isPresent = isPending ? isPending.present : false;
-        
-        tr.innerHTML = `
-            <td class="px-4 py-3 text-sm">${member.full_name}</td>
-            <td class="px-4 py-3 text-sm">${member.phone || '-'}</td>
-            <td class="px-4 py-3 text-sm">${member.membership_label || ''}</td>
-            <td class="px-4 py-3 text-sm ${member.balance > 0 ? 'text-red-600' : 'text-green-600'}">
-                ₹${parseFloat(member.balance).toFixed(2)}
-            </td>
-            <td class="px-4 py-3">
-                <input type="number" 
-                       min="0" 
-                       step="0.01" 
-                       id="paid-${member.id}" 
-                       value="${paidAmount}"
-                       class="border rounded px-2 py-1 w-24 text-sm focus:outline-none focus:ring-2 focus:ring-blue-500"
-                       ${isPresent ? '' : 'disabled'} />
-            </td>
-            <td class="px-4 py-3 text-center">
-                <input type="checkbox" 
-                       id="chk-${member.id}" 
-                       ${isPresent ? 'checked' : ''}
-                       class="w-5 h-5 cursor-pointer accent-blue-600" />
-            </td>
-        `;
-        
-        tbody.appendChild(tr);
-        
-        // Add event listeners
-        const checkbox = document.getElementById(`chk-${member.id}`);
-        const paidInput = document.getElementById(`paid-${member.id}`);
-        
-        checkbox.addEventListener('change', function(e) {
-            handleCheckboxChange(member.id, e.target.checked, paidInput);
-        });
-        
-        paidInput.addEventListener('input', function(e) {
-            handlePaidAmountChange(member.id, parseFloat(e.target.value) || 0);
-        });
-    });
-}
-
-// Handle checkbox change
+// Handle checkbox change; the table has already updated the checkbox itself
 function handleCheckboxChange(memberId, checked, paidInput) {
     if (checked) {
         const paidVal = parseFloat(paidInput.value) || 0;
@@ -155,7 +111,7 @@ function updatePendingUI() {
         
         for (const id in pending) {
             const p = pending[id];
-            const member = MEMBERS.find(m => m.id == id);
+            const member = table.member(Number(id));
             
             if (member) {
                 const li = document.createElement('li');
@@ -275,7 +231,7 @@ function initializeDates() {
         // Clear pending when date changes
         pending = {};
         updatePendingUI();
-        renderTable();
+        table.refreshAll();
     });
 }
 
@@ -294,6 +250,13 @@ function initializeSearch() {
 
 // Initialize event listeners
 function initialize() {
+    table = new MemberTable(document.getElementById('membersTable'), {
+        viewport: document.getElementById('membersViewport'),
+        stateOf: id => pending[id],
+        onToggle: handleCheckboxChange,
+        onPaid: handlePaidAmountChange
+    });
+    
     initializeDates();
     initializeSearch();
     
@@ -0,0 +1,202 @@
+"""
+Maintenance of the MemberSummary read model.
+
+A member's summary row is rebuilt from their records whenever one of them
+changes. Inside a transaction the rebuild is deferred to commit and each
+member is rebuilt once, however many rows the transaction touched, with
+all of the transaction's members rebuilt together; outside a transaction
+it happens immediately.
+"""
+import json
+import threading
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+
+from .models import (
+    Member, Attendance, Payment, Checkup, Registration, BodyComponentEvaluation, MemberSummary,
+    AttendanceRollup,
+)
+
+
+# Weeks of the programme tracked on the body checkup page
+PROGRAMME_WEEKS = 16
+
+EVALUATION_FIELDS = ['height_cm', 'weight_kg', 'bmi', 'visceral_fat', 'body_age', 'fat', 'fluids']
+
+_pending = threading.local()
+
+
+def _json(value):
+    # Store JSON columns in their encoded form so a freshly built row
+    # serializes exactly like one read back from the database
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+
+def build(member):
+    """Return an unsaved MemberSummary computed from the member's records."""
+    return build_many([member])[member.pk]
+
+
+def build_many(members):
+    """
+    Unsaved MemberSummary rows for `members`, keyed by member id, in four
+    queries however many members there are.
+    """
+    member_ids = [member.pk for member in members]
+    visits = {
+        row['member_id']: row
+        for row in Attendance.objects.filter(member_id__in=member_ids).order_by().values('member_id').annotate(
+            count=Count('id', filter=Q(present=True)),
+            last=Max('date', filter=Q(present=True)),
+        )
+    }
+    # Visits in years moved to the archive
+    for row in (AttendanceRollup.objects.filter(member_id__in=member_ids).order_by()
+                .values('member_id').annotate(count=Sum('visits'), last=Max('last_visit'))):
+        live = visits.setdefault(row['member_id'], {'count': 0, 'last': None})
+        live['count'] += row['count']
+        live['last'] = max(filter(None, (live['last'], row['last'])), default=None)
+    evaluations = defaultdict(list)
+    for row in (BodyComponentEvaluation.objects.filter(member_id__in=member_ids)
+                .order_by('-date', '-id').values('member_id', 'date', *EVALUATION_FIELDS)):
+        evaluations[row.pop('member_id')].append(row)
+    checkups = defaultdict(list)
+    for member_id, *checkup in (Checkup.objects.filter(member_id__in=member_ids)
+                                .order_by('checkup_date', 'id')
+                                .values_list('member_id', 'checkup_date', 'weight', 'height')):
+        checkups[member_id].append(tuple(checkup))
+
+    return {
+        member.pk: _summary(member, visits.get(member.pk), evaluations[member.pk], checkups[member.pk])
+        for member in members
+    }
+
+
+def _summary(member, visits, evaluations, checkups):
+    registration = getattr(member, 'registration', None)
+    visits = visits or {'count': 0, 'last': None}
+
+    latest_checkup = checkups[-1] if checkups else None
+    weighed = [(day, weight) for day, weight, _ in checkups if weight is not None]
+    start_weight = evaluations[-1]['weight_kg'] if evaluations else (weighed[0][1] if weighed else None)
+
+    # Week 1 is always the registration evaluation, as on the checkup page
+    weeks = {1}
+    if member.registration_date:
+        for day, _, _ in checkups:
+            week = (day - member.registration_date).days // 7 + 1
+            if 1 <= week <= PROGRAMME_WEEKS:
+                weeks.add(week)
+
+    return MemberSummary(
+        member_id=member.pk,
+        member_code=member.member_code,
+        full_name=member.full_name,
+        phone=member.phone,
+        gender=member.gender,
+        membership=member.membership,
+        membership_total_sessions=member.membership_total_sessions,
+        ums_count=member.ums_count,
+        registration_id=registration.id if registration else None,
+        registration_date=member.registration_date,
+        invited_by=(registration.invited_by if registration else None) or member.invited_by,
+        age=registration.age if registration else None,
+        visit_count=visits['count'],
+        last_visit=visits['last'],
+        total_paid=member.total_paid,
+        balance=member.balance,
+        latest_checkup_date=latest_checkup[0] if latest_checkup else None,
+        latest_weight=latest_checkup[1] if latest_checkup and latest_checkup[1] is not None else member.latest_weight,
+        latest_height=latest_checkup[2] if latest_checkup and latest_checkup[2] is not None else member.latest_height,
+        start_weight=start_weight,
+        weight_trend=_json(weighed),
+        latest_evaluation=_json(evaluations[0]) if evaluations else None,
+        weeks_completed=len(weeks),
+    )
+
+
+def refresh(member_id):
+    """Rebuild one member's summary row; returns it, or None if the member is gone."""
+    member = Member.objects.select_related('registration').filter(pk=member_id).first()
+    if member is None:
+        MemberSummary.objects.filter(member_id=member_id).delete()
+        return None
+
+    summary = build(member)
+    summary.refreshed_at = timezone.now()
+    fields = {f.attname: getattr(summary, f.attname) for f in MemberSummary._meta.concrete_fields if not f.primary_key}
+    if not MemberSummary.objects.filter(member_id=member_id).update(**fields):
+        summary.save(force_insert=True)
+    return summary
+
+
+def refresh_many(member_ids):
+    """Rebuild several members' summary rows in a fixed number of queries; returns how many were rebuilt."""
+    member_ids = set(member_ids)
+    members = list(Member.objects.select_related('registration').filter(pk__in=member_ids))
+    gone = member_ids - {member.pk for member in members}
+    if gone:
+        MemberSummary.objects.filter(member_id__in=gone).delete()
+    if not members:
+        return 0
+
+    summaries = list(build_many(members).values())
+    now = timezone.now()
+    for row in summaries:
+        row.refreshed_at = now
+    stored = set(MemberSummary.objects.filter(member_id__in=[row.member_id for row in summaries])
+                 .values_list('member_id', flat=True))
+    fields = [f.name for f in MemberSummary._meta.concrete_fields if not f.primary_key]
+    MemberSummary.objects.bulk_update([row for row in summaries if row.member_id in stored], fields)
+    MemberSummary.objects.bulk_create([row for row in summaries if row.member_id not in stored])
+    return len(summaries)
+
+
+def mark_stale(member_id):
+    """Schedule a rebuild of the member's summary."""
+    if not connection.in_atomic_block:
+        refresh(member_id)
+        return
+
+    # Members wait in this thread's pending set, which the first hook to run
+    # at commit rebuilds and empties; the hooks after it find nothing to do.
+    # A hook goes with every change because a rolled-back savepoint discards
+    # the hooks queued inside it, so only one queued with a change that
+    # commits is sure to run. Members left by a rollback are rebuilt,
+    # unchanged, at the next commit.
+    member_ids = getattr(_pending, 'member_ids', None)
+    if member_ids is None:
+        member_ids = _pending.member_ids = set()
+    member_ids.add(member_id)
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    member_ids = getattr(_pending, 'member_ids', None)
+    if not member_ids:
+        return
+    _pending.member_ids = set()
+    if len(member_ids) == 1:
+        refresh(*member_ids)
+    else:
+        refresh_many(member_ids)
+
+
+def _member_changed(sender, instance, **kwargs):
+    mark_stale(instance.pk)
+
+
+def _member_record_changed(sender, instance, **kwargs):
+    if instance.member_id:
+        mark_stale(instance.member_id)
+
+
+post_save.connect(_member_changed, sender=Member)
+for signal in (post_save, post_delete):
+    for model in (Attendance, Payment, Checkup, Registration, BodyComponentEvaluation):
+        signal.connect(_member_record_changed, sender=model)
@@ -0,0 +1,237 @@
+"""
+Direct PDF writer for purely tabular reports.
+
+Lays rows out on a fixed A4 grid with the PDF base-14 Helvetica fonts and
+writes each page as soon as it is full, so a report is streamed page by
+page and memory stays bounded by one page whatever the row count. Rich
+documents (analysis_report.html) keep going through WeasyPrint in core.pdf.
+
+The base-14 fonts only cover WinAnsi (cp1252) text. Callers check their
+data with encodable() first and render through WeasyPrint when a name is in
+another script (Devanagari, Tamil, Arabic, ...), rather than print '?'.
+"""
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 36
+ROW_HEIGHT = 16
+FONT_SIZE = 8.5
+
+# Character set of the base-14 fonts' WinAnsiEncoding
+ENCODING = 'cp1252'
+
+# #667eea, the report accent colour, and the zebra stripe
+ACCENT = (0.4, 0.494, 0.918)
+STRIPE = (0.973, 0.976, 0.98)
+
+# Helvetica advance widths (1/1000 em) for ASCII 32-126; other characters
+# are measured as 556
+_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+
+Column = namedtuple('Column', ['title', 'width', 'align'], defaults=['left'])
+Column.__doc__ = 'A table column: heading, share of the table width and alignment.'
+
+
+def text_width(text, size=FONT_SIZE):
+    return sum(_WIDTHS[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in text) * size / 1000
+
+
+def _fit(text, width, size):
+    if text_width(text, size) <= width:
+        return text
+    while text and text_width(text + '...', size) > width:
+        text = text[:-1]
+    return text + '...'
+
+
+def encodable(texts):
+    """Whether every one of `texts` (None allowed) can be drawn with the base-14 fonts."""
+    try:
+        for text in texts:
+            if text is not None:
+                str(text).encode(ENCODING)
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _literal(text):
+    # Callers check encodable() first; replacement is only a last resort
+    encoded = text.encode(ENCODING, errors='replace')
+    return b'(' + encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class TablePDF:
+    """
+    Incremental PDF document made of headings and tables.
+
+    Every method is a generator of bytes chunks; chain them inside one
+    generator and hand that to a StreamingHttpResponse:
+
+        doc = TablePDF('Daily Attendance Report', org_name)
+        yield from doc.heading(['Date: 2025-11-05'])
+        yield from doc.table(columns, rows, total=[...])
+        yield from doc.close()
+    """
+
+    def __init__(self, title, org_name, footer=None):
+        self.title = title
+        self.org_name = org_name
+        self.footer = footer or f'Generated on {datetime.now():%Y-%m-%d %H:%M} | {org_name}'
+        self.offset = 0
+        self.offsets = {}  # object number -> byte offset, for the xref table
+        self.page_ids = []
+        self.next_id = 5  # 1 catalog, 2 page tree, 3-4 fonts
+        self.ops = None
+        self.y = None
+        self.started = False
+
+    # -- PDF objects --------------------------------------------------------
+
+    def _emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def _object(self, number, body):
+        self.offsets[number] = self.offset
+        return self._emit(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+
+    def _start(self):
+        self.started = True
+        yield self._emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        yield self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        yield self._object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        yield self._object(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+    def _flush_page(self):
+        self._text(self.footer, MARGIN, MARGIN - 14, size=7, colour=(0.4, 0.4, 0.4))
+        self._text(f'Page {len(self.page_ids) + 1}', PAGE_WIDTH - MARGIN, MARGIN - 14, size=7,
+                   colour=(0.4, 0.4, 0.4), align='right')
+        stream = zlib.compress(b'\n'.join(self.ops))
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        self.ops = None
+        yield self._object(
+            content_id,
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream',
+        )
+        yield self._object(page_id, (
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+            '/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>' % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        ).encode())
+
+    def _new_page(self):
+        if not self.started:
+            yield from self._start()
+        if self.ops is not None:
+            yield from self._flush_page()
+        self.ops = []
+        self.y = PAGE_HEIGHT - MARGIN
+        if not self.page_ids:
+            self._text(self.org_name, PAGE_WIDTH / 2, self.y - 16, size=16, bold=True, colour=ACCENT, align='center')
+            self._text(self.title, PAGE_WIDTH / 2, self.y - 32, size=10, align='center')
+            self.y -= 42
+            self._rect(MARGIN, self.y, PAGE_WIDTH - 2 * MARGIN, 2, ACCENT)
+            self.y -= 14
+
+    def _ensure_room(self, height):
+        if self.ops is None or self.y - height < MARGIN:
+            yield from self._new_page()
+
+    # -- drawing ------------------------------------------------------------
+
+    def _rect(self, x, y, width, height, colour):
+        self.ops.append(b'%.3f %.3f %.3f rg %.2f %.2f %.2f %.2f re f' % (*colour, x, y, width, height))
+
+    def _text(self, text, x, y, size=FONT_SIZE, bold=False, colour=(0.2, 0.2, 0.2), align='left', width=None):
+        text = str(text)
+        if width is not None:
+            text = _fit(text, width, size)
+        if align == 'right':
+            x -= text_width(text, size)
+        elif align == 'center':
+            x -= text_width(text, size) / 2
+        self.ops.append(
+            b'BT /%s %.1f Tf %.3f %.3f %.3f rg %.2f %.2f Td ' % (b'F2' if bold else b'F1', size, *colour, x, y)
+            + _literal(text) + b' Tj ET'
+        )
+
+    def _row(self, columns, widths, values, bold=False, colour=(0.2, 0.2, 0.2)):
+        x = MARGIN
+        for column, width, value in zip(columns, widths, values):
+            anchor = x + width - 4 if column.align == 'right' else x + 4
+            self._text(value, anchor, self.y - ROW_HEIGHT + 5, bold=bold, colour=colour,
+                       align=column.align, width=width - 8)
+            x += width
+
+    def _table_header(self, columns, widths):
+        self._rect(MARGIN, self.y - ROW_HEIGHT, sum(widths), ROW_HEIGHT, ACCENT)
+        self._row(columns, widths, [c.title.upper() for c in columns], bold=True, colour=(1, 1, 1))
+        self.y -= ROW_HEIGHT
+
+    # -- public API ---------------------------------------------------------
+
+    def heading(self, lines, bold=False, size=10):
+        """Write lines of text above the next table."""
+        for line in lines:
+            yield from self._ensure_room(size + 6)
+            self._text(line, MARGIN, self.y - size, size=size, bold=bold, colour=ACCENT if bold else (0.2, 0.2, 0.2))
+            self.y -= size + 6
+        self.y -= 4
+
+    def table(self, columns, rows, total=None):
+        """
+        Write a table, repeating its header on every page it spans.
+
+        Args:
+            columns: Column tuples; widths are relative and fill the page width
+            rows: iterable of value sequences, consumed lazily
+            total: optional bold last row
+        """
+        scale = (PAGE_WIDTH - 2 * MARGIN) / sum(c.width for c in columns)
+        widths = [c.width * scale for c in columns]
+
+        yield from self._ensure_room(ROW_HEIGHT * 2)
+        self._table_header(columns, widths)
+        for index, row in enumerate(rows):
+            if self.y - ROW_HEIGHT < MARGIN:
+                yield from self._new_page()
+                self._table_header(columns, widths)
+            if index % 2:
+                self._rect(MARGIN, self.y - ROW_HEIGHT, sum(widths), ROW_HEIGHT, STRIPE)
+            self._row(columns, widths, row)
+            self.y -= ROW_HEIGHT
+
+        if total is not None:
+            yield from self._ensure_room(ROW_HEIGHT)
+            self._rect(MARGIN, self.y - ROW_HEIGHT, sum(widths), ROW_HEIGHT, ACCENT)
+            self._row(columns, widths, total, bold=True, colour=(1, 1, 1))
+            self.y -= ROW_HEIGHT
+        self.y -= ROW_HEIGHT
+
+    def close(self):
+        """Finish the last page and write the page tree, xref table and trailer."""
+        yield from self._ensure_room(0)
+        yield from self._flush_page()
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        yield self._object(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids)))
+
+        xref_offset = self.offset
+        lines = [b'xref\n0 %d\n' % self.next_id, b'0000000000 65535 f \n']
+        lines += [b'%010d 00000 n \n' % self.offsets[number] for number in range(1, self.next_id)]
+        yield self._emit(b''.join(lines))
+        yield self._emit(
+            b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (self.next_id, xref_offset)
+        )
@@ -1,10 +1,32 @@
-from django.test import TestCase
+from django.test import Client, TestCase, TransactionTestCase, AsyncRequestFactory, override_settings
+from django.conf import settings as django_settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, connections, router, transaction
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import caches
+from django.http import Http404
+from django.utils import timezone
+from unittest import mock, skipUnless
+from datetime import timedelta
+import contextvars
+import logging
+import tempfile
+import threading
+import time
+import zipfile
+from asgiref.sync import async_to_sync, sync_to_async
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from decimal import Decimal
 from datetime import date
 import json
-from .models import Member, Attendance, Payment, Registration, BodyComponentEvaluation
+from io import BytesIO, StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from .models import Member, Attendance, Payment, Checkup, Registration, BodyComponentEvaluation, LedgerEntry, BalanceSnapshot, MemberSummary, AttendanceRollup, Plan, Branch, DEFAULT_BRANCH, OutboxEvent, OutboxCursor
+from . import ledger, async_views, pdf, reports, tabular_pdf, authentication, cache, summary, codes, archive, startup, images, log, replica, scheduling, branches, outbox
 
 
 class AttendanceSubmitTest(TestCase):
@@ -194,6 +216,23 @@ class MemberAPITest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data['results']), 2)
     
+    def test_list_members_page_size(self):
+        """The UMS table pages through members with ?page_size=, capped at 1000"""
+        Member.objects.bulk_create(
+            Member(member_code=f'P{i:03d}', full_name=f'Paged {i:03d}', phone=f'70000{i:05d}')
+            for i in range(60)
+        )
+        response = self.client.get('/api/members/')
+        self.assertEqual(len(response.data['results']), 50)
+
+        response = self.client.get('/api/members/?page_size=1000')
+        self.assertEqual(len(response.data['results']), 62)
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get('/api/members/?page_size=40&search=Paged')
+        self.assertEqual(len(response.data['results']), 40)
+        self.assertIn('page=2', response.data['next'])
+
     def test_search_members(self):
         """Test searching members by name or phone"""
         response = self.client.get('/api/members/?search=John')
@@ -492,3 +531,1831 @@ class RegistrationAPITest(TestCase):
         get_resp = self.client.get(f'/api/registrations/{registration_id}/')
         self.assertEqual(get_resp.status_code, 200)
         self.assertEqual(get_resp.json()['guest_name'], 'Test User')
+
+
+class LedgerTest(TestCase):
+    """Test cases for the member ledger and balance snapshots"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='operator', password='testpass123')
+        self.client = APIClient()
+        self.client.login(username='operator', password='testpass123')
+
+        self.member = Member.objects.create(member_code='M001', full_name='John Doe', phone='1234567890')
+        ledger.record_charge(self.member.id, Decimal('500.00'), notes='Plan')
+
+    def test_attendance_payment_posts_to_ledger(self):
+        """Test that payments at check-in are recorded as ledger entries"""
+        payload = {
+            "date": "2025-11-26",
+            "entries": [{"member_id": self.member.id, "present": True, "paid_amount": 200}]
+        }
+        response = self.client.post('/api/attendance/submit/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        entry = LedgerEntry.objects.get(member=self.member, kind=ledger.PAYMENT)
+        self.assertEqual(entry.amount, Decimal('-200.00'))
+        self.assertEqual(entry.payment.amount, Decimal('200.00'))
+
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.balance, Decimal('300.00'))
+        self.assertEqual(self.member.total_paid, Decimal('200.00'))
+
+    def test_snapshot_plus_tail(self):
+        """Test that balance is the latest snapshot plus the ledger tail"""
+        call_command('snapshot_balances', stdout=StringIO())
+        self.assertEqual(BalanceSnapshot.objects.filter(member=self.member).count(), 1)
+
+        ledger.record_payment(self.member.id, Decimal('150.00'))
+        ledger.record_adjustment(self.member.id, Decimal('-50.00'))
+
+        balance, total_paid = ledger.member_totals(self.member.id)
+        self.assertEqual(balance, Decimal('300.00'))
+        self.assertEqual(total_paid, Decimal('150.00'))
+
+        # Nothing new since the last snapshot: no duplicate row
+        call_command('snapshot_balances', stdout=StringIO())
+        call_command('snapshot_balances', stdout=StringIO())
+        self.assertEqual(BalanceSnapshot.objects.filter(member=self.member).count(), 2)
+
+    def test_reconcile_detects_drift(self):
+        """Test that reconciliation flags payments missing from the ledger"""
+        ledger.record_payment(self.member.id, Decimal('100.00'))
+        call_command('reconcile_ledger', stdout=StringIO())
+
+        Payment.objects.create(member=self.member, amount=Decimal('25.00'))
+        with self.assertRaises(CommandError):
+            call_command('reconcile_ledger', stdout=StringIO())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Row-level locking requires PostgreSQL')
+class AttendanceConcurrencyTest(TransactionTestCase):
+    """Hammer attendance_submit from parallel desks and check for lost updates"""
+
+    desks = 4
+    days_per_desk = 5
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='operator', password='testpass123')
+        self.members = [
+            Member.objects.create(member_code=f'M{i:03d}', full_name=f'Member {i}', phone=f'90000000{i:02d}')
+            for i in range(6)
+        ]
+
+    def _run_desks(self, build_payloads):
+        """Run one thread per desk; each posts its payloads as soon as all desks are ready"""
+        barrier = threading.Barrier(self.desks)
+        errors = []
+
+        def desk(index):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                for payload in build_payloads(index):
+                    response = client.post('/api/attendance/submit/', payload, format='json')
+                    if response.status_code != 200:
+                        errors.append(response.data)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=desk, args=(i,)) for i in range(self.desks)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def _entries(self, index):
+        # Alternate member order between desks to provoke lock-order deadlocks
+        members = self.members if index % 2 else list(reversed(self.members))
+        return [{"member_id": m.id, "present": True, "paid_amount": 10} for m in members]
+
+    def test_distinct_days_count_every_visit(self):
+        """Test that concurrent submissions for different days all count"""
+        start = date(2025, 11, 1)
+
+        def payloads(index):
+            for day in range(self.days_per_desk):
+                visit = start + timedelta(days=index * self.days_per_desk + day)
+                yield {"date": visit.isoformat(), "entries": self._entries(index)}
+
+        self._run_desks(payloads)
+
+        visits = self.desks * self.days_per_desk
+        for member in Member.objects.filter(pk__in=[m.pk for m in self.members]):
+            self.assertEqual(member.ums_count, visits)
+            self.assertEqual(member.total_paid, Decimal(10 * visits))
+            self.assertEqual(member.balance, Decimal(-10 * visits))
+
+    def test_same_day_counts_once(self):
+        """Test that desks submitting the same day increment the visit count once"""
+        def payloads(index):
+            yield {"date": "2025-11-26", "entries": self._entries(index)}
+
+        self._run_desks(payloads)
+
+        for member in Member.objects.filter(pk__in=[m.pk for m in self.members]):
+            self.assertEqual(member.ums_count, 1)
+            self.assertEqual(Attendance.objects.filter(member=member).count(), 1)
+
+
+class AsyncViewsTest(TestCase):
+    """Test that the ASGI read endpoints match their sync counterparts"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='operator', password='testpass123')
+        self.client = APIClient()
+        self.client.login(username='operator', password='testpass123')
+        self.factory = AsyncRequestFactory()
+
+        self.member = Member.objects.create(
+            member_code='M001', full_name='John Doe', phone='1234567890',
+            registration_date=date(2025, 11, 1), balance=Decimal('250.00')
+        )
+        Checkup.objects.create(member=self.member, checkup_date=date(2025, 11, 8), weight=Decimal('70.5'))
+
+    def _get(self, path, user=None):
+        request = self.factory.get(path)
+        request.user = user or AnonymousUser()
+        return request
+
+    async def test_dashboard_stats_matches_sync(self):
+        """Test dashboard stats payload and authentication"""
+        response = await async_views.dashboard_stats(self._get('/api/dashboard/stats/'))
+        self.assertEqual(response.status_code, 403)
+
+        response = await async_views.dashboard_stats(self._get('/api/dashboard/stats/', self.user))
+        self.assertEqual(response.status_code, 200)
+        expected = await sync_to_async(lambda: self.client.get('/api/dashboard/stats/').json())()
+        self.assertEqual(json.loads(response.content), expected)
+
+    async def test_body_checkup_data_matches_sync(self):
+        """Test body checkup weeks payload"""
+        response = await async_views.body_checkup_data(self._get('/'), self.member.id)
+        self.assertEqual(response.status_code, 200)
+        expected = await sync_to_async(lambda: self.client.get(f'/api/body-checkup/{self.member.id}/').json())()
+        self.assertEqual(json.loads(response.content), expected)
+        self.assertEqual(expected['locked_weeks'], [1, 2])
+
+    async def test_member_search(self):
+        """Test async member search"""
+        response = await async_views.member_search(self._get('/api/members/search/?q=john'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['full_name'] for m in json.loads(response.content)], ['John Doe'])
+
+    async def test_daily_report_streams_pages(self):
+        """Test that the async daily report streams the tabular PDF"""
+        response = await async_views.generate_daily_report(self._get('/api/report/daily/', self.user))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        data = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertTrue(data.startswith(b'%PDF-1.4'))
+        self.assertTrue(data.endswith(b'%%EOF\n'))
+
+
+class PdfRendererTest(TestCase):
+    """Test local asset resolution for the WeasyPrint renderer"""
+
+    def test_static_urls_resolve_to_disk(self):
+        """Test that report stylesheets and static files are read from disk"""
+        path = pdf.local_path('/static/css/report_daily.css')
+        self.assertIsNotNone(path)
+        self.assertTrue(path.is_file())
+
+        response = pdf.LocalURLFetcher().fetch('http://testserver/static/css/report_daily.css')
+        try:
+            self.assertIn(b'.header', response.read())
+        finally:
+            response.close()
+
+    def test_network_fetches_are_refused(self):
+        """Test that unknown and traversal URLs never leave the process"""
+        self.assertIsNone(pdf.local_path('/static/../../config/settings.py'))
+        self.assertIsNone(pdf.local_path('/media/../config/settings.py'))
+        with self.assertRaises(ValueError):
+            pdf.LocalURLFetcher().fetch('http://example.com/logo.png')
+
+    def test_bench_command_runs(self):
+        """Test that bench_pdf renders in every mode, including the spawned pool"""
+        out = StringIO()
+        call_command('bench_pdf', '--reports', '1', '--rows', '2', '--workers', '1', stdout=out)
+        self.assertEqual(out.getvalue().count('PDFs/s/core'), 4)
+        self.assertIn('pool x1', out.getvalue())
+
+
+class TabularPdfTest(TestCase):
+    """Test cases for the streaming tabular PDF writer"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='operator', password='testpass123')
+        self.client = APIClient()
+        self.client.login(username='operator', password='testpass123')
+
+        for i in range(120):
+            member = Member.objects.create(member_code=f'M{i:03d}', full_name=f'Member (#{i})', phone=f'9{i:09d}')
+            Attendance.objects.create(member=member, date=date(2025, 11, 5), present=True, paid_amount=10)
+
+    def test_pages_stream_with_valid_xref(self):
+        """Test that rows spill onto new pages and every xref offset points at its object"""
+        doc = tabular_pdf.TablePDF('Test Report', 'Org')
+        columns = [tabular_pdf.Column('Name', 3), tabular_pdf.Column('Amount', 1, 'right')]
+        rows = ((f'Row {i}', i) for i in range(200))
+        chunks = [*doc.heading(['Heading']), *doc.table(columns, rows, total=['TOTAL', 1]), *doc.close()]
+        data = b''.join(chunks)
+
+        self.assertGreater(len(chunks), 4)
+        self.assertEqual(data.count(b'/Type /Page '), 5)
+        self.assertIn(b'/Count 5', data)
+        xref = int(data.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+        entries = data[xref:].split(b'\n')[3:3 + len(doc.offsets)]
+        for number, entry in enumerate(entries, start=1):
+            offset = int(entry.split()[0])
+            self.assertTrue(data[offset:].startswith(b'%d 0 obj' % number))
+
+    def test_daily_report_streams(self):
+        """Test that the daily report uses the tabular writer with bounded queries"""
+        with self.assertNumQueries(5):  # session, user, character set check, totals, rows
+            response = self.client.get('/api/report/daily/?date=2025-11-05')
+            data = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(data.startswith(b'%PDF-1.4'))
+        self.assertTrue(data.endswith(b'%%EOF\n'))
+        self.assertEqual(data.count(b'/Type /Page '), 3)
+
+    def test_other_scripts_fall_back_to_weasyprint(self):
+        """Test that names the base-14 fonts cannot draw send the report through WeasyPrint"""
+        self.assertTrue(tabular_pdf.encodable(['José Müller', None, 42]))
+        self.assertFalse(tabular_pdf.encodable(['राम शर्मा']))
+        self.assertTrue(reports.daily_report_fits_tabular('2025-11-05'))
+
+        member = Member.objects.create(member_code='M900', full_name='राम शर्मा', phone='9000000900')
+        Attendance.objects.create(member=member, date=date(2025, 11, 5), present=True, paid_amount=10)
+        Payment.objects.create(member=member, amount=10, date=date(2025, 11, 5), method='cash')
+        response = self.client.get('/api/report/daily/?date=2025-11-05')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertTrue(self.client.get('/api/report/daily/?date=2025-11-06').streaming)
+
+        response = self.client.get('/api/report/range/?period=custom&from=2025-11-01&to=2025-11-30&output=pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+
+    @override_settings(TABULAR_PDF_REPORTS=[])
+    def test_html_path_still_selectable(self):
+        """Test that report types left out of TABULAR_PDF_REPORTS render through WeasyPrint"""
+        response = self.client.get('/api/report/daily/?date=2025-11-05')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+
+
+class BatchAnalysisReportTest(TestCase):
+    """Test cases for batch analysis report generation"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='operator', password='testpass123')
+        self.client = APIClient()
+        self.client.login(username='operator', password='testpass123')
+
+        self.registrations = []
+        for i in range(3):
+            member = Member.objects.create(member_code=f'M00{i}', full_name=f'Guest {i}', phone=f'900000000{i}')
+            self.registrations.append(Registration.objects.create(
+                member=member, guest_name=f'Guest {i}', mobile_number=member.phone, gender='Female', age=30
+            ))
+            if i < 2:
+                for weight in (Decimal('80.0'), Decimal('78.5')):
+                    BodyComponentEvaluation.objects.create(
+                        member=member, height_cm=Decimal('160'), weight_kg=weight, visceral_fat=Decimal('10')
+                    )
+
+    def test_reports_load_in_two_queries(self):
+        """Test that a batch needs two queries and picks the latest evaluation"""
+        with self.assertNumQueries(2):
+            items, skipped = reports.analysis_reports(reports.batch_registrations(
+                ids=[r.id for r in self.registrations]
+            ))
+
+        self.assertEqual([item['registration'].id for item in items], [r.id for r in self.registrations[:2]])
+        self.assertEqual(skipped, [self.registrations[2].id])
+        self.assertEqual(items[0]['body_eval'].weight_kg, Decimal('78.5'))
+
+    def test_batch_endpoint(self):
+        """Test the batch endpoint in PDF and zip formats"""
+        ids = ','.join(str(r.id) for r in self.registrations)
+
+        response = self.client.get(f'/api/reports/registrations/analysis/?ids={ids}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['X-Skipped-Registrations'], str(self.registrations[2].id))
+
+        today = date.today().isoformat()
+        response = self.client.get(f'/api/reports/registrations/analysis/?from={today}&to={today}&output=zip')
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(BytesIO(response.content)) as bundle:
+            self.assertEqual(len(bundle.namelist()), 1)
+
+    def test_batch_requires_selection(self):
+        """Test that a batch needs ids or a date range"""
+        response = self.client.get('/api/reports/registrations/analysis/')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/reports/registrations/analysis/?from=yesterday')
+        self.assertEqual(response.status_code, 400)
+
+
+class RangeReportTest(TestCase):
+    """Test cases for week/month/custom attendance reports"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='operator', password='testpass123')
+        self.client = APIClient()
+        self.client.login(username='operator', password='testpass123')
+
+        self.member1 = Member.objects.create(member_code='M001', full_name='John Doe', phone='1234567890')
+        self.member2 = Member.objects.create(member_code='M002', full_name='Jane Smith', phone='0987654321')
+        for day, member, paid in [(3, self.member1, 100), (4, self.member1, 0), (4, self.member2, 50)]:
+            Attendance.objects.create(member=member, date=date(2025, 11, day), present=True, paid_amount=paid)
+            if paid:
+                Payment.objects.create(member=member, date=date(2025, 11, day), amount=paid, method='cash')
+        Attendance.objects.create(member=self.member2, date=date(2025, 11, 5), present=False)
+        Payment.objects.create(member=self.member2, date=date(2025, 11, 5), amount=25, method='upi')
+        Attendance.objects.create(member=self.member1, date=date(2025, 12, 1), present=True)
+
+    def test_report_range_periods(self):
+        """Test week and month boundaries"""
+        self.assertEqual(reports.report_range('week', date(2025, 11, 5)), (date(2025, 11, 3), date(2025, 11, 9)))
+        self.assertEqual(reports.report_range('month', date(2024, 2, 10)), (date(2024, 2, 1), date(2024, 2, 29)))
+        with self.assertRaises(ValueError):
+            reports.report_range('custom', date_from=date(2025, 1, 1), date_to=date(2026, 6, 1))
+
+    def test_monthly_summary_aggregates_in_sql(self):
+        """Test per-member visits, daily revenue and revenue by method"""
+        with self.assertNumQueries(4):
+            summary = reports.attendance_range_summary(date(2025, 11, 1), date(2025, 11, 30))
+
+        self.assertEqual(summary['totals']['visits'], 3)
+        self.assertEqual(summary['totals']['members'], 2)
+        self.assertEqual(summary['totals']['revenue'], Decimal('175'))
+        visits = {m['member__full_name']: m['visits'] for m in summary['members']}
+        self.assertEqual(visits, {'John Doe': 2, 'Jane Smith': 1})
+        self.assertEqual([(d['date'].day, d['present'], d['revenue']) for d in summary['daily']],
+                         [(3, 1, Decimal('100')), (4, 2, Decimal('50')), (5, 0, Decimal('25'))])
+        self.assertEqual([r['method'] for r in summary['revenue_by_method']], ['cash', 'cash', 'upi'])
+
+    def test_range_endpoint(self):
+        """Test the JSON and PDF outputs"""
+        response = self.client.get('/api/report/range/?period=week&date=2025-11-05')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals']['visits'], 3)
+
+        response = self.client.get('/api/report/range/?period=custom&from=2025-11-01&to=2025-12-31&output=pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        response = self.client.get('/api/report/range/?period=custom&from=2025-12-31&to=2025-11-01')
+        self.assertEqual(response.status_code, 400)
+
+
+class SignedTokenAuthTest(TestCase):
+    """Test cases for stateless signed API tokens"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='kiosk', password='testpass123')
+        self.client = APIClient()
+        authentication._principals.clear()
+
+    def _get(self, token):
+        return self.client.get('/api/dashboard/stats/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_issue_and_authenticate(self):
+        """Test exchanging credentials for a token and using it without a session"""
+        response = self.client.post('/api/auth/token/', {'username': 'kiosk', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/auth/token/', {'username': 'kiosk', 'password': 'testpass123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        token = response.data['token']
+
+        self.assertEqual(self._get(token).status_code, 200)
+        # The principal cache answers later requests without a user query
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/health/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejected_tokens(self):
+        """Test tampered, expired, unknown-key and revoked tokens"""
+        # Session authentication comes first, so failures are 403 like every other endpoint
+        token, _ = authentication.issue_token(self.user)
+        payload, signature = token.rsplit('.', 1)
+        self.assertEqual(self._get(payload + '.' + signature[::-1]).status_code, 403)
+
+        expired, _ = authentication.issue_token(self.user, ttl=-10)
+        self.assertEqual(self._get(expired).status_code, 403)
+
+        with self.settings(API_TOKEN_KEYS=['new-key']):
+            self.assertEqual(self._get(token).status_code, 403)
+
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertEqual(self._get(token).status_code, 403)
+
+    def test_key_rotation(self):
+        """Test that tokens signed with a retired-but-listed key still verify"""
+        with self.settings(API_TOKEN_KEYS=['old-key']):
+            token, _ = authentication.issue_token(self.user)
+        with self.settings(API_TOKEN_KEYS=['new-key', 'old-key']):
+            self.assertEqual(self._get(token).status_code, 200)
+            self.assertEqual(authentication.issue_token(self.user)[0].split('.')[2],
+                             next(iter(authentication._keys())))
+
+    def test_bench_command_leaves_no_user(self):
+        """Test that bench_auth rolls back the account it benchmarks with"""
+        users = User.objects.count()
+        out = StringIO()
+        call_command('bench_auth', '--requests', '1', '--token-requests', '1', stdout=out)
+        self.assertIn('token, warm principal cache', out.getvalue())
+        self.assertEqual(User.objects.count(), users)
+
+
+class ReadCacheTest(TestCase):
+    """Test cases for the versioned read cache"""
+
+    def setUp(self):
+        """Set up test data"""
+        caches['default'].clear()
+        cache.hits.clear()
+        cache.misses.clear()
+        self.user = User.objects.create_user(username='operator', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.member1 = Member.objects.create(member_code='M001', full_name='John Doe', phone='1234567890',
+                                             registration_date=date(2025, 11, 1))
+        self.member2 = Member.objects.create(member_code='M002', full_name='Jane Smith', phone='0987654321',
+                                             registration_date=date(2025, 11, 1))
+
+    def test_dashboard_hits_and_ledger_invalidation(self):
+        """Test that repeat reads are served from cache and balance changes invalidate them"""
+        self.client.get('/api/dashboard/stats/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(response.data['total_outstanding_balance'], 0.0)
+        self.assertEqual(cache.stats()[cache.DASHBOARD], {'hits': 1, 'misses': 1})
+
+        ledger.record_charge(self.member1.id, 300)
+        response = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(response.data['total_outstanding_balance'], 300.0)
+
+    def test_member_save_invalidates_search(self):
+        """Test that renaming a member is visible to the next search"""
+        self.assertEqual(len(self.client.get('/api/members/search/?q=john').data), 1)
+        self.member1.full_name = 'Johnny Walker'
+        self.member1.save()
+        self.assertEqual(self.client.get('/api/members/search/?q=WALKER').data[0]['full_name'], 'Johnny Walker')
+
+    def test_body_checkup_invalidation_is_scoped_to_member(self):
+        """Test that a checkup only invalidates its own member's entry"""
+        self.client.get(f'/api/body-checkup/{self.member1.id}/')
+        self.client.get(f'/api/body-checkup/{self.member2.id}/')
+        Checkup.objects.create(member=self.member1, checkup_date=date(2025, 11, 8), weight=Decimal('70.5'))
+
+        with self.assertNumQueries(0):
+            self.client.get(f'/api/body-checkup/{self.member2.id}/')
+        response = self.client.get(f'/api/body-checkup/{self.member1.id}/')
+        self.assertEqual(response.data['weeks'][2]['data']['weight'], '70.50')
+        self.assertEqual(self.client.get('/api/body-checkup/99999/').status_code, 404)
+
+    def test_invalidation_repeats_on_commit(self):
+        """Test that a write inside a transaction bumps the version again on commit"""
+        version_key = cache._version_key(cache.DASHBOARD, cache.ALL_BRANCHES)
+        cache.cached(cache.DASHBOARD, 'key', lambda: 1, scope=cache.ALL_BRANCHES)
+        before = caches['default'].get(version_key)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Attendance.objects.create(member=self.member1, date=date(2025, 11, 5), present=True)
+                self.assertEqual(caches['default'].get(version_key), before + 1)
+        self.assertEqual(caches['default'].get(version_key), before + 2)
+
+
+class MemberSummaryTest(TestCase):
+    """Test cases for the member summary read model"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='operator', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        # The test transaction never commits; run the rebuild hooks for setUp's writes now
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member = Member.objects.create(member_code='M001', full_name='John Doe', phone='1234567890',
+                                                registration_date=date(2025, 11, 1), membership_total_sessions=26)
+            BodyComponentEvaluation.objects.create(member=self.member, height_cm=Decimal('170'), weight_kg=Decimal('80'),
+                                                   visceral_fat=Decimal('9'), bmi=Decimal('27.7'))
+
+    def _write_activity(self):
+        for day, present in [(3, True), (10, True), (12, False)]:
+            Attendance.objects.create(member=self.member, date=date(2025, 11, day), present=present)
+        Checkup.objects.create(member=self.member, checkup_date=date(2025, 11, 15), weight=Decimal('77.5'))
+        Checkup.objects.create(member=self.member, checkup_date=date(2025, 11, 8), weight=Decimal('78.5'))
+        ledger.record_charge(self.member.id, 500)
+        ledger.record_payment(self.member.id, 200)
+
+    def test_rebuilt_once_on_commit(self):
+        """Test that a transaction's writes produce one up-to-date summary at commit"""
+        with mock.patch.object(summary, 'refresh', wraps=summary.refresh) as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self._write_activity()
+                    self.assertEqual(MemberSummary.objects.get(pk=self.member.pk).visit_count, 0)
+        rebuild.assert_called_once_with(self.member.pk)
+
+        row = MemberSummary.objects.get(pk=self.member.pk)
+        self.assertEqual((row.visit_count, row.last_visit), (2, date(2025, 11, 10)))
+        self.assertEqual((row.balance, row.total_paid), (Decimal('300.00'), Decimal('200.00')))
+        # Latest metrics follow the latest checkup date, not insertion order
+        self.assertEqual((row.latest_checkup_date, row.latest_weight), (date(2025, 11, 15), Decimal('77.50')))
+        self.assertEqual(row.start_weight, Decimal('80.00'))
+        self.assertEqual(row.weeks_completed, 3)
+
+    def test_rolled_back_writes_do_not_strand_later_ones(self):
+        """Test that a rollback does not stop the next transaction's rebuild"""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Attendance.objects.create(member=self.member, date=date(2025, 11, 3), present=True)
+                    raise ValueError
+            except ValueError:
+                pass
+            with transaction.atomic():
+                Attendance.objects.create(member=self.member, date=date(2025, 11, 4), present=True)
+        self.assertEqual(MemberSummary.objects.get(pk=self.member.pk).last_visit, date(2025, 11, 4))
+
+        # A savepoint rolled back inside a transaction that goes on to commit
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        Attendance.objects.create(member=self.member, date=date(2025, 11, 5), present=True)
+                        raise ValueError
+                except ValueError:
+                    pass
+                Attendance.objects.create(member=self.member, date=date(2025, 11, 6), present=True)
+        self.assertEqual(MemberSummary.objects.get(pk=self.member.pk).last_visit, date(2025, 11, 6))
+
+    def test_summary_endpoint_single_query(self):
+        """Test lookup by code, phone or id in one query, and the build-on-miss fallback"""
+        self._write_activity()  # not committed, so the stored row is stale
+        MemberSummary.objects.all().delete()
+        response = self.client.get('/api/members/summary/?q=M001')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['membership_label'], '0 / 26')
+        self.assertEqual(data['weight_change'], '-2.50')
+        self.assertEqual(data['latest_evaluation']['bmi'], '27.70')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/members/summary/?q={self.member.id}')
+        self.assertEqual(response.data['visit_count'], 2)
+        self.assertEqual(self.client.get('/api/members/summary/?q=1234567890').data['id'], self.member.id)
+        self.assertEqual(self.client.get('/api/members/summary/?q=nobody').status_code, 404)
+
+    def test_refresh_many_matches_refresh(self):
+        """Test that the batched rebuild writes the same rows as one-at-a-time rebuilds"""
+        other = Member.objects.create(member_code='M002', full_name='Jane Roe', phone='5550000000')
+        self._write_activity()
+        fields = [f.attname for f in MemberSummary._meta.concrete_fields if f.attname != 'refreshed_at']
+        expected = [MemberSummary.objects.filter(pk=pk).values(*fields).get()
+                    for pk in (self.member.pk, other.pk) if summary.refresh(pk)]
+        MemberSummary.objects.filter(pk=other.pk).delete()
+
+        # Delete the missing member's row, members, four build queries, stored ids, update, insert
+        with self.assertNumQueries(9):
+            self.assertEqual(summary.refresh_many([self.member.pk, other.pk, 999999]), 2)
+        self.assertEqual(list(MemberSummary.objects.order_by('pk').values(*fields)), expected)
+
+    def test_refresh_command(self):
+        """Test rebuilding every summary from the command"""
+        out = StringIO()
+        call_command('refresh_member_summaries', stdout=out)
+        self.assertIn('Refreshed 1 member summaries', out.getvalue())
+        self.assertEqual(MemberSummary.objects.get(pk=self.member.pk).full_name, 'John Doe')
+
+
+class UnitOfWorkTest(TestCase):
+    """Test cases for coalesced member writes"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.member = Member.objects.create(member_code='M001', full_name='Test User', phone='9000000000',
+                                            registration_date=date(2025, 11, 1))
+
+    def _member_updates(self, context):
+        return [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "core_member"')]
+
+    def test_registration_writes_member_once(self):
+        """Test that profile, ledger totals and metrics land in a single UPDATE"""
+        payload = {
+            "registration": {
+                "guest_name": "Test User", "mobile_number": "9000000000", "invited_by": "John Doe",
+                "gender": "Male", "membership": "UMS", "occupation": "Test Occupation", "age": 30,
+                "location": "", "do_you_exercise": "Walking", "hours_sleep": "7", "liters_water": "2L",
+                "loss_of_energy": "No", "transformation_targets": "Weight Targets",
+                "tried_diet_programs": False, "surveyed_by": "Operator A", "available_time": "8-11 AM",
+                "initial_amount_paid": 1000,
+            },
+            "body_evaluation": {"height_cm": 160, "weight_kg": 70, "visceral_fat": 12},
+        }
+        with CaptureQueriesContext(connection) as context:
+            resp = self.client.post('/api/registrations/', data=json.dumps(payload), content_type='application/json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(len(self._member_updates(context)), 1)
+
+        self.member.refresh_from_db()
+        self.assertEqual((self.member.membership, self.member.ums_count), ('UMS', 1))
+        self.assertEqual((self.member.balance, self.member.total_paid), (Decimal('4400.00'), Decimal('1000.00')))
+        self.assertEqual(self.member.latest_weight, Decimal('70.00'))
+        self.assertEqual(resp.json()['member']['balance'], '4400.00')
+
+    def test_latest_metrics_follow_checkup_date(self):
+        """Test that an older week saved last does not overwrite newer metrics"""
+        payload = {'checkup_data': [
+            {'week': 3, 'data': {'weight': '68', 'height': '160'}},
+            {'week': 2, 'data': {'weight': '69', 'height': '160'}},
+        ]}
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(f'/api/body-checkup/{self.member.id}/save/', payload, format='json')
+        self.assertEqual(len(self._member_updates(context)), 1)
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.latest_weight, Decimal('68.00'))
+
+        # Re-saving week 2 alone keeps week 3 as the latest
+        self.client.post(f'/api/body-checkup/{self.member.id}/save/',
+                         {'checkup_data': [{'week': 2, 'data': {'weight': '69.5'}}]}, format='json')
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.latest_weight, Decimal('68.00'))
+
+
+def registration_item(phone, name='Guest', **registration):
+    return {
+        "registration": {
+            "guest_name": name, "mobile_number": phone, "invited_by": "John Doe",
+            "gender": "Female", "membership": "UMS", "occupation": "Teacher", "age": 30,
+            "do_you_exercise": "Walking", "hours_sleep": "7", "liters_water": "2L",
+            "loss_of_energy": "No", "transformation_targets": "Weight Targets",
+            "tried_diet_programs": False, "surveyed_by": "Operator A", "available_time": "8-11 AM",
+            **registration,
+        },
+        "body_evaluation": {"height_cm": 160, "weight_kg": 70, "visceral_fat": 12},
+    }
+
+
+class BulkRegistrationTest(TestCase):
+    """Test cases for the bulk registration endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='desk', password='pass'))
+        self.member = Member.objects.create(member_code='M001', full_name='Old Name', phone='9000000000')
+
+    def _post(self, items):
+        return self.client.post('/api/registrations/bulk/', data=json.dumps(items), content_type='application/json')
+
+    def test_bulk_creates_and_updates_members(self):
+        """Test that new phones get members and known phones reuse theirs"""
+        resp = self._post([
+            registration_item('9000000000', initial_amount_paid=1000),
+            registration_item('9000000001', name='New Guest'),
+        ])
+        self.assertEqual(resp.status_code, 201)
+        data = resp.json()
+        self.assertEqual((data['created'], data['updated'], data['failed']), (1, 1, 0))
+        self.assertEqual([r['status'] for r in data['results']], ['updated', 'created'])
+
+        self.member.refresh_from_db()
+        self.assertEqual((self.member.membership, self.member.ums_count, self.member.gender), ('UMS', 1, 'Female'))
+        self.assertEqual((self.member.balance, self.member.total_paid), (Decimal('4400.00'), Decimal('1000.00')))
+        self.assertEqual(self.member.latest_weight, Decimal('70.00'))
+        self.assertEqual(data['results'][0]['member_id'], self.member.id)
+
+        guest = Member.objects.get(phone='9000000001')
+        self.assertEqual((guest.full_name, guest.balance, guest.latest_height), ('New Guest', Decimal('5400.00'), Decimal('160.00')))
+        self.assertTrue(Registration.objects.filter(member=guest).exists())
+        self.assertIsNotNone(BodyComponentEvaluation.objects.get(member=guest).fat)
+        self.assertEqual(LedgerEntry.objects.filter(member=self.member).count(), 2)
+        self.assertEqual(Payment.objects.get(member=self.member).method, 'registration')
+
+    def test_bulk_reports_partial_failures(self):
+        """Test that invalid items are reported and valid ones still saved"""
+        missing_name = registration_item('9000000002', name='')
+        duplicate = registration_item('9000000001')
+        resp = self._post({'items': [registration_item('9000000001'), missing_name, duplicate]})
+        self.assertEqual(resp.status_code, 207)
+        results = resp.json()['results']
+        self.assertEqual([r['status'] for r in results], ['created', 'failed', 'failed'])
+        self.assertIn('guest_name', results[1]['errors']['registration'])
+        self.assertIn('mobile_number', results[2]['errors']['registration'])
+        self.assertEqual(Member.objects.filter(phone='9000000001').count(), 1)
+        self.assertFalse(Member.objects.filter(phone='9000000002').exists())
+
+        resp = self._post([missing_name])
+        self.assertEqual(resp.status_code, 400)
+
+    def test_bulk_query_count_does_not_grow(self):
+        """Test that the number of queries is independent of the batch size"""
+        counts = []
+        for start in (100, 200):
+            size = 2 if start == 100 else 8
+            items = [registration_item(f'9100000{start + n}') for n in range(size)]
+            with CaptureQueriesContext(connection) as context:
+                resp = self._post(items)
+            self.assertEqual(resp.status_code, 201, resp.json())
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_requires_authentication(self):
+        """Test that anonymous clients cannot use the bulk endpoint"""
+        resp = APIClient().post('/api/registrations/bulk/', data=json.dumps([registration_item('9000000005')]),
+                                content_type='application/json')
+        self.assertIn(resp.status_code, (401, 403))
+
+
+class MemberCodeTest(TestCase):
+    """Test cases for member code allocation"""
+
+    def test_codes_are_unique_fixed_width_and_ascending(self):
+        """Test that allocated codes sort in allocation order"""
+        allocated = codes.allocate(3) + [codes.next_code()] + codes.allocate(120)
+        self.assertEqual(len(set(allocated)), 124)
+        self.assertEqual(allocated, sorted(allocated))
+        self.assertTrue(all(len(code) == 8 and code.startswith('M') and code[1:].isdigit() for code in allocated))
+
+    def test_registrations_in_one_second_get_distinct_codes(self):
+        """Test that back-to-back and bulk registrations never collide"""
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='desk', password='pass'))
+        items = [registration_item(f'91000000{n:02d}') for n in range(5)]
+        for item in items[:2]:
+            self.assertEqual(client.post('/api/registrations/', item, format='json').status_code, 201)
+        self.assertEqual(client.post('/api/registrations/bulk/', items[2:], format='json').status_code, 201)
+        self.assertEqual(len(set(Member.objects.values_list('member_code', flat=True))), 5)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Block allocation uses a PostgreSQL sequence')
+    def test_block_allocation_from_sequence(self):
+        """Test that one sequence call reserves a whole block"""
+        codes._blocks.clear()
+        with self.assertNumQueries(1):
+            first = codes.next_code()
+        with self.assertNumQueries(0):
+            rest = codes.allocate(codes.BLOCK_SIZE - 1)
+        self.assertEqual(int(rest[-1][1:]) - int(first[1:]), codes.BLOCK_SIZE - 1)
+
+
+class ArchiveTest(TestCase):
+    """Test cases for archiving closed years"""
+
+    def setUp(self):
+        """Set up test data"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(ARCHIVE_DIR=directory.name, ARCHIVE_RETAIN_YEARS=1)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        # The test transaction never commits; run the summary hooks for setUp's writes now
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice = Member.objects.create(member_code='M001', full_name='Alice', phone='9000000001')
+            self.bob = Member.objects.create(member_code='M002', full_name='Bob', phone='9000000002')
+            for day, member, present, paid in [(3, self.alice, True, 100), (3, self.bob, True, 0),
+                                               (4, self.alice, True, 0), (5, self.bob, False, 0)]:
+                Attendance.objects.create(member=member, date=date(2020, 1, day), present=present, paid_amount=paid)
+            ledger.record_charge(self.alice.id, 500, date=date(2020, 1, 3))
+            ledger.record_payment(self.alice.id, 300, date=date(2020, 1, 3), method='cash')
+            self.today = timezone.now().date()
+            Attendance.objects.create(member=self.alice, date=self.today, present=True)
+
+    def test_archive_moves_closed_years_only(self):
+        """Test that old rows move to the archive files and recent ones stay live"""
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_records', stdout=StringIO())
+        self.assertFalse(Attendance.objects.filter(date__year=2020).exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertTrue(Attendance.objects.filter(date=self.today).exists())
+        self.assertEqual(archive.archived_years(archive.ATTENDANCE), {2020})
+        self.assertTrue(archive.path(archive.PAYMENT, 2020).exists())
+
+        # The ledger keeps its amounts; the balance is unchanged
+        self.alice.refresh_from_db()
+        self.assertEqual((self.alice.balance, self.alice.total_paid), (Decimal('200.00'), Decimal('300.00')))
+        self.assertEqual(ledger.member_totals(self.alice.id), (Decimal('200.00'), Decimal('300.00')))
+        self.assertIsNone(LedgerEntry.objects.get(kind=ledger.PAYMENT).payment_id)
+
+        rollup = AttendanceRollup.objects.get(member=self.alice, year=2020)
+        self.assertEqual((rollup.visits, rollup.last_visit, rollup.paid_amount), (2, date(2020, 1, 4), Decimal('100.00')))
+        row = MemberSummary.objects.get(pk=self.alice.pk)
+        self.assertEqual((row.visit_count, row.last_visit), (3, self.today))
+
+        with self.assertRaises(ValueError):
+            archive.archive_year(archive.ATTENDANCE, self.today.year)
+
+    def test_ledger_reconciles_after_archiving(self):
+        """Test that archived payments still count against the ledger in reconcile_ledger"""
+        call_command('archive_records', stdout=StringIO())
+        out = StringIO()
+        call_command('reconcile_ledger', stdout=out)
+        self.assertIn('All 2 members reconcile', out.getvalue())
+
+    def test_reports_read_archived_years(self):
+        """Test that reports over archived days match the live results"""
+        expected = reports.attendance_range_summary(date(2020, 1, 1), date(2020, 1, 31))
+        day = [(a.member.full_name, a.paid_amount) for a in reports.daily_attendances('2020-01-03')]
+        call_command('archive_records', stdout=StringIO())
+
+        self.assertEqual(reports.attendance_range_summary(date(2020, 1, 1), date(2020, 1, 31)), expected)
+        self.assertEqual([(a.member.full_name, a.paid_amount) for a in reports.daily_attendances('2020-01-03')], day)
+        self.assertEqual(day, [('Alice', Decimal('100.00')), ('Bob', Decimal('0.00'))])
+
+    def test_late_rows_merge_into_archived_year(self):
+        """Test that archiving a year again adds rows written after the first run"""
+        archive.archive_year(archive.ATTENDANCE, 2020)
+        Attendance.objects.create(member=self.bob, date=date(2020, 2, 1), present=True)
+        self.assertEqual(archive.archive_year(archive.ATTENDANCE, 2020), 1)
+        rows = list(archive.read(archive.ATTENDANCE, date(2020, 1, 1), date(2020, 12, 31)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(AttendanceRollup.objects.get(member=self.bob, year=2020).visits, 2)
+
+
+class StartupTest(TestCase):
+    """Cold-start budget for management commands and web workers"""
+
+    def test_check_cold_start(self):
+        """Test that manage.py check stays within budget without loading WeasyPrint"""
+        profile = startup.profile_command('check')
+        # Pillow is loaded by Django's own ImageField system check
+        self.assertNotIn('weasyprint', startup.heavy(profile.imports))
+        self.assertLess(profile.seconds, startup.CHECK_BUDGET)
+
+    def test_first_request_cold_start(self):
+        """Test that a fresh worker serves its first request without report libraries"""
+        profile = startup.profile_first_request('/api/health/')
+        self.assertEqual(startup.heavy(profile.imports), [])
+        self.assertLess(profile.seconds, startup.FIRST_REQUEST_BUDGET)
+
+    def test_parse_importtime(self):
+        """Test parsing of -X importtime output"""
+        imports = startup.parse_importtime(
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   weasyprint.urls\n'
+            'import time:       500 |        620 | weasyprint\n'
+        )
+        self.assertEqual(imports[1], startup.Import('weasyprint', 500, 620, 0))
+        self.assertEqual(imports[0].depth, 1)
+        self.assertEqual(startup.heavy(imports), ['weasyprint'])
+
+
+class StaticAssetsTest(TestCase):
+    """Test cases for the minified, hashed and precompressed static assets"""
+
+    def setUp(self):
+        """Collect the app's own assets into a temporary STATIC_ROOT"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # The project directory only, to leave out the admin and DRF assets
+        settings = override_settings(
+            STATIC_ROOT=directory.name,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.root = Path(directory.name)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.manifest = json.loads((self.root / 'staticfiles.json').read_text())['paths']
+
+    def test_hashed_minified_and_compressed(self):
+        """Test that collectstatic writes minified, content-hashed files with gzip and brotli copies"""
+        hashed = self.manifest['js/ums.js']
+        self.assertRegex(hashed, r'^js/ums\.[0-9a-f]{12}\.js$')
+        for suffix in ('', '.gz', '.br'):
+            self.assertTrue((self.root / (hashed + suffix)).exists(), hashed + suffix)
+
+        source = Path(django_settings.BASE_DIR, 'core', 'static', 'js', 'ums.js').read_text()
+        minified = (self.root / hashed).read_text()
+        self.assertLess(len(minified), len(source) * 0.8)
+        self.assertNotIn('// Fetch all members from API', minified)
+
+        # Stylesheets point at the hashed images
+        self.assertIn(self.manifest['images/id3R36eTP4_1765110001953.png'].split('/')[-1],
+                      (self.root / self.manifest['css/homepage.css']).read_text())
+
+    def test_templates_reference_hashed_names(self):
+        """Test that pages link the hashed assets instead of inline scripts"""
+        response = Client().get('/ums/')
+        self.assertContains(response, f'/static/{self.manifest["js/ums.js"]}')
+        self.assertContains(response, f'/static/{self.manifest["js/member_table.js"]}')
+
+        response = Client().get('/register/')
+        self.assertContains(response, f'/static/{self.manifest["js/register.js"]}')
+        self.assertNotContains(response, '<script>')
+
+    def test_served_immutable_and_precompressed(self):
+        """Test that hashed assets are served compressed with a far-future immutable Cache-Control"""
+        url = f'/static/{self.manifest["js/ums.js"]}'
+        response = Client().get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=315360000', response['Cache-Control'])
+        response.close()
+
+    def test_missing_manifest_fails_outside_debug(self):
+        """Test that without a manifest only DEBUG and tests fall back to source names"""
+        from .storage import MinifiedManifestStaticFilesStorage
+
+        with tempfile.TemporaryDirectory() as empty:
+            storage = MinifiedManifestStaticFilesStorage(location=empty)
+            self.assertEqual(storage.stored_name('js/ums.js'), 'js/ums.js')
+            with self.settings(DEBUG=True, TESTING=False):
+                self.assertEqual(storage.stored_name('js/ums.js'), 'js/ums.js')
+            with self.settings(DEBUG=False, TESTING=False), self.assertRaises(ValueError):
+                storage.stored_name('js/ums.js')
+
+
+@override_settings(IMAGE_WORKERS=0)
+class ProfileImageTest(TestCase):
+    """Test cases for the profile photo pipeline"""
+
+    def setUp(self):
+        """Set up test data"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media = Path(directory.name)
+
+        User.objects.create_user(username='operator', password='testpass123')
+        self.client = APIClient()
+        self.client.login(username='operator', password='testpass123')
+        self.member = Member.objects.create(member_code='M001', full_name='Alice', phone='9000000001')
+
+    def photo(self, name='photo.jpg'):
+        """A 1200x800 JPEG tagged as rotated, with camera metadata"""
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise to display
+        exif[0x010F] = 'PhoneMaker'
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), (200, 120, 40)).save(buffer, 'JPEG', exif=exif, quality=95)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_upload_strips_metadata_and_writes_thumbnails(self):
+        """Test that an upload is re-encoded upright without EXIF and gets WebP and JPEG thumbnails"""
+        from PIL import Image
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/members/{self.member.id}/', {'profile_image': self.photo()},
+                                         format='multipart')
+        self.assertEqual(response.status_code, 200)
+
+        self.member.refresh_from_db()
+        thumbnails = self.member.profile_thumbnails
+        self.assertRegex(self.member.profile_image.name, r'^profiles/[0-9a-f]{16}\.jpg$')
+        self.assertEqual(thumbnails['source'], self.member.profile_image.name)
+        self.assertFalse((self.media / 'profiles' / 'photo.jpg').exists())
+        with Image.open(self.media / thumbnails['source']) as original:
+            self.assertEqual(original.size, (800, 1200))
+            self.assertEqual(len(original.getexif()), 0)
+
+        for size, edge in images.THUMBNAIL_SIZES.items():
+            for fmt, (pillow_format, extension) in images.FORMATS.items():
+                name = thumbnails[size][fmt]
+                self.assertRegex(name, rf'^profiles/thumbs/[0-9a-f]{{16}}\.{extension}$')
+                with Image.open(self.media / name) as thumbnail:
+                    self.assertEqual((thumbnail.format, thumbnail.size), (pillow_format, (edge, edge)))
+        self.assertLess((self.media / thumbnails['small']['webp']).stat().st_size, 2000)
+
+        response = self.client.get(f'/api/members/{self.member.id}/')
+        self.assertEqual(response.data['profile_thumbnails']['small']['webp'],
+                         f'http://testserver/media/{thumbnails["small"]["webp"]}')
+        response = self.client.get('/api/members/')
+        self.assertEqual(set(response.data['results'][0]['profile_thumbnails']), set(images.THUMBNAIL_SIZES))
+
+    def test_replaced_photo_files_are_deleted(self):
+        """Test that replacing a photo deletes the old original and thumbnails, unless another member shares them"""
+        def upload(member, colour):
+            from PIL import Image
+            from django.core.files.uploadedfile import SimpleUploadedFile
+
+            buffer = BytesIO()
+            Image.new('RGB', (400, 300), colour).save(buffer, 'JPEG')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f'/api/members/{member.id}/',
+                                  {'profile_image': SimpleUploadedFile('p.jpg', buffer.getvalue())}, format='multipart')
+            member.refresh_from_db()
+            return images._files(member.profile_thumbnails)
+
+        first = upload(self.member, 'red')
+        second = upload(self.member, 'blue')
+        self.assertTrue(all((self.media / name).exists() for name in second))
+        self.assertFalse(any((self.media / name).exists() for name in first - second))
+
+        other = Member.objects.create(member_code='M002', full_name='Bob', phone='9000000002')
+        self.assertEqual(upload(other, 'blue'), second)
+        upload(self.member, 'green')
+        self.assertTrue(all((self.media / name).exists() for name in second))
+
+    def test_command_processes_pending_uploads(self):
+        """Test that process_profile_images picks up uploads whose job never ran"""
+        from django.core.files.storage import default_storage
+
+        name = default_storage.save('profiles/lost.jpg', self.photo('lost.jpg'))
+        # update() sends no post_save, as if the worker had been restarted
+        Member.objects.filter(pk=self.member.pk).update(profile_image=name)
+
+        out = StringIO()
+        call_command('process_profile_images', stdout=out)
+        self.assertIn('Processed 1 profile images', out.getvalue())
+        self.member.refresh_from_db()
+        self.assertFalse(images.is_pending(self.member))
+        self.assertEqual(self.member.profile_thumbnails['source'], self.member.profile_image.name)
+
+        out = StringIO()
+        call_command('process_profile_images', stdout=out)
+        self.assertIn('Processed 0 profile images', out.getvalue())
+
+
+class AdminChangelistTest(TestCase):
+    """Test cases for the admin changelists of the large tables"""
+
+    # Session, user, count, rows, list filter and date hierarchy queries
+    MAX_CHANGELIST_QUERIES = 12
+
+    URLS = [
+        '/admin/core/attendance/',
+        '/admin/core/payment/',
+        '/admin/core/ledgerentry/',
+        '/admin/core/checkup/',
+        '/admin/core/bodycomponentevaluation/',
+        '/admin/core/balancesnapshot/',
+    ]
+
+    def setUp(self):
+        """Set up test data"""
+        admin_user = User.objects.create_superuser(username='admin', password='admin123')
+        self.client.force_login(admin_user)
+
+    def add_members(self, count, start=0):
+        """Members with a visit, payment, checkup and evaluation in each of two years"""
+        for i in range(start, start + count):
+            member = Member.objects.create(member_code=f'M{i:03d}', full_name=f'Member {i:03d}', phone=f'90000{i:05d}')
+            for day in (date(2024, 3, 1 + i % 28), date(2025, 6, 1 + i % 28)):
+                Attendance.objects.create(member=member, date=day, present=True, paid_amount=100)
+                ledger.record_payment(member.id, 100, date=day, method='cash')
+                Checkup.objects.create(member=member, checkup_date=day, weight=70)
+            ledger.take_snapshot(member.id).save()
+            BodyComponentEvaluation.objects.create(member=member, height_cm=Decimal('175'), weight_kg=Decimal('70'),
+                                                   visceral_fat=Decimal('9'))
+
+    def changelist_queries(self, url):
+        """Number of queries run to serve one changelist page"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_queries_per_page_do_not_grow_with_rows(self):
+        """Test that each changelist page runs a fixed, capped number of queries"""
+        self.add_members(3)
+        few = {url: self.changelist_queries(url) for url in self.URLS}
+        self.add_members(20, start=3)
+        for url in self.URLS:
+            many = self.changelist_queries(url)
+            self.assertEqual(many, few[url], url)
+            self.assertLessEqual(many, self.MAX_CHANGELIST_QUERIES, url)
+            self.assertLessEqual(self.changelist_queries(f'{url}?q=Member+007'), self.MAX_CHANGELIST_QUERIES, url)
+
+    def test_search_goes_through_members(self):
+        """Test that a search filters rows by member_id through a member subquery, without a name join"""
+        self.add_members(5)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/core/attendance/?q=member+003')
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        self.assertContains(response, 'Member 003')
+        like = [q['sql'].upper() for q in queries if 'LIKE' in q['sql'].upper()]
+        self.assertTrue(like)
+        for sql in like:
+            # Names are compared only inside the member subquery
+            outer, subquery = sql.split('"CORE_ATTENDANCE"."MEMBER_ID" IN (SELECT')
+            self.assertNotIn('LIKE', outer)
+            self.assertIn('FROM "CORE_MEMBER" U0 WHERE', subquery)
+
+        response = self.client.get('/admin/core/attendance/?q=90000000')
+        self.assertEqual(response.context['cl'].result_count, 10)
+
+    def test_dates_seek_index(self):
+        """Test that seek_dates() matches DISTINCT and runs one query per distinct value"""
+        self.add_members(4)
+        for kind in ('year', 'month', 'day'):
+            for order in ('ASC', 'DESC'):
+                distinct = Attendance.objects.dates('date', kind, order)
+                self.assertIsInstance(distinct, QuerySet)
+                distinct = list(distinct)
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(Attendance.objects.seek_dates('date', kind, order), distinct)
+                self.assertEqual(len(queries), len(distinct) + 1)
+
+        # The date hierarchy reads its links through seek_dates()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/core/attendance/?date__year=2025')
+        self.assertFalse([q for q in queries if 'DISTINCT' in q['sql'].upper()])
+        self.assertContains(response, 'date__month=6')
+        self.assertEqual(response.context['cl'].result_count, 4)
+
+    @skipUnless(connection.vendor == 'postgresql', 'planner statistics are PostgreSQL only')
+    def test_unfiltered_count_is_estimated(self):
+        """Test that unfiltered changelists are counted from pg_class statistics"""
+        from .admin import EstimatedCountPaginator
+
+        self.add_members(10)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_attendance')
+        self.add_members(2, start=10)
+
+        paginator = EstimatedCountPaginator(Attendance.objects.all(), 100)
+        paginator.exact_count_limit = 1
+        self.assertEqual(paginator.count, 20)
+
+        paginator = EstimatedCountPaginator(Attendance.objects.filter(present=True), 100)
+        paginator.exact_count_limit = 1
+        self.assertEqual(paginator.count, 24)
+
+        # Small tables are counted exactly
+        self.assertEqual(EstimatedCountPaginator(Attendance.objects.all(), 100).count, 24)
+
+
+class RecordingHandler(logging.Handler):
+    """Keeps emitted records, optionally taking `delay` seconds per record like a slow disk"""
+
+    def __init__(self, delay=0):
+        super().__init__()
+        self.delay = delay
+        self.records = []
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.records.append(record)
+
+
+class QueuedLoggingTest(TestCase):
+    """Test cases for queue-based logging with request ids"""
+
+    def queued(self, target):
+        """A queue handler feeding `target`, attached to the django and core loggers for the test"""
+        handler = log.QueueListenerHandler([target])
+        handler.addFilter(log.RequestIdFilter())
+        for name in ('django.request', 'core'):
+            logger = logging.getLogger(name)
+            logger.addHandler(handler)
+            self.addCleanup(logger.removeHandler, handler)
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_logging_call_does_not_wait_for_the_writer(self):
+        """Test that records are written on the listener thread, not the caller's"""
+        target = RecordingHandler(delay=0.05)
+        handler = self.queued(target)
+        began = time.perf_counter()
+        for i in range(5):
+            logging.getLogger('core.test').warning('record %d', i)
+        self.assertLess(time.perf_counter() - began, 0.05)
+
+        handler.close()
+        self.assertEqual([r.getMessage() for r in target.records], [f'record {i}' for i in range(5)])
+
+    def test_request_id_header_and_records(self):
+        """Test that each request gets an id, echoed in the response and stamped on its log records"""
+        target = RecordingHandler()
+        handler = self.queued(target)
+
+        response = self.client.get('/api/no-such-endpoint/', HTTP_X_REQUEST_ID='desk-7.42')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['X-Request-ID'], 'desk-7.42')
+        # Logged by Django after the middleware returned
+        handler.close()
+        (record,) = [r for r in target.records if r.name == 'django.request']
+        self.assertEqual(record.request_id, 'desk-7.42')
+        self.assertEqual(log.current_request_id(), log.NO_REQUEST)
+
+        generated = self.client.get('/api/no-such-endpoint/', HTTP_X_REQUEST_ID='bad id\n')['X-Request-ID']
+        self.assertRegex(generated, r'^[0-9a-f]{32}$')
+        self.assertNotEqual(generated, self.client.get('/api/no-such-endpoint/')['X-Request-ID'])
+
+    def test_json_formatter(self):
+        """Test the JSON line written for a record with extra fields and a traceback"""
+        target = RecordingHandler()
+        handler = self.queued(target)
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logging.getLogger('core.test').exception('Failed for %s', 'Alice', extra={'member_id': 7})
+        handler.close()
+
+        entry = json.loads(log.JsonFormatter().format(target.records[0]))
+        self.assertEqual(entry['message'], 'Failed for Alice')
+        self.assertEqual((entry['level'], entry['logger'], entry['member_id']), ('ERROR', 'core.test', 7))
+        self.assertEqual(entry['request_id'], log.NO_REQUEST)
+        self.assertIn('ZeroDivisionError', entry['exc'])
+
+
+class CheckupScheduleTest(TestCase):
+    """Test cases for the due-checkup schedule"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='coach', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.registered = date(2026, 3, 2)
+
+    def member(self, code, registration_date=None, next_checkup_date=None):
+        member = Member.objects.create(member_code=code, full_name=f'Member {code}', phone=code,
+                                       registration_date=registration_date or self.registered)
+        if next_checkup_date is not None:
+            Member.objects.filter(pk=member.pk).update(next_checkup_date=next_checkup_date)
+        return member
+
+    def test_next_checkup_date(self):
+        """Test the week after the latest checkup, week 2 without one, and none after week 16"""
+        registered = self.registered
+        self.assertEqual(scheduling.next_checkup_date(registered), date(2026, 3, 9))
+        self.assertEqual(scheduling.next_checkup_date(registered, date(2026, 3, 17)), date(2026, 3, 23))
+        self.assertEqual(scheduling.next_checkup_date(registered, date(2026, 2, 20)), date(2026, 3, 9))
+        self.assertEqual(scheduling.next_checkup_date(registered, registered + timedelta(weeks=14)),
+                         registered + timedelta(weeks=15))
+        self.assertIsNone(scheduling.next_checkup_date(registered, registered + timedelta(weeks=15)))
+
+        # New members are scheduled on creation
+        self.assertEqual(self.member('M1').next_checkup_date, date(2026, 3, 9))
+        member = Member.objects.create(member_code='M2', full_name='Today', phone='M2')
+        member.refresh_from_db()
+        self.assertEqual(member.next_checkup_date, timezone.localdate() + timedelta(weeks=1))
+
+    def test_body_checkup_save_reschedules(self):
+        """Test that saving checkups moves the next checkup after the latest one"""
+        member = self.member('M1')
+        self.client.post(f'/api/body-checkup/{member.id}/save/', {'checkup_data': [
+            {'week': 3, 'data': {'weight': '68'}},
+            {'week': 2, 'data': {'weight': '69'}},
+        ]}, format='json')
+        member.refresh_from_db()
+        self.assertEqual(member.next_checkup_date, date(2026, 3, 23))
+
+        # An older week saved later does not move it back
+        self.client.post(f'/api/body-checkup/{member.id}/save/',
+                         {'checkup_data': [{'week': 2, 'data': {'weight': '69.5'}}]}, format='json')
+        member.refresh_from_db()
+        self.assertEqual(member.next_checkup_date, date(2026, 3, 23))
+
+        self.client.post(f'/api/body-checkup/{member.id}/save/',
+                         {'checkup_data': [{'week': 16, 'data': {'weight': '60'}}]}, format='json')
+        member.refresh_from_db()
+        self.assertIsNone(member.next_checkup_date)
+
+    def test_due_endpoint(self):
+        """Test that due and overdue members come back earliest first, one query per page"""
+        day = date(2026, 4, 6)
+        overdue = self.member('M1', next_checkup_date=date(2026, 3, 30))
+        due = [self.member(code, next_checkup_date=day) for code in ('M2', 'M3')]
+        self.member('M4', next_checkup_date=date(2026, 4, 13))
+        self.member('M5')
+        Member.objects.filter(member_code='M5').update(next_checkup_date=None)
+
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/checkups/due/', {'date': '2026-04-06'})
+        body = resp.json()
+        self.assertEqual([row['id'] for row in body['results']], [overdue.id, due[0].id, due[1].id])
+        self.assertEqual([row['status'] for row in body['results']], ['overdue', 'due', 'due'])
+        self.assertEqual((body['results'][0]['days_overdue'], body['results'][0]['week']), (7, 5))
+        self.assertIsNone(body['next'])
+
+        # Keyset pages, including a page boundary between members due the same day
+        ids = []
+        after = None
+        while True:
+            params = {'date': '2026-04-06', 'limit': 2, **({'after': after} if after else {})}
+            body = self.client.get('/api/checkups/due/', params).json()
+            ids += [row['id'] for row in body['results']]
+            after = body['next']
+            if after is None:
+                break
+        self.assertEqual(ids, [overdue.id, due[0].id, due[1].id])
+        for params in ({'after': 'x'}, {'after': '2025-13-01:5'}, {'date': '2025-02-30'}, {'date': 'soon'}):
+            self.assertEqual(self.client.get('/api/checkups/due/', params).status_code, 400, params)
+
+    def test_due_query_uses_index(self):
+        """Test that the due range is read from the next checkup index"""
+        with CaptureQueriesContext(connection) as context:
+            scheduling.due_members(date(2026, 4, 6), after=(date(2026, 3, 30), 5))
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # The test table is too small for the planner to prefer any index on cost
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            sql = context.captured_queries[0]['sql']
+            cursor.execute(f'EXPLAIN {sql}' if connection.vendor == 'postgresql' else f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('core_member_next_checkup_idx', plan)
+
+    def test_reminder_command(self):
+        """Test the CSV reminder list, read in batches, after rescheduling edited checkups"""
+        members = [self.member(f'M{i}') for i in range(5)]
+        # Checkups written around the save endpoint, so the stored dates are stale
+        Checkup.objects.create(member=members[0], checkup_date=date(2026, 3, 17))
+        Checkup.objects.create(member=members[1], checkup_date=self.registered + timedelta(weeks=15))
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command('checkup_reminders', '--date', '2026-03-23', '--batch-size', '2', '--reschedule',
+                     stdout=stdout, stderr=stderr)
+        rows = stdout.getvalue().splitlines()
+        self.assertEqual(rows[0], 'member_code,full_name,phone,next_checkup_date,week,days_overdue')
+        self.assertEqual(rows[1:], [f'M{i},Member M{i},M{i},2026-03-09,2,14' for i in (2, 3, 4)]
+                         + ['M0,Member M0,M0,2026-03-23,4,0'])
+        self.assertIn('1 members due today, 3 overdue', stderr.getvalue())
+
+
+class MembershipPlanTest(TestCase):
+    """Test cases for plan-driven sessions and expiry"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='desk', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def member(self, code, total=0, used=0, expires=None):
+        return Member.objects.create(member_code=code, full_name=f'Member {code}', phone=code,
+                                     membership_total_sessions=total, ums_count=used, membership_expires=expires)
+
+    def test_registration_uses_plan_rows(self):
+        """Test that sessions, price and expiry come from the Plan table"""
+        Plan.objects.filter(code='TRIAL').update(sessions=4, price=Decimal('800'), validity_days=14)
+        item = registration_item('9111111111', membership='TRIAL')
+        resp = self.client.post('/api/registrations/', item, format='json')
+        self.assertEqual(resp.status_code, 201)
+
+        member = Member.objects.get(phone='9111111111')
+        self.assertEqual((member.membership_total_sessions, member.ums_count, member.sessions_remaining), (4, 1, 3))
+        self.assertEqual(member.membership_expires, self.today + timedelta(days=14))
+        self.assertEqual(member.balance, Decimal('800.00'))
+
+        # Plans without fixed terms take them from the registration
+        item = registration_item('9222222222', membership='OTHERS', number_of_days=10, plan_total_amount=1500)
+        resp = self.client.post('/api/registrations/bulk/', [item], format='json')
+        self.assertEqual(resp.status_code, 201)
+        member = Member.objects.get(phone='9222222222')
+        self.assertEqual((member.membership_total_sessions, member.sessions_remaining), (10, 9))
+        self.assertIsNone(member.membership_expires)
+        self.assertEqual(member.balance, Decimal('1500.00'))
+
+    def test_attendance_consumes_sessions(self):
+        """Test that a visit takes a session in the same UPDATE as ums_count, once per day"""
+        member = self.member('M1', total=3, used=1)
+        unlimited = self.member('M2')
+        self.assertEqual((member.sessions_remaining, unlimited.sessions_remaining), (2, None))
+
+        entries = [{'member_id': member.id, 'present': True}, {'member_id': unlimited.id, 'present': True}]
+        with CaptureQueriesContext(connection) as context:
+            self.client.post('/api/attendance/submit/', {'date': '2026-04-01', 'entries': entries}, format='json')
+        updates = [q['sql'] for q in context.captured_queries
+                   if q['sql'].startswith('UPDATE "core_member"') and 'ums_count' in q['sql']]
+        self.assertEqual(len(updates), 2)
+        self.assertTrue(all('sessions_remaining' in sql for sql in updates))
+        self.client.post('/api/attendance/submit/', {'date': '2026-04-01', 'entries': entries}, format='json')
+
+        member.refresh_from_db()
+        unlimited.refresh_from_db()
+        self.assertEqual((member.ums_count, member.sessions_remaining), (2, 1))
+        self.assertEqual((unlimited.ums_count, unlimited.sessions_remaining), (1, None))
+
+        # Editing the counters directly recomputes what is left
+        resp = self.client.patch(f'/api/members/{member.id}/', {'ums_count': 3, 'sessions_remaining': 50}, format='json')
+        self.assertEqual(resp.json()['sessions_remaining'], 0)
+
+    def test_renewal_counts_sessions_from_the_new_plan(self):
+        """Test that a returning member's past visits do not use up a renewed plan"""
+        returning = self.member('9333333333', total=26, used=40)
+        resp = self.client.post('/api/registrations/', registration_item('9333333333'), format='json')
+        self.assertEqual(resp.status_code, 201)
+        returning.refresh_from_db()
+        self.assertEqual((returning.ums_count, returning.plan_start_count, returning.sessions_remaining), (40, 40, 26))
+        self.assertNotIn(returning.id, [row['id'] for row in self.client.get('/api/members/expired/').json()['results']])
+
+        self.client.post('/api/attendance/submit/', {'date': '2026-04-01', 'entries': [
+            {'member_id': returning.id, 'present': True},
+        ]}, format='json')
+        returning.refresh_from_db()
+        self.assertEqual((returning.ums_count, returning.sessions_remaining), (41, 25))
+        returning.save()  # a full save recomputes from the same counters
+        self.assertEqual(returning.sessions_remaining, 25)
+
+        # Bulk registration renews the same way
+        other = self.member('9444444444', total=3, used=12)
+        resp = self.client.post('/api/registrations/bulk/', [registration_item('9444444444')], format='json')
+        self.assertEqual(resp.status_code, 201)
+        other.refresh_from_db()
+        self.assertEqual((other.plan_start_count, other.sessions_remaining), (12, 26))
+
+    def test_renewal_and_expired_lists(self):
+        """Test the renewal candidate and expired member endpoints"""
+        last_session = self.member('M1', total=26, used=25)
+        used_up = self.member('M2', total=3, used=3)
+        ending = self.member('M3', expires=self.today + timedelta(days=3))
+        ended = self.member('M4', total=26, used=2, expires=self.today - timedelta(days=1))
+        self.member('M5', total=26, used=2, expires=self.today + timedelta(days=30))
+        self.member('M6')
+
+        ids = lambda resp: [row['id'] for row in resp.json()['results']]
+        with self.assertNumQueries(2):  # count and page
+            resp = self.client.get('/api/members/renewals/')
+        self.assertEqual(ids(resp), [last_session.id, ending.id])
+        self.assertEqual(ids(self.client.get('/api/members/renewals/', {'sessions': 0, 'days': 3})), [ending.id])
+        self.assertEqual(ids(self.client.get('/api/members/expired/')), [used_up.id, ended.id])
+        self.assertEqual(self.client.get('/api/members/renewals/', {'days': 'x'}).status_code, 400)
+
+
+class BranchTenancyTest(TestCase):
+    """Test cases for branch-scoped members, records, reports and caches"""
+
+    def setUp(self):
+        """Set up test data"""
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='desk', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.north = Branch.objects.create(code='NORTH', name='North')
+        self.south = Branch.objects.create(code='SOUTH', name='South')
+        self.ann = Member.objects.create(branch=self.north, member_code='N1', full_name='Ann North', phone='111',
+                                         registration_date=date(2026, 3, 2))
+        self.bob = Member.objects.create(branch=self.south, member_code='S1', full_name='Bob South', phone='222',
+                                         registration_date=date(2026, 3, 2))
+
+    def get(self, path, branch=None):
+        return self.client.get(path, **({'HTTP_X_BRANCH': branch} if branch else {}))
+
+    def test_rows_take_their_branch(self):
+        """Test the default branch for new members, and attendance and payments following their member"""
+        member = Member.objects.create(member_code='M1', full_name='Unplaced')
+        self.assertEqual(member.branch.code, DEFAULT_BRANCH)
+
+        attendance = Attendance.objects.create(member=self.ann, date=date(2026, 3, 3), present=True)
+        payment = ledger.record_payment(self.bob.id, 100)
+        self.assertEqual(attendance.branch, self.north)
+        self.assertEqual(payment.branch, self.south)
+
+        # Moved to a member of another branch through the API
+        response = self.client.patch(f'/api/payments/{payment.pk}/', {'member': self.ann.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        payment.refresh_from_db()
+        self.assertEqual(payment.branch, self.north)
+
+    def test_viewsets_are_scoped_to_the_request_branch(self):
+        """Test lists, lookups and writes narrowed by X-Branch or ?branch=, and unknown codes rejected"""
+        self.assertEqual(self.get('/api/members/').data['count'], 2)
+        self.assertEqual([m['full_name'] for m in self.get('/api/members/', 'north').data['results']], ['Ann North'])
+        self.assertEqual(self.client.get('/api/members/?branch=SOUTH').data['results'][0]['full_name'], 'Bob South')
+        self.assertEqual(self.get(f'/api/members/{self.bob.pk}/', 'NORTH').status_code, 404)
+        self.assertEqual(self.get('/api/members/', 'WEST').status_code, 400)
+
+        response = self.client.post('/api/members/', {'member_code': 'N2', 'full_name': 'New North', 'registration_date': '2026-03-02'},
+                                    format='json', HTTP_X_BRANCH='NORTH')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Member.objects.get(member_code='N2').branch, self.north)
+
+        # Members of another branch cannot be written to from this one
+        response = self.client.post('/api/payments/', {'member': self.bob.pk, 'amount': '50'},
+                                    format='json', HTTP_X_BRANCH='NORTH')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/attendance/submit/', {
+            'date': '2026-03-03', 'entries': [{'member_id': self.bob.pk, 'present': True}],
+        }, format='json', HTTP_X_BRANCH='NORTH')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_body_checkups_are_scoped(self):
+        """Test that a desk cannot read or save another branch's body checkups, cached or not"""
+        path = f'/api/body-checkup/{self.ann.pk}/'
+        self.assertEqual(self.get(path).status_code, 200)  # every branch, now cached
+        self.assertEqual(self.get(path, 'NORTH').status_code, 200)
+        self.assertEqual(self.get(path, 'SOUTH').status_code, 404)
+
+        request = AsyncRequestFactory().get(path)
+        request.user, request.branch = self.user, self.south
+        with self.assertRaises(Http404):
+            async_to_sync(async_views.body_checkup_data)(request, self.ann.pk)
+
+        checkup = {'checkup_data': [{'week': 2, 'data': {'weight': '70'}}]}
+        response = self.client.post(f'{path}save/', checkup, format='json', HTTP_X_BRANCH='SOUTH')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Checkup.objects.filter(member=self.ann).exists())
+        response = self.client.post(f'{path}save/', checkup, format='json', HTTP_X_BRANCH='NORTH')
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_cache_per_branch(self):
+        """Test that a change at one branch leaves the other branch's cached dashboard in place"""
+        for branch in ('NORTH', 'SOUTH', None):
+            self.get('/api/dashboard/stats/', branch)
+        Attendance.objects.create(member=self.ann, date=timezone.now().date(), present=True)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('/api/dashboard/stats/', 'SOUTH').data['today_attendance'], 0)
+        self.assertEqual(self.get('/api/dashboard/stats/', 'NORTH').data['today_attendance'], 1)
+        self.assertEqual(self.get('/api/dashboard/stats/').data['today_attendance'], 1)
+
+        # Writes whose branch is unknown drop every branch's entries
+        ledger.record_charge(self.bob.id, 300)
+        self.assertEqual(self.get('/api/dashboard/stats/', 'SOUTH').data['total_outstanding_balance'], 300.0)
+
+    def test_reports_and_due_checkups_per_branch(self):
+        """Test the range report, daily report rows and due checkup list narrowed to a branch"""
+        for member in (self.ann, self.bob):
+            Attendance.objects.create(member=member, date=date(2026, 3, 3), present=True, paid_amount=Decimal('10'))
+        ledger.record_payment(self.ann.id, 40, date=date(2026, 3, 3))
+
+        summary_north = reports.attendance_range_summary(date(2026, 3, 1), date(2026, 3, 31), self.north)
+        self.assertEqual(summary_north['totals']['visits'], 1)
+        self.assertEqual(summary_north['totals']['revenue'], Decimal('40'))
+        self.assertEqual(reports.attendance_range_summary(date(2026, 3, 1), date(2026, 3, 31))['totals']['visits'], 2)
+        self.assertEqual([a.member for a in reports.daily_attendances('2026-03-03', self.south)], [self.bob])
+
+        response = self.get('/api/checkups/due/?date=2026-03-09', 'SOUTH')
+        self.assertEqual([row['member_code'] for row in response.data['results']], ['S1'])
+        self.assertEqual(len(scheduling.due_members(date(2026, 3, 9))), 2)
+
+    def test_branch_queries_use_branch_indexes(self):
+        """Test that a branch's day of attendance and due checkups are read from the branch-led indexes"""
+        queries = {
+            'core_attend_branch_date_idx': Attendance.objects.for_branch(self.north).filter(date=date(2026, 3, 3)),
+            'core_member_branch_due_idx': Member.objects.for_branch(self.north)
+            .filter(next_checkup_date__lte=date(2026, 3, 9)).order_by('next_checkup_date', 'id'),
+        }
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Statistics for a few hundred members and visits, so index costs
+                # do not tie as they do on empty tables; the tables are still too
+                # small for the planner to prefer any index over a scan
+                Member.objects.bulk_create([
+                    Member(branch=branch, member_code=f'{branch.code}{i}', full_name=f'Member {i}', phone=f'9{i:04d}',
+                           next_checkup_date=date(2026, 1, 1) + timedelta(days=i))
+                    for branch in (self.north, self.south) for i in range(300)
+                ])
+                Attendance.objects.bulk_create([
+                    Attendance(member=member, branch_id=member.branch_id, date=date(2025, 1, 1) + timedelta(days=day))
+                    for member in (self.ann, self.bob) for day in range(300)
+                ])
+                cursor.execute('ANALYZE core_attendance')
+                cursor.execute('ANALYZE core_member')
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            for index, queryset in queries.items():
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f'EXPLAIN {sql}' if connection.vendor == 'postgresql' else f'EXPLAIN QUERY PLAN {sql}',
+                               params)
+                self.assertIn(index, ' '.join(str(row) for row in cursor.fetchall()))
+
+
+class ChangeFeedTest(TestCase):
+    """Test cases for the transactional outbox, the change feed and local consumers"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(username='desk', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.north = Branch.objects.create(code='NORTH', name='North')
+        self.member = Member.objects.create(member_code='M001', full_name='Ann', phone='111',
+                                            registration_date=date(2026, 3, 2))
+
+    def topics(self):
+        return list(OutboxEvent.objects.values_list('topic', flat=True))
+
+    def feed(self, query=''):
+        response = self.client.get(f'/api/changes/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in response.content.decode().splitlines()], response['X-Next-Cursor']
+
+    def test_attendance_submit_writes_events_with_its_changes(self):
+        """A submission adds its attendance and payment events; a failed one adds none"""
+        response = self.client.post('/api/attendance/submit/', {'date': '2026-03-09', 'entries': [
+            {'member_id': self.member.pk, 'present': True, 'paid_amount': 500, 'method': 'upi'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.topics(), [outbox.ATTENDANCE_RECORDED, outbox.PAYMENT_CREATED])
+        payment = OutboxEvent.objects.get(topic=outbox.PAYMENT_CREATED)
+        self.assertEqual(payment.member_id, self.member.pk)
+        self.assertEqual(payment.branch_id, self.member.branch_id)
+        self.assertEqual(payment.payload['amount'], '500.00')
+        self.assertEqual(payment.payload['method'], 'upi')
+
+        response = self.client.post('/api/attendance/submit/', {'date': '2026-03-10', 'entries': [
+            {'member_id': self.member.pk, 'present': True, 'paid_amount': 100},
+            {'member_id': 999999, 'present': True},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+    def test_registration_checkup_and_payment_writes_emit(self):
+        """Registrations, checkup saves and payment edits each leave an event"""
+        response = self.client.post('/api/registrations/', registration_item('9000000001', 'Guest',
+                                    initial_amount_paid=300), format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        registered = OutboxEvent.objects.get(topic=outbox.REGISTRATION_SAVED)
+        self.assertTrue(registered.payload['member_created'])
+        self.assertEqual(registered.payload['phone'], '9000000001')
+
+        self.client.post(f'/api/body-checkup/{self.member.pk}/save/', {'checkup_data': [
+            {'week': 2, 'data': {'weight': '70', 'height': '170'}},
+        ]}, format='json')
+        checkup = OutboxEvent.objects.get(topic=outbox.CHECKUP_SAVED)
+        self.assertEqual(checkup.payload['next_checkup_date'], '2026-03-16')
+        self.assertEqual(checkup.payload['checkups'][0]['weight'], '70.00')
+
+        payment_id = self.client.post('/api/payments/', {'member': self.member.pk, 'amount': '50', 'date': '2026-03-09'},
+                                      format='json').data['id']
+        self.client.patch(f'/api/payments/{payment_id}/', {'amount': '60'}, format='json')
+        self.client.delete(f'/api/payments/{payment_id}/')
+        self.assertEqual(self.topics()[-3:], [outbox.PAYMENT_CREATED, outbox.PAYMENT_UPDATED, outbox.PAYMENT_DELETED])
+        updated = OutboxEvent.objects.get(topic=outbox.PAYMENT_UPDATED)
+        self.assertEqual((updated.payload['previous']['amount'], updated.payload['amount']), ('50.00', '60.00'))
+
+    def test_feed_reads_after_the_cursor_in_order(self):
+        """The feed returns NDJSON after ?after=, filtered by branch and topic, with the next cursor"""
+        bob = Member.objects.create(branch=self.north, member_code='N1', full_name='Bob', phone='222')
+        first, second, third = outbox.emit([
+            outbox.event(outbox.PAYMENT_CREATED, {'amount': 1}, self.member.pk, self.member.branch_id),
+            outbox.event(outbox.PAYMENT_CREATED, {'amount': 2}, bob.pk, self.north.pk),
+            outbox.event(outbox.CHECKUP_SAVED, {}, self.member.pk, self.member.branch_id),
+        ])
+
+        lines, cursor = self.feed()
+        self.assertEqual([line['id'] for line in lines], [first.pk, second.pk, third.pk])
+        self.assertEqual(lines[0]['payload'], {'amount': 1})
+        self.assertEqual(cursor, str(third.pk))
+        lines, cursor = self.feed(f'?after={first.pk}&limit=1')
+        self.assertEqual(([line['id'] for line in lines], cursor), ([second.pk], str(second.pk)))
+        lines, _ = self.feed('?branch=NORTH')
+        self.assertEqual([line['id'] for line in lines], [second.pk])
+        lines, _ = self.feed(f'?topic={outbox.CHECKUP_SAVED}')
+        self.assertEqual([line['id'] for line in lines], [third.pk])
+
+        # Nothing new: an empty body and the same cursor, without holding the worker
+        started = time.monotonic()
+        lines, cursor = self.feed(f'?after={third.pk}&wait=30')
+        self.assertEqual((lines, cursor), ([], str(third.pk)))
+        self.assertLess(time.monotonic() - started, 5)
+
+        self.assertEqual(self.client.get('/api/changes/?after=x').status_code, 400)
+        self.assertEqual(APIClient().get('/api/changes/').status_code, 403)
+
+    async def test_async_feed_matches_sync(self):
+        """The ASGI change feed returns the same lines"""
+        await sync_to_async(outbox.emit)([outbox.event(outbox.CHECKUP_SAVED, {'n': 1}, self.member.pk)])
+        request = AsyncRequestFactory().get('/api/changes/')
+        request.user = AnonymousUser()
+        self.assertEqual((await async_views.change_feed(request)).status_code, 403)
+
+        request.user = self.user
+        response = await async_views.change_feed(request)
+        expected = await sync_to_async(lambda: self.client.get('/api/changes/'))()
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response['X-Next-Cursor'], expected['X-Next-Cursor'])
+
+        # Only the async feed long-polls
+        cursor = response['X-Next-Cursor']
+        request = AsyncRequestFactory().get(f'/api/changes/?after={cursor}&wait=0.1')
+        request.user = self.user
+        with mock.patch.object(outbox, 'POLL_INTERVAL', 0.01):
+            started = time.monotonic()
+            response = await async_views.change_feed(request)
+        self.assertEqual((response.content, response['X-Next-Cursor']), (b'', cursor))
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+    def test_consumer_command_keeps_its_cursor(self):
+        """consume_changes prints only events it has not handled and prunes handled ones"""
+        outbox.emit([outbox.event(outbox.CHECKUP_SAVED, {'n': n}) for n in range(3)])
+        out, err = StringIO(), StringIO()
+        call_command('consume_changes', 'reminders', '--batch-size', '2', stdout=out, stderr=err)
+        self.assertEqual([json.loads(line)['payload']['n'] for line in out.getvalue().splitlines()], [0, 1, 2])
+        self.assertIn('reminders: 3 events', err.getvalue())
+        self.assertEqual(outbox.position('reminders'), OutboxEvent.objects.last().pk)
+
+        outbox.emit([outbox.event(outbox.CHECKUP_SAVED, {'n': 3})])
+        out = StringIO()
+        call_command('consume_changes', 'reminders', stdout=out, stderr=StringIO())
+        self.assertEqual([json.loads(line)['payload']['n'] for line in out.getvalue().splitlines()], [3])
+
+        # Another consumer has not read anything yet, so nothing may be pruned
+        OutboxCursor.objects.create(name='accounting', position=0)
+        call_command('consume_changes', 'reminders', '--prune-days', '0', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(OutboxEvent.objects.count(), 4)
+        call_command('consume_changes', 'accounting', '--prune-days', '0', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(OutboxEvent.objects.count(), 0)
+
+
+class ReadReplicaTest(TransactionTestCase):
+    """Test cases for routing report reads to the read replica"""
+
+    # Resolved in setUpClass, after the replica alias is added
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        # Without REPLICA_DATABASE_URL, stand in a second connection to the test database
+        cls.stand_in = not replica.configured()
+        if cls.stand_in:
+            connections.settings[replica.REPLICA] = dict(connections['default'].settings_dict)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.stand_in:
+            connections[replica.REPLICA].close()
+            del connections[replica.REPLICA]
+            del connections.settings[replica.REPLICA]
+
+    def setUp(self):
+        """Set up test data"""
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='operator', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.member = Member.objects.create(member_code='M001', full_name='Test User', phone='9000000000')
+        Attendance.objects.create(member=self.member, date=date(2026, 4, 1), present=True, paid_amount=100)
+
+    def reads(self, request):
+        """(replica, default) SQL statements touching core_attendance while `request()` runs"""
+        with CaptureQueriesContext(connections[replica.REPLICA]) as on_replica, \
+                CaptureQueriesContext(connections['default']) as on_default:
+            request()
+        return [[q['sql'] for q in context.captured_queries if 'core_attendance' in q['sql']]
+                for context in (on_replica, on_default)]
+
+    def test_reports_read_from_replica(self):
+        """Test that report, dashboard and streamed PDF queries go to the replica"""
+        on_replica, on_default = self.reads(lambda: self.client.get(
+            '/api/report/range/', {'period': 'custom', 'from': '2026-04-01', 'to': '2026-04-30'}))
+        self.assertTrue(on_replica)
+        self.assertEqual(on_default, [])
+
+        on_replica, on_default = self.reads(lambda: self.client.get('/api/dashboard/stats/'))
+        self.assertTrue(on_replica)
+        self.assertEqual(on_default, [])
+
+        # The daily report queries run while the response streams
+        on_replica, on_default = self.reads(lambda: b''.join(
+            self.client.get('/api/report/daily/', {'date': '2026-04-01'}).streaming_content))
+        self.assertTrue(on_replica)
+        self.assertEqual(on_default, [])
+
+        # Everything else reads the primary
+        on_replica, _ = self.reads(lambda: self.client.get('/api/attendances/'))
+        self.assertEqual(on_replica, [])
+
+    def test_writes_pin_reads_to_primary(self):
+        """Test read-your-writes after a submission, and within a request or command that wrote"""
+        report = lambda: self.client.get('/api/report/range/', {'period': 'custom', 'from': '2026-04-01', 'to': '2026-04-30'})
+        response = self.client.post('/api/attendance/submit/', {
+            'date': '2026-04-02', 'entries': [{'member_id': self.member.id, 'present': True}],
+        }, format='json')
+        cookie = response.cookies[replica.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], django_settings.REPLICA_PIN_SECONDS)
+
+        on_replica, on_default = self.reads(report)
+        self.assertEqual(on_replica, [])
+        self.assertTrue(on_default)
+        self.assertEqual(report().json()['totals']['visits'], 2)
+
+        # Once the cookie expires, reads go back to the replica
+        del self.client.cookies[replica.PIN_COOKIE]
+        on_replica, _ = self.reads(report)
+        self.assertTrue(on_replica)
+
+        def write_then_read():
+            with replica.reads():
+                self.assertEqual(router.db_for_read(Attendance), replica.REPLICA)
+                with transaction.atomic():
+                    self.assertEqual(router.db_for_read(Attendance), 'default')
+                Attendance.objects.filter(pk__in=[]).update(present=True)
+                self.assertEqual(router.db_for_read(Attendance), 'default')
+
+        # A fresh context, like a new request or command
+        contextvars.Context().run(write_then_read)
@@ -0,0 +1,135 @@
+"""
+Coalesced writes to Member rows.
+
+A request that touches a member several times - registration sets profile
+fields, posts ledger deltas and records metrics - stages those changes on
+a UnitOfWork instead of saving the row each time. When the unit of work
+closes, the staged members are written with a single UPDATE carrying only
+the fields that changed, still inside the transaction.
+
+Latest weight and height are taken from the measurement with the greatest
+date, counting the member's stored checkups as well as measurements staged
+here, so saving an older week never overwrites a newer value.
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache, summary
+from .models import Member, Checkup
+
+
+class UnitOfWork:
+    """Field changes, balance deltas and measurements staged per member."""
+
+    def __init__(self):
+        self.fields = {}        # member id -> {field: value}
+        self.deltas = {}        # member id -> {field: amount}
+        self.measurements = {}  # member id -> [(date, weight, height)]
+        self.instances = {}     # member id -> Member, updated after flush
+
+    def _track(self, member):
+        if isinstance(member, Member):
+            self.instances.setdefault(member.pk, member)
+            return member.pk
+        return member
+
+    def update(self, member, **fields):
+        """Stage plain field assignments; `member` is a Member or its id."""
+        member_id = self._track(member)
+        self.fields.setdefault(member_id, {}).update(fields)
+        if member_id in self.instances:
+            for name, value in fields.items():
+                setattr(self.instances[member_id], name, value)
+
+    def increment(self, member, **deltas):
+        """Stage additions applied with F() expressions (e.g. balance=+100)."""
+        member_id = self._track(member)
+        staged = self.deltas.setdefault(member_id, {})
+        for name, amount in deltas.items():
+            staged[name] = staged.get(name, 0) + amount
+
+    def measure(self, member, date, weight=None, height=None):
+        """Offer a dated weight/height; the most recent one becomes the member's latest."""
+        member_id = self._track(member)
+        self.measurements.setdefault(member_id, []).append((date, weight, height))
+
+    def _latest_metrics(self):
+        """{member id: {'latest_weight': ..., 'latest_height': ...}} for measured members."""
+        candidates = {member_id: [] for member_id in self.measurements}
+        # Stored checkups first so that, on the same date, a staged value wins
+        stored = Checkup.objects.filter(member_id__in=list(candidates)).order_by('id')
+        for member_id, *measurement in stored.values_list('member_id', 'checkup_date', 'weight', 'height'):
+            candidates[member_id].append(measurement)
+        latest = {}
+        for member_id, measurements in candidates.items():
+            measurements += self.measurements[member_id]
+            latest[member_id] = {}
+            for index, field in ((1, 'latest_weight'), (2, 'latest_height')):
+                dated = [(m[0], position, m[index]) for position, m in enumerate(measurements) if m[index] is not None]
+                if dated:
+                    latest[member_id][field] = max(dated, key=lambda d: (d[0], d[1]))[2]
+        return latest
+
+    def flush(self):
+        """
+        Write the staged members with one UPDATE and clear the unit of work.
+        Tracked instances get the written values, except incremented fields,
+        which need refresh_from_db().
+        """
+        latest = self._latest_metrics() if self.measurements else {}
+        now = timezone.now()
+        rows = {}
+        for member_id in sorted(set(self.fields) | set(self.deltas) | set(self.measurements)):
+            values = dict(self.fields.get(member_id, {}))
+            values.update(latest.get(member_id, {}))
+            for name, amount in self.deltas.get(member_id, {}).items():
+                values[name] = F(name) + amount
+            values['updated_at'] = now
+            rows[member_id] = values
+
+        if len(rows) == 1:
+            [(member_id, values)] = rows.items()
+            Member.objects.filter(pk=member_id).update(**values)
+        elif rows:
+            # One CASE per column; members without a staged value keep theirs
+            names = sorted({name for values in rows.values() for name in values})
+            objs = []
+            for member_id, values in rows.items():
+                obj = Member(pk=member_id)
+                for name in names:
+                    setattr(obj, name, values.get(name, F(name)))
+                objs.append(obj)
+            Member.objects.bulk_update(objs, names)
+
+        if rows:
+            # update() sends no post_save; narrowed to the members' branches when all are tracked
+            tracked = [self.instances.get(member_id) for member_id in rows]
+            branch_ids = None if any(t is None for t in tracked) else [t.branch_id for t in tracked]
+            cache.members_changed(list(rows), branch_ids)
+            for member_id, values in rows.items():
+                summary.mark_stale(member_id)
+                instance = self.instances.get(member_id)
+                if instance is not None:
+                    for name, value in values.items():
+                        if name not in self.deltas.get(member_id, {}):
+                            setattr(instance, name, value)
+
+        self.fields, self.deltas, self.measurements = {}, {}, {}
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Open a transaction with a UnitOfWork that is flushed just before it commits:
+
+        with unit_of_work() as uow:
+            uow.update(member, gender='F')
+            uow.measure(member, checkup_date, weight=Decimal('71.2'))
+    """
+    uow = UnitOfWork()
+    with transaction.atomic():
+        yield uow
+        uow.flush()
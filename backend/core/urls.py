@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
@@ -14,10 +15,28 @@ urlpatterns = [
     path('', include(router.urls)),
     path('attendance/submit/', views.attendance_submit, name='attendance_submit'),
     path('report/daily/', views.generate_daily_report, name='daily_report'),
+    path('report/range/', views.attendance_range_report, name='range_report'),
     path('reports/registration/<int:registration_id>/analysis/', views.generate_registration_analysis, name='registration_analysis'),
+    path('reports/registrations/analysis/', views.generate_batch_analysis, name='batch_analysis'),
     path('dashboard/stats/', views.dashboard_stats, name='dashboard_stats'),
     # Removed standalone members/search path to avoid collision with router detail route
     path('body-checkup/<int:member_id>/', views.body_checkup_data, name='body_checkup_data'),
     path('body-checkup/<int:member_id>/save/', views.body_checkup_save, name='body_checkup_save'),
     path('health/', views.health_check, name='health_check'),
+    path('auth/token/', views.issue_api_token, name='issue_api_token'),
+    path('cache/stats/', views.cache_stats, name='cache_stats'),
+    path('changes/', views.change_feed, name='change_feed'),
 ]
+
+if settings.ASYNC_VIEWS:
+    from . import async_views
+
+    # Registered ahead of the sync routes so they take precedence under ASGI
+    urlpatterns = [
+        path('members/search/', async_views.member_search, name='member_search_async'),
+        path('report/daily/', async_views.generate_daily_report, name='daily_report_async'),
+        path('dashboard/stats/', async_views.dashboard_stats, name='dashboard_stats_async'),
+        path('body-checkup/<int:member_id>/', async_views.body_checkup_data, name='body_checkup_data_async'),
+        path('health/', async_views.health_check, name='health_check_async'),
+        path('changes/', async_views.change_feed, name='change_feed_async'),
+    ] + urlpatterns
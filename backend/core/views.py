@@ -1,20 +1,31 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes, action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
-from django.db import transaction
+from rest_framework.pagination import PageNumberPagination
+from django.db import IntegrityError, transaction
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.http import HttpResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
-from django.db.models import Q
-from weasyprint import HTML
+from django.db.models import F, Q, Sum
 from decimal import Decimal
-from .models import Member, Attendance, Payment, Checkup, Registration, BodyComponentEvaluation
+from .models import (
+    Member, Attendance, Payment, Checkup, Registration, BodyComponentEvaluation, MemberSummary, LedgerEntry,
+    default_branch,
+)
+from . import branches, cache, codes, ledger, outbox, plans, replica, reports, scheduling, summary
+from .authentication import issue_token
+from .unit_of_work import unit_of_work
+from .pdf import render_pdf
 from .serializers import (
-    MemberSerializer, MemberListSerializer, AttendanceSerializer, 
-    PaymentSerializer, CheckupSerializer, RegistrationSerializer, BodyComponentEvaluationSerializer
+    MemberSerializer, MemberListSerializer, MemberSummarySerializer, AttendanceSerializer, 
+    PaymentSerializer, CheckupSerializer, RegistrationSerializer, BodyComponentEvaluationSerializer,
+    IntakeBodyEvaluationSerializer,
 )
 
 
@@ -138,7 +149,32 @@ def calculate_body_analysis(body_eval, registration):
     return body_eval
 
 
-class MemberViewSet(viewsets.ModelViewSet):
+class MemberPagination(PageNumberPagination):
+    """Default page size, with ?page_size= for the UMS table, which loads every member"""
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+# Fewest sessions left, then soonest expiry; members without a limit last on every database
+PLAN_ORDER = (F('sessions_remaining').asc(nulls_last=True), F('membership_expires').asc(nulls_last=True), 'pk')
+
+
+class BranchScopedMixin:
+    """
+    Narrow a viewset to the request's branch (core.branches); `branch_field`
+    is the lookup from its model to the Branch.
+    """
+    branch_field = 'branch'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        branch = branches.current(self.request)
+        if branch is None:
+            return queryset
+        return queryset.filter(**{self.branch_field: branch})
+
+
+class MemberViewSet(BranchScopedMixin, viewsets.ModelViewSet):
     """
     API endpoint for members
     GET /api/members/ - list all members (with optional search)
@@ -149,14 +185,15 @@ class MemberViewSet(viewsets.ModelViewSet):
     """
     queryset = Member.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = MemberPagination
     
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'renewals', 'expired'):
             return MemberListSerializer
         return MemberSerializer
     
     def get_queryset(self):
-        queryset = Member.objects.all()
+        queryset = super().get_queryset()
         search = self.request.query_params.get('search', None)
         if search:
             queryset = queryset.filter(
@@ -166,6 +203,9 @@ class MemberViewSet(viewsets.ModelViewSet):
             )
         return queryset
 
+    def perform_create(self, serializer):
+        serializer.save(branch_id=branches.branch_id(self.request))
+
     @action(detail=False, methods=['get'], url_path='search', permission_classes=[AllowAny])
     def search(self, request):
         """
@@ -177,46 +217,211 @@ class MemberViewSet(viewsets.ModelViewSet):
         if not search_term:
             return Response({'detail': 'Search term required'}, status=400)
 
-        members = Member.objects.filter(
-            Q(full_name__icontains=search_term) | Q(phone__icontains=search_term)
-        ).values('id', 'full_name', 'phone', 'registration_date', 'invited_by', 'gender')[:10]
+        branch = branches.current(request)
+
+        def search():
+            return list(Member.objects.for_branch(branch).filter(
+                Q(full_name__icontains=search_term) | Q(phone__icontains=search_term)
+            ).values('id', 'full_name', 'phone', 'registration_date', 'invited_by', 'gender')[:10])
+
+        return Response(cache.cached(cache.MEMBER_SEARCH, search_term.lower(), search,
+                                     scope=cache.branch_scope(branch)))
+
+    @action(detail=False, methods=['get'], url_path='renewals')
+    def renewals(self, request):
+        """
+        Members close to the end of their plan.
+        GET /api/members/renewals/?sessions=3&days=7
+        Those with at most `sessions` sessions left or whose plan ends within
+        `days` days, fewest sessions first; expired members are not included.
+        """
+        try:
+            sessions = int(request.query_params.get('sessions', plans.RENEWAL_SESSIONS))
+            days = int(request.query_params.get('days', plans.RENEWAL_DAYS))
+        except ValueError:
+            return Response({'detail': 'sessions and days must be numbers'}, status=400)
+        members = plans.renewal_candidates(timezone.localdate(), sessions, days).for_branch(branches.current(request))
+        return self._member_page(members.order_by(*PLAN_ORDER))
+
+    @action(detail=False, methods=['get'], url_path='expired')
+    def expired(self, request):
+        """
+        Members who have used every session or whose plan has ended.
+        GET /api/members/expired/
+        """
+        members = plans.expired(timezone.localdate()).for_branch(branches.current(request))
+        return self._member_page(members.order_by(*PLAN_ORDER))
+
+    def _member_page(self, queryset):
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='summary')
+    def member_summary(self, request):
+        """
+        Member 360 for the member details page.
+        GET /api/members/summary/?q=<member code, phone or id>
+        Served from the MemberSummary read model in one indexed query.
+        """
+        term = request.query_params.get('q', '').strip()
+        if not term:
+            return Response({'detail': 'Search term required'}, status=400)
 
-        return Response(list(members))
+        lookup = Q(member_code=term) | Q(phone=term)
+        if term.isdigit():
+            lookup |= Q(pk=int(term))
+        branch = branches.current(request)
+        rows = MemberSummary.objects.filter(lookup)
+        if branch is not None:
+            rows = rows.filter(member__branch=branch)
+        row = rows.order_by('pk').first()
 
+        if row is None:
+            # Not built yet, e.g. before the first refresh_member_summaries run
+            member_id = Member.objects.for_branch(branch).filter(lookup).order_by('pk') \
+                .values_list('pk', flat=True).first()
+            row = summary.refresh(member_id) if member_id else None
+        if row is None:
+            return Response({'detail': 'Member not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(MemberSummarySerializer(row).data)
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+
+class AttendanceViewSet(BranchScopedMixin, viewsets.ModelViewSet):
     """API endpoint for attendance records"""
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        queryset = Attendance.objects.all()
+        queryset = super().get_queryset()
         date = self.request.query_params.get('date', None)
         if date:
             queryset = queryset.filter(date=date)
         return queryset
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
-    """API endpoint for payments"""
+class PaymentViewSet(BranchScopedMixin, viewsets.ModelViewSet):
+    """
+    API endpoint for payments.
+    Every write is mirrored into the member ledger so balances stay in step.
+    """
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        payment = serializer.save()
+        ledger.post_entry(payment.member_id, ledger.PAYMENT, -payment.amount,
+                          date=payment.date, payment=payment, notes=payment.notes, branch_id=payment.branch_id)
+        outbox.emit([outbox.payment_event(outbox.PAYMENT_CREATED, payment)])
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous = Payment.objects.get(pk=serializer.instance.pk)
+        payment = serializer.save()
+        if previous.member_id != payment.member_id:
+            ledger.post_entry(previous.member_id, ledger.PAYMENT, previous.amount,
+                              date=payment.date, notes=f'Payment #{payment.pk} moved to another member',
+                              branch_id=previous.branch_id)
+            ledger.post_entry(payment.member_id, ledger.PAYMENT, -payment.amount,
+                              date=payment.date, payment=payment, notes=payment.notes, branch_id=payment.branch_id)
+        elif previous.amount != payment.amount:
+            ledger.post_entry(payment.member_id, ledger.PAYMENT, previous.amount - payment.amount,
+                              date=payment.date, payment=payment, notes=f'Payment #{payment.pk} amended',
+                              branch_id=payment.branch_id)
+        outbox.emit([outbox.payment_event(outbox.PAYMENT_UPDATED, payment, previous=outbox.payment(previous))])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        ledger.post_entry(instance.member_id, ledger.PAYMENT, instance.amount,
+                          date=instance.date, notes=f'Payment #{instance.pk} deleted', branch_id=instance.branch_id)
+        event = outbox.payment_event(outbox.PAYMENT_DELETED, instance)
+        instance.delete()
+        outbox.emit([event])
+
 
-class CheckupViewSet(viewsets.ModelViewSet):
+# Rows per page of /api/checkups/due/
+DUE_PAGE_SIZE = 200
+DUE_PAGE_SIZE_MAX = 1000
+
+
+class CheckupViewSet(BranchScopedMixin, viewsets.ModelViewSet):
     """API endpoint for checkups"""
     queryset = Checkup.objects.all()
+    branch_field = 'member__branch'
     serializer_class = CheckupSerializer
     permission_classes = [IsAuthenticated]
 
+    @action(detail=False, methods=['get'], url_path='due')
+    def due(self, request):
+        """
+        Members due for a body checkup today, and overdue ones.
+        GET /api/checkups/due/?date=YYYY-MM-DD&limit=200&after=<next>
+
+        Earliest first. Each page is one range scan of the next_checkup_date
+        index; pass the returned "next" as ?after= for the following page.
+        """
+        query = request.query_params
+        # parse_date returns None for a malformed date and raises ValueError
+        # for a well-formed impossible one (2025-02-30); both are a 400
+        try:
+            day = parse_date(query['date']) if query.get('date') else timezone.localdate()
+            if day is None:
+                raise ValueError(query['date'])
+        except ValueError:
+            return Response({'detail': 'date must be YYYY-MM-DD'}, status=400)
+        try:
+            limit = max(1, min(int(query.get('limit', DUE_PAGE_SIZE)), DUE_PAGE_SIZE_MAX))
+        except ValueError:
+            return Response({'detail': 'limit must be a number'}, status=400)
+        after = None
+        if query.get('after'):
+            date, _, member_id = query['after'].partition(':')
+            try:
+                after_date = parse_date(date)
+                if after_date is None or not member_id.isdigit():
+                    raise ValueError(query['after'])
+            except ValueError:
+                return Response({'detail': 'after must be <date>:<member id>'}, status=400)
+            after = (after_date, int(member_id))
+
+        rows = scheduling.due_members(day, after, limit, branches.current(request))
+        for row in rows:
+            row['status'] = 'due' if row['next_checkup_date'] == day else 'overdue'
+            row['days_overdue'] = (day - row['next_checkup_date']).days
+        following = None
+        if len(rows) == limit:
+            following = f"{rows[-1]['next_checkup_date']}:{rows[-1]['id']}"
+        return Response({'date': day, 'results': rows, 'next': following})
+
+
+# Most registrations accepted by one bulk request
+BULK_REGISTRATION_LIMIT = 500
+
+
+def registration_plan(validated_data, reg_data, all_plans=None):
+    """
+    Return (total_sessions, plan_total, initial_paid, validity_days) for a
+    validated registration, from its Plan row. For plans without fixed terms
+    (OTHERS), number_of_days and plan_total_amount come from the request.
+    """
+    total_sessions, plan_total, validity_days = plans.terms(
+        validated_data.get('membership'),
+        number_of_days=validated_data.get('number_of_days'),
+        price=validated_data.get('plan_total_amount') or reg_data.get('plan_total_amount'),
+        all_plans=all_plans,
+    )
+
+    # Get initial amount paid from request (default 0)
+    initial_paid_raw = validated_data.get('initial_amount_paid') or reg_data.get('initial_amount_paid') or 0
+    return total_sessions, plan_total, Decimal(str(initial_paid_raw)), validity_days
+
 
 class RegistrationViewSet(viewsets.ViewSet):
     """API endpoint for registrations - custom implementation for atomic create"""
     permission_classes = []  # Allow unauthenticated access for new registrations
 
-    @transaction.atomic
     def create(self, request):
         """
         Accepts full registration payload that includes:
@@ -241,104 +446,103 @@ class RegistrationViewSet(viewsets.ViewSet):
         invited_by = reg_serializer.validated_data.get('invited_by')
         membership_type = reg_serializer.validated_data.get('membership')
         
-        # Determine membership total sessions and plan amounts
-        membership_totals = {
-            'TRIAL': 3,
-            'UMS': 26,
-            'COMPLEMENT': 1,
-        }
-        membership_amounts = {
-            'TRIAL': Decimal('700'),
-            'UMS': Decimal('5400'),
-            'COMPLEMENT': Decimal('0'),
-        }
-        
-        # For OTHERS membership, use number_of_days and custom amounts
-        if membership_type == 'OTHERS':
-            number_of_days = reg_serializer.validated_data.get('number_of_days', 0)
-            total_sessions = number_of_days
-            # For OTHERS, accept custom plan_total_amount from frontend
-            plan_total_raw = reg_serializer.validated_data.get('plan_total_amount') or reg_data.get('plan_total_amount') or 0
-            plan_total = Decimal(str(plan_total_raw))
-        else:
-            total_sessions = membership_totals.get(membership_type, 0)
-            plan_total = membership_amounts.get(membership_type, Decimal('0'))
-        
-        # Get initial amount paid from request (default 0)
-        initial_paid_raw = reg_serializer.validated_data.get('initial_amount_paid') or reg_data.get('initial_amount_paid') or 0
-        initial_paid = Decimal(str(initial_paid_raw))
+        total_sessions, plan_total, initial_paid, validity_days = registration_plan(
+            reg_serializer.validated_data, reg_data
+        )
+        today = timezone.now().date()
         
         # Set plan_total_amount and initial_amount_paid
         reg_serializer.validated_data['plan_total_amount'] = plan_total
         reg_serializer.validated_data['initial_amount_paid'] = initial_paid
         
-        member = Member.objects.filter(phone=phone).first()
-        if not member:
-            # create a new Member minimal record
-            member = Member.objects.create(
-                member_code=f"M{int(timezone.now().timestamp())}",
-                full_name=reg_serializer.validated_data.get('guest_name'),
-                phone=phone,
-                gender=gender,
-                invited_by=invited_by,
-                registration_date=timezone.now().date(),
-                membership=membership_type,
-                membership_total_sessions=total_sessions,
-                ums_count=1,  # Registration counts as first session
-            )
-            # Create new registration for new member
-            registration = reg_serializer.save(member=member)
-        else:
-            # Update existing member with gender, invited_by, and membership info
-            member.gender = gender
-            member.invited_by = invited_by
-            member.membership = membership_type
-            member.membership_total_sessions = total_sessions
-            # Only set ums_count to 1 if it's currently 0
-            if member.ums_count == 0:
-                member.ums_count = 1
-            member.save(update_fields=['gender', 'invited_by', 'membership', 'membership_total_sessions', 'ums_count', 'updated_at'])
-            
-            # Check if member already has a registration (OneToOne relationship)
-            try:
-                registration = member.registration
-                # Update existing registration with new data
-                for key, value in reg_serializer.validated_data.items():
-                    if key != 'member':  # Don't update the member field
-                        setattr(registration, key, value)
-                registration.save()
-            except Registration.DoesNotExist:
-                # Create new registration if member doesn't have one
+        # Member changes are staged and written as one UPDATE before commit
+        with unit_of_work() as uow:
+            member = Member.objects.for_branch(branches.current(request)).filter(phone=phone).first()
+            created = not member
+            if created:
+                # create a new Member minimal record
+                member = Member.objects.create(
+                    branch_id=branches.branch_id(request),
+                    member_code=codes.next_code(),
+                    full_name=reg_serializer.validated_data.get('guest_name'),
+                    phone=phone,
+                    gender=gender,
+                    invited_by=invited_by,
+                    registration_date=today,
+                    membership=membership_type,
+                    membership_total_sessions=total_sessions,
+                    ums_count=1,  # Registration counts as first session
+                    membership_expires=plans.expiry(today, validity_days),
+                )
+                # Create new registration for new member
                 registration = reg_serializer.save(member=member)
+            else:
+                # Update existing member with gender, invited_by, and membership info
+                profile = {
+                    'gender': gender,
+                    'invited_by': invited_by,
+                    'membership': membership_type,
+                    'membership_total_sessions': total_sessions,
+                    'membership_expires': plans.expiry(today, validity_days),
+                }
+                # Only set ums_count to 1 if it's currently 0
+                if member.ums_count == 0:
+                    profile['ums_count'] = 1
+                # The new plan counts visits from here, not over the member's lifetime
+                profile['plan_start_count'] = member.ums_count
+                profile['sessions_remaining'] = plans.remaining(
+                    total_sessions, profile.get('ums_count', member.ums_count) - member.ums_count
+                )
+                uow.update(member, **profile)
+            
+                # Check if member already has a registration (OneToOne relationship)
+                try:
+                    registration = member.registration
+                    # Update existing registration with new data
+                    for key, value in reg_serializer.validated_data.items():
+                        if key != 'member':  # Don't update the member field
+                            setattr(registration, key, value)
+                    registration.save()
+                except Registration.DoesNotExist:
+                    # Create new registration if member doesn't have one
+                    registration = reg_serializer.save(member=member)
 
-        # Update member financials
-        member.total_paid = Decimal(member.total_paid or 0) + initial_paid
-        member.balance = plan_total - Decimal(member.total_paid)
-
-        # Validate & save body component
-        body_data['member'] = member.id
-        body_serializer = BodyComponentEvaluationSerializer(data=body_data)
-        body_serializer.is_valid(raise_exception=True)
-        body_obj = body_serializer.save(member=member)
+            # Validate & save body component
+            body_data['member'] = member.id
+            body_serializer = BodyComponentEvaluationSerializer(data=body_data)
+            body_serializer.is_valid(raise_exception=True)
+            body_obj = body_serializer.save(member=member)
         
-        # Calculate and update fat, fluids, and analysis_data
-        body_obj = calculate_body_analysis(body_obj, registration)
-        body_obj.save()
-
-        # Update member latest metrics
-        member.latest_weight = body_obj.weight_kg
-        member.latest_height = body_obj.height_cm
-        member.save(update_fields=['latest_weight', 'latest_height', 'total_paid', 'balance', 'updated_at'])
-
-        # Create initial Payment record if paid > 0
-        if initial_paid > 0:
-            Payment.objects.create(
-                member=member,
-                amount=initial_paid,
-                date=registration.created_at.date() if registration.created_at else timezone.now().date(),
-                method='registration',
-                notes='Initial amount paid at registration'
-            )
+            # Calculate and update fat, fluids, and analysis_data
+            body_obj = calculate_body_analysis(body_obj, registration)
+            body_obj.save()
+
+            # Latest metrics: this evaluation unless a checkup is dated later
+            uow.measure(member, body_obj.date, weight=body_obj.weight_kg, height=body_obj.height_cm)
+
+            # Post the plan charge and initial payment to the ledger
+            ledger_date = registration.created_at.date() if registration.created_at else timezone.now().date()
+            if plan_total > 0:
+                ledger.record_charge(member.id, plan_total, date=ledger_date,
+                                     notes=f'{membership_type} plan at registration', uow=uow)
+            events = [outbox.event(
+                outbox.REGISTRATION_SAVED, outbox.registration(member, registration, body_obj, created),
+                member.id, member.branch_id,
+            )]
+            if initial_paid > 0:
+                payment = ledger.record_payment(
+                    member.id,
+                    initial_paid,
+                    date=ledger_date,
+                    method='registration',
+                    notes='Initial amount paid at registration',
+                    uow=uow,
+                    branch_id=member.branch_id,
+                )
+                events.append(outbox.payment_event(outbox.PAYMENT_CREATED, payment))
+            outbox.emit(events)
+
+        member.refresh_from_db(fields=['balance', 'total_paid', 'updated_at'])
 
         # Return combined response
         response = {
@@ -348,8 +552,195 @@ class RegistrationViewSet(viewsets.ViewSet):
         }
         return Response(response, status=201)
 
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsAuthenticated])
+    def bulk(self, request):
+        """
+        Register many guests in one request, e.g. at a health camp.
+
+        Accepts a list of {registration, body_evaluation} pairs (or {"items": [...]})
+        and returns one result per item, in order. Every item is validated before
+        anything is written: invalid items are reported and skipped, and the valid
+        ones are saved together. Members are matched by phone in one query and rows
+        are inserted with bulk_create, so the number of queries does not grow with
+        the batch.
+        """
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "a non-empty list of registrations is required"}, status=400)
+        if len(items) > BULK_REGISTRATION_LIMIT:
+            return Response({"detail": f"at most {BULK_REGISTRATION_LIMIT} registrations per request"}, status=400)
+
+        results = [{'index': index} for index in range(len(items))]
+        valid = []
+        phones = {}
+        all_plans = plans.plans()
+        for index, item in enumerate(items):
+            reg_data = item.get('registration') if isinstance(item, dict) else None
+            body_data = item.get('body_evaluation') if isinstance(item, dict) else None
+            if not reg_data or not body_data:
+                results[index].update(status='failed', errors={"detail": "registration and body_evaluation required"})
+                continue
+
+            reg_serializer = RegistrationSerializer(data=reg_data)
+            if not reg_serializer.is_valid():
+                results[index].update(status='failed', errors={'registration': reg_serializer.errors})
+                continue
+            body_serializer = IntakeBodyEvaluationSerializer(
+                data=body_data, context={'gender': reg_serializer.validated_data.get('gender')}
+            )
+            if not body_serializer.is_valid():
+                results[index].update(status='failed', errors={'body_evaluation': body_serializer.errors})
+                continue
+
+            phone = reg_serializer.validated_data.get('mobile_number')
+            if phone in phones:
+                results[index].update(status='failed', errors={'registration': {
+                    'mobile_number': [f'Same mobile number as item {phones[phone]} in this batch.']
+                }})
+                continue
+            phones[phone] = index
+            plan = registration_plan(reg_serializer.validated_data, reg_data, all_plans)
+            valid.append((index, reg_serializer.validated_data, body_serializer.validated_data, plan))
+
+        if valid:
+            try:
+                with unit_of_work() as uow:
+                    self._save_batch(valid, results, uow, branches.current(request))
+            except IntegrityError as exc:
+                for index, *_ in valid:
+                    results[index] = {'index': index, 'status': 'failed', 'errors': {'detail': f'Batch not saved: {exc}'}}
+
+        counts = {key: sum(1 for r in results if r['status'] == key) for key in ('created', 'updated', 'failed')}
+        if not counts['failed']:
+            status_code = 201
+        elif counts['failed'] == len(results):
+            status_code = 400
+        else:
+            status_code = status.HTTP_207_MULTI_STATUS
+        return Response({**counts, 'results': results}, status=status_code)
+
+    def _save_batch(self, valid, results, uow, branch=None):
+        """Write validated (index, registration, body evaluation, plan) tuples at `branch`."""
+        today = timezone.now().date()
+        branch_id = branch.pk if branch is not None else default_branch()
+        existing = {}
+        phones = [data['mobile_number'] for _, data, _, _ in valid]
+        for member in Member.objects.for_branch(branch).filter(phone__in=phones).select_related('registration'):
+            existing.setdefault(member.phone, member)
+
+        # Members: new ones inserted together, existing ones staged on the unit of work
+        rows = []
+        new_members = []
+        for index, reg_data, body_data, (total_sessions, plan_total, initial_paid, validity_days) in valid:
+            reg_data['plan_total_amount'] = plan_total
+            reg_data['initial_amount_paid'] = initial_paid
+            member = existing.get(reg_data['mobile_number'])
+            if member is None:
+                member = Member(
+                    branch_id=branch_id,
+                    full_name=reg_data.get('guest_name'),
+                    phone=reg_data['mobile_number'],
+                    gender=reg_data.get('gender'),
+                    invited_by=reg_data.get('invited_by'),
+                    registration_date=today,
+                    # bulk_create sends no pre_save, which schedules single creates
+                    next_checkup_date=scheduling.next_checkup_date(today),
+                    membership=reg_data.get('membership'),
+                    membership_total_sessions=total_sessions,
+                    ums_count=1,  # Registration counts as first session
+                    sessions_remaining=plans.remaining(total_sessions, 1),
+                    membership_expires=plans.expiry(today, validity_days),
+                )
+                new_members.append(member)
+                results[index]['status'] = 'created'
+            else:
+                profile = {
+                    'gender': reg_data.get('gender'),
+                    'invited_by': reg_data.get('invited_by'),
+                    'membership': reg_data.get('membership'),
+                    'membership_total_sessions': total_sessions,
+                    'membership_expires': plans.expiry(today, validity_days),
+                }
+                if member.ums_count == 0:
+                    profile['ums_count'] = 1
+                # The new plan counts visits from here, not over the member's lifetime
+                profile['plan_start_count'] = member.ums_count
+                profile['sessions_remaining'] = plans.remaining(
+                    total_sessions, profile.get('ums_count', member.ums_count) - member.ums_count
+                )
+                uow.update(member, **profile)
+                results[index]['status'] = 'updated'
+            rows.append((index, member, reg_data, body_data, plan_total, initial_paid))
+        for member, code in zip(new_members, codes.allocate(len(new_members))):
+            member.member_code = code
+        Member.objects.bulk_create(new_members)
+        created = {id(member) for member in new_members}
+
+        # Registrations: one per member, replaced in place if the member already has one
+        new_registrations = []
+        changed_registrations = []
+        changed_fields = {'updated_at'}
+        registrations = []
+        for index, member, reg_data, body_data, plan_total, initial_paid in rows:
+            registration = None
+            if id(member) not in created:
+                try:
+                    registration = member.registration
+                except Registration.DoesNotExist:
+                    pass
+            if registration is None:
+                registration = Registration(member=member, **reg_data)
+                new_registrations.append(registration)
+            else:
+                for key, value in reg_data.items():
+                    setattr(registration, key, value)
+                registration.updated_at = timezone.now()
+                changed_registrations.append(registration)
+                changed_fields.update(reg_data)
+            registrations.append(registration)
+        Registration.objects.bulk_create(new_registrations)
+        if changed_registrations:
+            Registration.objects.bulk_update(changed_registrations, sorted(changed_fields))
+
+        # Body evaluations, analysed before insert
+        evaluations = []
+        for (index, member, reg_data, body_data, plan_total, initial_paid), registration in zip(rows, registrations):
+            evaluations.append(calculate_body_analysis(BodyComponentEvaluation(member=member, **body_data), registration))
+        BodyComponentEvaluation.objects.bulk_create(evaluations)
+
+        # Ledger: the plan charges and initial payments; outbox events last
+        charges = []
+        payments = []
+        events = []
+        for (index, member, reg_data, body_data, plan_total, initial_paid), registration, evaluation in zip(
+                rows, registrations, evaluations):
+            uow.measure(member, evaluation.date, weight=evaluation.weight_kg, height=evaluation.height_cm)
+            ledger_date = registration.created_at.date() if registration.created_at else today
+            if plan_total > 0:
+                charges.append(LedgerEntry(
+                    member_id=member.id, kind=ledger.CHARGE, amount=plan_total, date=ledger_date,
+                    notes=f"{reg_data.get('membership')} plan at registration",
+                ))
+            if initial_paid > 0:
+                payments.append(Payment(
+                    member_id=member.id, branch_id=member.branch_id, amount=initial_paid, date=ledger_date,
+                    method='registration', notes='Initial amount paid at registration',
+                ))
+            results[index].update(member_id=member.id, registration_id=registration.id, body_evaluation_id=evaluation.id)
+            events.append(outbox.event(
+                outbox.REGISTRATION_SAVED, outbox.registration(member, registration, evaluation, id(member) in created),
+                member.id, member.branch_id,
+            ))
+        ledger.post_entries(charges, uow)
+        ledger.record_payments(payments, uow)
+        outbox.emit(events + [outbox.payment_event(outbox.PAYMENT_CREATED, payment) for payment in payments])
+
     def retrieve(self, request, pk=None):
-        registration = get_object_or_404(Registration, pk=pk)
+        branch = branches.current(request)
+        registrations = Registration.objects.all()
+        if branch is not None:
+            registrations = registrations.filter(member__branch=branch)
+        registration = get_object_or_404(registrations, pk=pk)
         return Response(RegistrationSerializer(registration).data)
 
 
@@ -384,12 +775,25 @@ def attendance_submit(request):
         date_str = timezone.now().date()
 
     created = []
+    events = []
     total_received = Decimal('0.00')
 
     try:
         with transaction.atomic():
+            # Lock every member row up front, in primary-key order, so two desks
+            # submitting overlapping batches queue on the same rows instead of
+            # deadlocking or overwriting each other's counters.
+            member_ids = sorted({int(e['member_id']) for e in entries})
+            members = {
+                m.pk: m for m in
+                Member.objects.for_branch(branches.current(request)).select_for_update()
+                .filter(pk__in=member_ids).order_by('pk')
+            }
+
             for e in entries:
-                member = get_object_or_404(Member, pk=e['member_id'])
+                member = members.get(int(e['member_id']))
+                if member is None:
+                    raise Member.DoesNotExist(f"Member {e['member_id']} does not exist")
                 present = bool(e.get('present', False))
                 paid_amount = Decimal(str(e.get('paid_amount', 0) or 0))
                 
@@ -410,28 +814,35 @@ def attendance_submit(request):
                     }
                 )
                 created.append(obj)
+                events.append(outbox.event(outbox.ATTENDANCE_RECORDED, outbox.attendance(obj),
+                                           member.id, obj.branch_id))
                 
                 # Increment UMS count only if:
                 # 1. Present is True AND
                 # 2. Either newly created OR changed from not present to present
                 if present and (created_flag or (not created_flag and not was_present_before)):
-                    member.ums_count += 1
+                    # Both counters in one statement; NULL sessions_remaining (no session plan) stays NULL
+                    Member.objects.filter(pk=member.pk).update(
+                        ums_count=F('ums_count') + 1,
+                        sessions_remaining=F('sessions_remaining') - 1,
+                        updated_at=timezone.now(),
+                    )
                 
-                # Create payment record and update balances if payment made
+                # Record payment in the ledger (updates balances atomically)
                 if paid_amount > 0:
-                    Payment.objects.create(
-                        member=member,
-                        amount=paid_amount,
+                    payment = ledger.record_payment(
+                        member.id,
+                        paid_amount,
                         date=date_str,
                         method=e.get('method', 'cash'),
-                        notes=e.get('notes', '')
+                        notes=e.get('notes', ''),
+                        branch_id=member.branch_id,
                     )
-                    # Update member balances
-                    member.balance = Decimal(member.balance) - paid_amount
-                    member.total_paid = Decimal(member.total_paid) + paid_amount
+                    events.append(outbox.payment_event(outbox.PAYMENT_CREATED, payment))
                     total_received += paid_amount
-                
-                member.save(update_fields=['balance', 'total_paid', 'ums_count', 'updated_at'])
+
+            # Last, so other desks wait on the outbox lock only for this commit
+            outbox.emit(events)
 
         return Response({
             "status": "ok",
@@ -448,6 +859,7 @@ def attendance_submit(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica.route
 def generate_daily_report(request):
     """
     Generate PDF report for daily attendance.
@@ -459,12 +871,19 @@ def generate_daily_report(request):
     else:
         report_date = timezone.now().date().isoformat()
 
-    attendances = Attendance.objects.filter(
-        date=report_date, 
-        present=True
-    ).select_related('member').order_by('member__full_name')
+    if ('report_daily' in settings.TABULAR_PDF_REPORTS
+            and reports.daily_report_fits_tabular(report_date, branches.current(request))):
+        # The report's queries run as the response streams, after the view returns
+        response = StreamingHttpResponse(
+            replica.stream(reports.daily_report_pdf(report_date, branches.current(request))),
+            content_type='application/pdf',
+        )
+        response['Content-Disposition'] = f'attachment; filename="daily_report_{report_date}.pdf"'
+        return response
+
+    attendances = reports.daily_attendances(report_date, branches.current(request))
     
-    total_present = attendances.count()
+    total_present = len(attendances)
     total_received = sum([Decimal(a.paid_amount) for a in attendances])
 
     context = {
@@ -476,8 +895,7 @@ def generate_daily_report(request):
     }
 
     html_string = render_to_string('report_daily.html', context)
-    html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-    pdf = html.write_pdf()
+    pdf = render_pdf(html_string, base_url=request.build_absolute_uri('/'), stylesheet='report_daily')
 
     response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="daily_report_{report_date}.pdf"'
@@ -485,22 +903,69 @@ def generate_daily_report(request):
 
 
 @api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica.route
+def attendance_range_report(request):
+    """
+    Attendance, revenue and registration totals over a week, month or custom range.
+    GET /api/report/range/?period=month&date=YYYY-MM-DD
+    GET /api/report/range/?period=week&date=YYYY-MM-DD
+    GET /api/report/range/?period=custom&from=YYYY-MM-DD&to=YYYY-MM-DD
+    
+    Returns JSON for dashboards, or a PDF with output=pdf.
+    """
+    period = request.GET.get('period', 'month')
+    output = request.GET.get('output', 'json')
+    try:
+        anchor = parse_date(request.GET['date']) if request.GET.get('date') else timezone.now().date()
+        date_from = parse_date(request.GET['from']) if request.GET.get('from') else None
+        date_to = parse_date(request.GET['to']) if request.GET.get('to') else None
+        if anchor is None:
+            raise ValueError('date must be YYYY-MM-DD')
+        date_from, date_to = reports.report_range(period, anchor, date_from, date_to)
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=400)
+
+    summary = reports.attendance_range_summary(date_from, date_to, branches.current(request))
+
+    if output != 'pdf':
+        return Response(summary)
+
+    if 'report_range' in settings.TABULAR_PDF_REPORTS and reports.range_report_fits_tabular(summary):
+        response = StreamingHttpResponse(reports.range_report_pdf(summary, period), content_type='application/pdf')
+    else:
+        context = dict(summary, period=period, org_name='Membership Management System')
+        html_string = render_to_string('report_range.html', context)
+        pdf = render_pdf(html_string, base_url=request.build_absolute_uri('/'), stylesheet='report_daily')
+        response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="attendance_report_{date_from}_{date_to}.pdf"'
+    return response
+
+
+@api_view(['GET'])
+@replica.route
 def dashboard_stats(request):
     """Get dashboard statistics"""
-    total_members = Member.objects.count()
     today = timezone.now().date()
-    today_attendance = Attendance.objects.filter(date=today, present=True).count()
-    total_balance = sum([m.balance for m in Member.objects.all()])
-    
-    return Response({
-        'total_members': total_members,
-        'today_attendance': today_attendance,
-        'total_outstanding_balance': float(total_balance),
-    })
+    branch = branches.current(request)
+
+    def stats():
+        members = Member.objects.for_branch(branch)
+        total_members = members.count()
+        today_attendance = Attendance.objects.for_branch(branch).filter(date=today, present=True).count()
+        total_balance = members.aggregate(total=Sum('balance'))['total'] or 0
+        return {
+            'total_members': total_members,
+            'today_attendance': today_attendance,
+            'total_outstanding_balance': float(total_balance),
+        }
+
+    return Response(cache.cached(cache.DASHBOARD, today, stats, scope=cache.branch_scope(branch)))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica.route
 def generate_registration_analysis(request, registration_id):
     """
     Generate comprehensive analysis PDF report for a registration.
@@ -508,7 +973,11 @@ def generate_registration_analysis(request, registration_id):
     GET /api/reports/registration/<registration_id>/analysis/
     """
     try:
-        registration = get_object_or_404(Registration, pk=registration_id)
+        branch = branches.current(request)
+        registrations = Registration.objects.all()
+        if branch is not None:
+            registrations = registrations.filter(member__branch=branch)
+        registration = get_object_or_404(registrations, pk=registration_id)
         member = registration.member
         
         # Get the latest body evaluation for this member
@@ -532,8 +1001,7 @@ def generate_registration_analysis(request, registration_id):
         
         # Render HTML template
         html_string = render_to_string('analysis_report.html', context)
-        html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-        pdf = html.write_pdf()
+        pdf = render_pdf(html_string, base_url=request.build_absolute_uri('/'), stylesheet='analysis_report')
         
         # Return PDF response with attachment disposition to force download
         response = HttpResponse(pdf, content_type='application/pdf')
@@ -548,33 +1016,147 @@ def generate_registration_analysis(request, registration_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica.route
+def generate_batch_analysis(request):
+    """
+    Generate analysis reports for many registrations in one download.
+    GET /api/reports/registrations/analysis/?ids=1,2,3
+    GET /api/reports/registrations/analysis/?from=YYYY-MM-DD&to=YYYY-MM-DD&output=zip
+    
+    Returns one multi-page PDF, or with output=zip one PDF per chunk.
+    """
+    ids_param = request.GET.get('ids', '')
+    output = request.GET.get('output', 'pdf')
+    try:
+        ids = [int(i) for i in ids_param.split(',') if i.strip()]
+        date_from, date_to = (
+            parse_date(request.GET[key]) if request.GET.get(key) else None for key in ('from', 'to')
+        )
+        if (request.GET.get('from') and not date_from) or (request.GET.get('to') and not date_to):
+            raise ValueError
+    except ValueError:
+        return Response({"detail": "ids must be integers and dates YYYY-MM-DD"}, status=400)
+
+    if not (ids or date_from or date_to):
+        return Response({"detail": "ids or a from/to date range required"}, status=400)
+    if output not in ('pdf', 'zip'):
+        return Response({"detail": "output must be pdf or zip"}, status=400)
+
+    registrations = reports.batch_registrations(ids=ids, date_from=date_from, date_to=date_to,
+                                                branch=branches.current(request))
+    if registrations.count() > reports.ANALYSIS_BATCH_LIMIT:
+        return Response({
+            "detail": f"At most {reports.ANALYSIS_BATCH_LIMIT} registrations per batch"
+        }, status=400)
+
+    items, skipped = reports.analysis_reports(registrations)
+    if not items:
+        return Response({"detail": "No body evaluations found for these registrations"},
+                        status=status.HTTP_404_NOT_FOUND)
+
+    content = reports.render_analysis_batch(items, base_url=request.build_absolute_uri('/'), output=output)
+
+    content_type = 'application/zip' if output == 'zip' else 'application/pdf'
+    response = HttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="analysis_batch_{len(items)}.{output}"'
+    if skipped:
+        response['X-Skipped-Registrations'] = ','.join(str(i) for i in skipped)
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def issue_api_token(request):
+    """
+    Exchange credentials for a signed API token.
+    POST /api/auth/token/ {"username": ..., "password": ...}
+    An already authenticated caller (session or Basic) may omit the body.
+
+    Send the token as "Authorization: Bearer <token>" until it expires.
+    """
+    user = request.user
+    if request.data.get('username'):
+        user = authenticate(request, username=request.data['username'], password=request.data.get('password'))
+    if user is None or not user.is_authenticated:
+        return Response({"detail": "Unable to log in with provided credentials"}, status=status.HTTP_400_BAD_REQUEST)
+
+    token, expires = issue_token(user)
+    return Response({'token': token, 'expires': expires})
+
+
 @api_view(['GET'])
 def health_check(request):
     """Health check endpoint for load balancers"""
     return Response({'status': 'healthy', 'timestamp': timezone.now()})
 
 
-# Note: search endpoint provided via MemberViewSet.search action
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """
+    Cache hit/miss counts per namespace for the worker serving the request.
+    GET /api/cache/stats/
+    """
+    return Response({'backend': settings.CACHES['default']['BACKEND'], 'namespaces': cache.stats()})
+
+
+# Events per change feed response, and the longest a request may wait for one
+CHANGE_FEED_LIMIT_MAX = 1000
+CHANGE_FEED_WAIT_MAX = 30
+
+
+def change_feed_params(query):
+    """(after, limit, wait, topics) from the feed's query string; ValueError if malformed."""
+    after = int(query.get('after') or 0)
+    limit = max(1, min(int(query.get('limit') or outbox.READ_LIMIT), CHANGE_FEED_LIMIT_MAX))
+    wait = max(0.0, min(float(query.get('wait') or 0), CHANGE_FEED_WAIT_MAX))
+    topics = [topic for topic in (query.get('topic') or '').split(',') if topic]
+    if after < 0:
+        raise ValueError(after)
+    return after, limit, wait, topics
+
+
+def change_feed_response(events, after):
+    """NDJSON of `events`; X-Next-Cursor is the ?after= of the next request."""
+    response = HttpResponse(''.join(outbox.as_json(e) + '\n' for e in events), content_type='application/x-ndjson')
+    response['X-Next-Cursor'] = str(events[-1].pk if events else after)
+    return response
 
 
 @api_view(['GET'])
-@permission_classes([AllowAny])
-def body_checkup_data(request, member_id):
+@permission_classes([IsAuthenticated])
+def change_feed(request):
     """
-    Get body checkup data for a specific member organized by weeks.
-    GET /api/body-checkup/<member_id>/
-    
-    Returns member info and checkup data organized by weeks (1-16).
+    Outbox events after a cursor, oldest first, one JSON object per line.
+    GET /api/changes/?after=<id>&limit=500&wait=25&topic=payment.created,...
+
+    Continue from the X-Next-Cursor header, or the id of the last line.
+    ?wait= is only honoured by the ASGI view: here a waiting request would
+    hold a WSGI worker thread, so it answers at once and clients poll again.
+    """
+    try:
+        after, limit, _wait, topics = change_feed_params(request.query_params)
+    except ValueError:
+        return Response({'detail': 'after, limit and wait must be non-negative numbers'}, status=400)
+    events = outbox.read(after, limit, branches.current(request), topics)
+    return change_feed_response(events, after)
+
+
+# Note: search endpoint provided via MemberViewSet.search action
+
+
+def checkup_weeks(member, checkups):
+    """
+    Organize a member's checkups (ordered by date) into weeks 1-16 counted
+    from the registration date.
+    Returns (weeks, locked_weeks); any week backed by a Checkup is locked.
     """
-    member = get_object_or_404(Member, pk=member_id)
-    
-    # Get all checkups for this member ordered by date
-    checkups = Checkup.objects.filter(member=member).order_by('checkup_date')
-    
-    # Organize checkups by week (assuming weekly checkups starting from registration date)
     registration_date = member.registration_date
     weeks = {}
-    
+    locked_weeks = {1}
+
     for checkup in checkups:
         # Calculate week number based on days since registration
         days_diff = (checkup.checkup_date - registration_date).days
@@ -599,42 +1181,34 @@ def body_checkup_data(request, member_id):
                     'muscle_mass': category_data.get('muscle_mass', ''),
                 }
             }
+            locked_weeks.add(week_num)
 
-    # Ensure Week 1 is prefilled from registration/body evaluation if not present
-    if 1 not in weeks:
-        # Registration date as Week 1 date
-        week1_date = registration_date.strftime('%Y-%m-%d') if registration_date else ''
-        # Latest body evaluation (at registration)
-        body_eval = member.body_evaluations.first()
-        weeks[1] = {
-            'date': week1_date,
-            'data': {
-                'age': str(member.registration.age) if hasattr(member, 'registration') and member.registration and member.registration.age is not None else '',
-                'height': str(body_eval.height_cm) if body_eval and body_eval.height_cm is not None else '',
-                'weight': str(body_eval.weight_kg) if body_eval and body_eval.weight_kg is not None else '',
-                'body_fat': str(body_eval.body_fat_men or body_eval.body_fat_women) if body_eval else '',
-                'bma': str(body_eval.body_age) if body_eval and body_eval.body_age is not None else '',
-                'bmi': str(body_eval.bmi) if body_eval and body_eval.bmi is not None else '',
-                'bmr': str(body_eval.bmr_rm) if body_eval and body_eval.bmr_rm is not None else '',
-                'visceral_fat': str(body_eval.visceral_fat) if body_eval and body_eval.visceral_fat is not None else '',
-                'subcutaneous_fat': str(body_eval.trunk_subcutaneous_fat) if body_eval and body_eval.trunk_subcutaneous_fat is not None else '',
-                'muscle_mass': str(body_eval.skeletal_muscle_men or body_eval.skeletal_muscle_women) if body_eval else '',
-            }
+    return weeks, sorted(locked_weeks)
+
+
+def week_one_from_evaluation(member, registration, body_eval):
+    """Prefill Week 1 from the registration survey and body evaluation."""
+    registration_date = member.registration_date
+    return {
+        'date': registration_date.strftime('%Y-%m-%d') if registration_date else '',
+        'data': {
+            'age': str(registration.age) if registration and registration.age is not None else '',
+            'height': str(body_eval.height_cm) if body_eval and body_eval.height_cm is not None else '',
+            'weight': str(body_eval.weight_kg) if body_eval and body_eval.weight_kg is not None else '',
+            'body_fat': str(body_eval.body_fat_men or body_eval.body_fat_women) if body_eval else '',
+            'bma': str(body_eval.body_age) if body_eval and body_eval.body_age is not None else '',
+            'bmi': str(body_eval.bmi) if body_eval and body_eval.bmi is not None else '',
+            'bmr': str(body_eval.bmr_rm) if body_eval and body_eval.bmr_rm is not None else '',
+            'visceral_fat': str(body_eval.visceral_fat) if body_eval and body_eval.visceral_fat is not None else '',
+            'subcutaneous_fat': str(body_eval.trunk_subcutaneous_fat) if body_eval and body_eval.trunk_subcutaneous_fat is not None else '',
+            'muscle_mass': str(body_eval.skeletal_muscle_men or body_eval.skeletal_muscle_women) if body_eval else '',
         }
-    
-    # Build response
-    # Determine locked weeks: Week 1 always locked; any week with a Checkup record is locked
-    locked_weeks = {1: True}
-    for w in weeks.keys():
-        if w != 1:
-            # compute date for week
-            # locked if a checkup exists matching that week
-            # already gathered above by checkups loop; if week data exists from DB, treat as locked
-            # heuristic: if week came from DB (has possible values), lock it
-            # we mark weeks that were loaded from checkups as locked
-            pass
-    # Build response
-    response_data = {
+    }
+
+
+def body_checkup_payload(member, weeks, locked_weeks):
+    """Build the body checkup response body shared by the sync and async views."""
+    return {
         'member': {
             'id': member.id,
             'full_name': member.full_name,
@@ -644,10 +1218,37 @@ def body_checkup_data(request, member_id):
             'gender': member.gender or '',
         },
         'weeks': weeks,
-        'locked_weeks': sorted(list({1}.union(set([( ( ( (checkup.checkup_date - registration_date).days // 7) + 1) ) for checkup in checkups if 1 <= ( (checkup.checkup_date - registration_date).days // 7) + 1 <= 16 ]))))
+        'locked_weeks': locked_weeks,
     }
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def body_checkup_data(request, member_id):
+    """
+    Get body checkup data for a specific member organized by weeks.
+    GET /api/body-checkup/<member_id>/
     
-    return Response(response_data)
+    Returns member info and checkup data organized by weeks (1-16).
+    """
+    branch = branches.current(request)
+
+    def payload():
+        member = get_object_or_404(Member.objects.for_branch(branch), pk=member_id)
+
+        # Get all checkups for this member ordered by date
+        checkups = Checkup.objects.filter(member=member).order_by('checkup_date')
+        weeks, locked_weeks = checkup_weeks(member, checkups)
+
+        # Ensure Week 1 is prefilled from registration/body evaluation if not present
+        if 1 not in weeks:
+            registration = getattr(member, 'registration', None)
+            weeks[1] = week_one_from_evaluation(member, registration, member.body_evaluations.first())
+
+        return body_checkup_payload(member, weeks, locked_weeks)
+
+    # Invalidated per member; keyed per branch so a narrowed request never reads another branch's entry
+    return Response(cache.cached(cache.BODY_CHECKUP, (member_id, cache.branch_scope(branch)), payload, scope=member_id))
 
 
 @api_view(['POST'])
@@ -674,7 +1275,7 @@ def body_checkup_save(request, member_id):
       ]
     }
     """
-    member = get_object_or_404(Member, pk=member_id)
+    member = get_object_or_404(Member.objects.for_branch(branches.current(request)), pk=member_id)
     checkup_data = request.data.get('checkup_data', [])
     
     if not checkup_data:
@@ -683,7 +1284,8 @@ def body_checkup_save(request, member_id):
     registration_date = member.registration_date
     
     try:
-        with transaction.atomic():
+        with unit_of_work() as uow:
+            saved = []
             for week_entry in checkup_data:
                 week_num = week_entry.get('week')
                 data = week_entry.get('data', {})
@@ -725,13 +1327,14 @@ def body_checkup_save(request, member_id):
                     }
                 )
                 
-                # Update member's latest metrics if this is the most recent checkup
-                if weight:
-                    member.latest_weight = Decimal(weight)
-                if height:
-                    member.latest_height = Decimal(height)
-            
-            member.save(update_fields=['latest_weight', 'latest_height', 'updated_at'])
+                saved.append(checkup)
+                # Latest metrics come from the most recent checkup date, not the last entry sent
+                uow.measure(member, checkup_date, weight=checkup.weight, height=checkup.height)
+
+            next_checkup_date = scheduling.schedule(member)
+            uow.update(member, next_checkup_date=next_checkup_date)
+            outbox.emit([outbox.event(outbox.CHECKUP_SAVED, outbox.checkups(member, saved, next_checkup_date),
+                                      member.id, member.branch_id)])
         
         return Response({'status': 'success', 'message': 'Checkup data saved successfully'})
     